@@ -0,0 +1,15 @@
+from fastapi import Response
+
+
+class PreserializedJSONResponse(Response):
+    """Sends JSON that is already bytes, skipping response_model validation and re-encoding.
+
+    Routes keep their ``response_model`` for the OpenAPI schema; returning a
+    Response instance makes FastAPI pass it through untouched.
+    """
+
+    media_type = "application/json"
+
+
+def json_array(items: list[bytes]) -> bytes:
+    return b"[" + b",".join(items) + b"]"
@@ -1,9 +1,15 @@
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, HTTPException, Query, Request, Response
 
+from app.api.responses import PreserializedJSONResponse, json_array
 from app.db.memory_store import store
 from app.schemas.api import (
     CreatorListEntry,
+    ListBatchRequest,
+    ListChangeEntry,
+    ListChangesResponse,
     ListType,
+    ModelCallbackAck,
+    ModelJobCallback,
     ScanRequest,
     ScanResponse,
     UpdateListRequest,
@@ -24,11 +30,13 @@ def health():
 
 @router.post("/scan", response_model=ScanResponse)
 def scan_content(payload: ScanRequest):
-    return run_scan(
+    payload_json = run_scan(
         url=payload.url,
         user_fingerprint=payload.userFingerprint,
         conservative_mode=payload.conservativeMode,
+        debug=payload.debug,
     )
+    return PreserializedJSONResponse(payload_json)
 
 
 @router.post("/vote", response_model=VoteResponse)
@@ -46,12 +54,44 @@ def vote_content(payload: VoteRequest):
 
 @router.post("/list", response_model=UpdateListResponse)
 def update_creator_list(payload: UpdateListRequest):
-    store.set_creator_list(
+    version = store.set_creator_list(
         user_fingerprint=payload.userFingerprint,
         creator_id=payload.creatorId,
         list_type=payload.listType,
     )
-    return UpdateListResponse(ok=True)
+    return UpdateListResponse(ok=True, version=version)
+
+@router.post("/list/batch", response_model=UpdateListResponse)
+def batch_update_creator_list(payload: ListBatchRequest):
+    version = store.apply_list_operations(
+        payload.userFingerprint,
+        [
+            (operation.creatorId, operation.listType if operation.op == "set" else None)
+            for operation in payload.operations
+        ],
+    )
+    return UpdateListResponse(ok=True, version=version)
+
+@router.get("/list/changes", response_model=ListChangesResponse)
+def get_creator_list_changes(
+    userFingerprint: str = Query(min_length=3),
+    since: int = Query(default=0, ge=0),
+    epoch: str | None = Query(default=None),
+):
+    """Changes after list version ``since``; a full snapshot when the client has no usable base."""
+    changes = None
+    # Versions restart with the process, so a base from another epoch is meaningless.
+    if since > 0 and epoch in (None, store.epoch):
+        changes, version = store.get_list_changes(userFingerprint, since)
+    if changes is None:
+        rows, version = store.get_list_snapshot(userFingerprint)
+        return ListChangesResponse(version=version, epoch=store.epoch, reset=True, changes=rows)
+    return ListChangesResponse(
+        version=version,
+        epoch=store.epoch,
+        reset=False,
+        changes=[ListChangeEntry(creatorId=change.creator_id, listType=change.list_type) for change in changes],
+    )
 
 @router.get("/list", response_model=list[CreatorListEntry])
 def get_creator_list(
@@ -66,10 +106,48 @@ def remove_creator_from_list(
     userFingerprint: str = Query(min_length=3),
     creatorId: str = Query(min_length=1),
 ):
-    store.remove_creator_from_list(user_fingerprint=userFingerprint, creator_id=creatorId)
-    return UpdateListResponse(ok=True)
+    version = store.remove_creator_from_list(user_fingerprint=userFingerprint, creator_id=creatorId)
+    return UpdateListResponse(ok=True, version=version)
+
+@router.post("/model-callback", response_model=ModelCallbackAck)
+def receive_model_callback(payload: ModelJobCallback, contentId: str = Query(min_length=3)):
+    # Only jobs this backend submitted for this content may write its model score.
+    if not store.claim_model_job(payload.jobId, contentId):
+        raise HTTPException(status_code=403, detail="Unknown model job for this content.")
+    if payload.status == "done" and payload.result is not None and not payload.result.fallback:
+        store.set_model_result(contentId, payload.result.model_dump())
+    return ModelCallbackAck(ok=True)
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {candidate.strip().removeprefix("W/") for candidate in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
 
 @router.get("/history", response_model=list[ScanResponse])
-def get_history(userFingerprint: str = Query(min_length=3)):
-    rows = store.get_user_history(userFingerprint)
-    return [ScanResponse(**row) for row in rows]
+def get_history(
+    request: Request,
+    userFingerprint: str = Query(min_length=3),
+    limit: int | None = Query(default=None, ge=1, le=100),
+    cursor: int | None = Query(default=None, ge=0, description="X-Next-Cursor from the previous page."),
+    since: int | None = Query(default=None, ge=0, description="Only entries newer than this X-History-Version."),
+):
+    # The version changes on every new scan, so it is a strong validator for any
+    # query on this user's history; a 304 is decided before any body is built.
+    version = store.get_history_version(userFingerprint)
+    headers = {
+        "ETag": f'"{store.epoch}-{version}"',
+        "X-History-Version": str(version),
+        "Cache-Control": "no-cache",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+
+    items, next_cursor, version = store.get_user_history(userFingerprint, limit=limit, before=cursor, since=since)
+    # A scan may have landed since the 304 check; describe the page that is actually sent.
+    headers["ETag"] = f'"{store.epoch}-{version}"'
+    headers["X-History-Version"] = str(version)
+    if next_cursor is not None:
+        headers["X-Next-Cursor"] = str(next_cursor)
+    return PreserializedJSONResponse(json_array(items), headers=headers)
@@ -9,8 +9,36 @@ class Settings(BaseModel):
     host: str = os.getenv("HOST", "0.0.0.0")
     port: int = int(os.getenv("PORT", "8000"))
     youtube_api_key: str = os.getenv("YOUTUBE_API_KEY", "")
+    youtube_api_base_url: str = os.getenv("YOUTUBE_API_BASE_URL", "https://www.googleapis.com/youtube/v3")
+    # Data API units per day (each list call costs 1); lookups within the window share one call.
+    youtube_daily_quota: int = int(os.getenv("YOUTUBE_DAILY_QUOTA", "10000"))
+    youtube_batch_window_ms: float = float(os.getenv("YOUTUBE_BATCH_WINDOW_MS", "10"))
+    youtube_cache_ttl_seconds: float = float(os.getenv("YOUTUBE_CACHE_TTL_SECONDS", "3600"))
+    # Older entries are still served while the quota is exhausted or the API fails.
+    youtube_stale_ttl_seconds: float = float(os.getenv("YOUTUBE_STALE_TTL_SECONDS", str(7 * 86400)))
+    # SQLite file mapping video ids to channel ids; ":memory:" keeps it per process.
+    channel_index_path: str = os.getenv("CHANNEL_INDEX_PATH", "data/channel_index.sqlite3")
+    aislist_base_url: str = os.getenv(
+        "AISLIST_BASE_URL",
+        "https://raw.githubusercontent.com/Override92/AiSList/refs/heads/main/AiSList",
+    )
     model_service_url: str = os.getenv("MODEL_SERVICE_URL", "http://localhost:8010")
     model_timeout_seconds: int = int(os.getenv("MODEL_TIMEOUT_SECONDS", "8"))
+    model_job_poll_interval_seconds: float = float(os.getenv("MODEL_JOB_POLL_INTERVAL_SECONDS", "0.5"))
+    # Public URL of this backend's /api/model-callback route; empty disables push callbacks.
+    model_callback_url: str = os.getenv("MODEL_CALLBACK_URL", "")
+    trace_sample_ratio: float = float(os.getenv("TRACE_SAMPLE_RATIO", "0.1"))
+    # JSON-lines span file and/or OTLP/HTTP collector (e.g. http://localhost:4318/v1/traces).
+    trace_export_path: str = os.getenv("TRACE_EXPORT_PATH", "")
+    trace_otlp_endpoint: str = os.getenv("TRACE_OTLP_ENDPOINT", "")
+    # Background pre-scoring of new uploads from the most listed/scanned creators.
+    warmup_enabled: bool = os.getenv("WARMUP_ENABLED", "false").lower() in {"1", "true", "yes"}
+    warmup_interval_seconds: float = float(os.getenv("WARMUP_INTERVAL_SECONDS", "300"))
+    warmup_top_creators: int = int(os.getenv("WARMUP_TOP_CREATORS", "20"))
+    warmup_items_per_creator: int = int(os.getenv("WARMUP_ITEMS_PER_CREATOR", "3"))
+    # Compute budget per cycle: wall-clock seconds spent waiting on the model service and a cap on items.
+    warmup_budget_seconds: float = float(os.getenv("WARMUP_BUDGET_SECONDS", "60"))
+    warmup_max_items: int = int(os.getenv("WARMUP_MAX_ITEMS", "30"))
 
 
 settings = Settings()
@@ -0,0 +1,60 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+# Covers fast in-process stages (sub-millisecond) up to slow upstream calls.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+STAGE_LATENCY = Histogram(
+    "backend_stage_duration_seconds",
+    "Time spent in each scan pipeline stage.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "backend_cache_lookups_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    ["cache", "result"],
+)
+REQUEST_LATENCY = Histogram(
+    "backend_http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+YOUTUBE_QUOTA_UNITS = Counter(
+    "backend_youtube_quota_units_total",
+    "YouTube Data API quota units spent, by endpoint.",
+    ["endpoint"],
+)
+YOUTUBE_QUOTA_REJECTED = Counter(
+    "backend_youtube_quota_rejected_total",
+    "YouTube Data API calls skipped because the daily quota bucket was empty.",
+    ["endpoint"],
+)
+YOUTUBE_QUOTA_REMAINING = Gauge(
+    "backend_youtube_quota_remaining_units",
+    "Units left in the YouTube daily quota bucket.",
+)
+YOUTUBE_LOOKUPS = Counter(
+    "backend_youtube_lookups_total",
+    "Per-id YouTube lookups by result (fresh, fetched, stale, failed).",
+    ["endpoint", "result"],
+)
+YOUTUBE_BATCH_SIZE = Histogram(
+    "backend_youtube_batch_ids",
+    "Ids sent per batched YouTube list call.",
+    ["endpoint"],
+    buckets=(1, 2, 5, 10, 20, 30, 40, 50),
+)
+WARMUP_ITEMS = Counter(
+    "backend_warmup_items_total",
+    "Creator uploads considered by the warmup job, by outcome.",
+    ["outcome"],
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "backend_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
@@ -0,0 +1,81 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import perf_counter
+from typing import Iterator
+
+from opentelemetry import propagate, trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from app.core.config import settings
+from app.core.metrics import STAGE_LATENCY
+
+tracer = trace.get_tracer("aislopguard.backend")
+
+# Per-request stage timings, only populated while a debug scan is running.
+_stage_timings: ContextVar[dict[str, float] | None] = ContextVar("stage_timings", default=None)
+
+
+def configure_tracing():
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "aislopguard-backend"}),
+        sampler=ParentBased(TraceIdRatioBased(settings.trace_sample_ratio)),
+    )
+    if settings.trace_export_path:
+        # One OTLP-style JSON span per line, easy to tail or ship later.
+        out = open(settings.trace_export_path, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    if settings.trace_otlp_endpoint:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.trace_otlp_endpoint)))
+    trace.set_tracer_provider(provider)
+
+
+@contextmanager
+def trace_stage(stage: str) -> Iterator[None]:
+    started = perf_counter()
+    with tracer.start_as_current_span(stage):
+        try:
+            yield
+        finally:
+            elapsed = perf_counter() - started
+            STAGE_LATENCY.labels(stage).observe(elapsed)
+            timings = _stage_timings.get()
+            if timings is not None:
+                timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def record_stage_timing(stage: str, seconds: float):
+    """Records time measured outside ``trace_stage``, e.g. waiting on another request's work."""
+    STAGE_LATENCY.labels(stage).observe(seconds)
+    timings = _stage_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def collect_stage_timings(enabled: bool) -> Iterator[dict[str, float] | None]:
+    if not enabled:
+        yield None
+        return
+    timings: dict[str, float] = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+def trace_headers() -> dict[str, str]:
+    headers: dict[str, str] = {}
+    propagate.inject(headers)
+    return headers
+
+
+def current_trace() -> tuple[str, bool]:
+    span_context = trace.get_current_span().get_span_context()
+    return trace.format_trace_id(span_context.trace_id), span_context.trace_flags.sampled
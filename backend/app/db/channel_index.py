@@ -0,0 +1,84 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from app.core.config import settings
+
+
+class ChannelIndex:
+    """Persistent video id -> channel id (and channel id -> handle) map.
+
+    A video never changes channel, so once any metadata lookup has seen it the
+    creator can be resolved offline. SQLite holds the full index across
+    restarts; an in-memory LRU in front serves repeat lookups without a query.
+    """
+
+    def __init__(self, path: str, lru_size: int = 100_000):
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.lru_size = lru_size
+        self._lock = threading.Lock()
+        self._lru: OrderedDict[str, str] = OrderedDict()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS video_channel (video_id TEXT PRIMARY KEY, channel_id TEXT NOT NULL) WITHOUT ROWID"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS channel_handle (channel_id TEXT PRIMARY KEY, handle TEXT) WITHOUT ROWID"
+        )
+        self._conn.commit()
+
+    def channel_for_video(self, video_id: str) -> str | None:
+        with self._lock:
+            channel_id = self._lru.get(video_id)
+            if channel_id is not None:
+                self._lru.move_to_end(video_id)
+                return channel_id
+            row = self._conn.execute(
+                "SELECT channel_id FROM video_channel WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if row is not None:
+                self._remember_locked(video_id, row[0])
+                return row[0]
+        return None
+
+    def handle_for_channel(self, channel_id: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT handle FROM channel_handle WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+        return row[0] if row is not None else None
+
+    def add_videos(self, video_channels: dict[str, str]):
+        if not video_channels:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO video_channel (video_id, channel_id) VALUES (?, ?)",
+                video_channels.items(),
+            )
+            self._conn.commit()
+            for video_id, channel_id in video_channels.items():
+                self._remember_locked(video_id, channel_id)
+
+    def add_handles(self, channel_handles: dict[str, str | None]):
+        if not channel_handles:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO channel_handle (channel_id, handle) VALUES (?, ?)",
+                channel_handles.items(),
+            )
+            self._conn.commit()
+
+    def _remember_locked(self, video_id: str, channel_id: str):
+        self._lru[video_id] = channel_id
+        self._lru.move_to_end(video_id)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+
+channel_index = ChannelIndex(settings.channel_index_path)
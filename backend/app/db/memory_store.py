@@ -1,4 +1,8 @@
-from collections import defaultdict
+import threading
+import time
+import uuid
+from bisect import bisect_left, bisect_right
+from collections import Counter, OrderedDict, defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from typing import Literal
@@ -6,6 +10,16 @@ from typing import Literal
 ListType = Literal["allow", "block"]
 VoteType = Literal["ai", "not_ai", "unsure"]
 
+MAX_HISTORY_PER_USER = 100
+# Cached model scores: least recently used entries are evicted past the cap,
+# and entries older than the TTL are rescored on the next scan.
+MAX_MODEL_RESULTS = 50_000
+MODEL_RESULT_TTL_SECONDS = 24 * 3600
+# Model-service job ids awaiting a push callback; older ones are forgotten first.
+MAX_PENDING_MODEL_JOBS = 10_000
+# Change-log entries kept per user beyond the list size before compaction.
+MIN_LIST_LOG_PER_USER = 256
+
 
 @dataclass
 class CommunityVote:
@@ -16,36 +30,120 @@ class CommunityVote:
     created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+@dataclass
+class ListChange:
+    version: int
+    creator_id: str
+    # None records a removal.
+    list_type: ListType | None
+
+
 @dataclass
 class ScanRecord:
     content_id: str
     user_fingerprint: str
-    payload: dict
+    creator_id: str
+    # ScanResponse JSON, serialized once when the scan is stored and served as-is.
+    payload_json: bytes
+    # Per-user history version at insert time; doubles as the pagination cursor.
+    sequence: int = 0
     created_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
 
 class MemoryStore:
     def __init__(self):
         self.user_lists: dict[str, dict[str, ListType]] = defaultdict(dict)
+        self.list_versions: dict[str, int] = defaultdict(int)
+        # Oldest first; changes at or below list_log_floors were compacted away.
+        self.list_changes: dict[str, list[ListChange]] = defaultdict(list)
+        self.list_log_floors: dict[str, int] = defaultdict(int)
+        # Guards user_lists and the list versions/change log; handlers run in a threadpool.
+        self._lists_lock = threading.Lock()
         self.community_votes: dict[str, dict[str, CommunityVote]] = defaultdict(dict)
+        # Oldest first, so appends are cheap and sequences stay sorted for bisect.
         self.scan_history_by_user: dict[str, list[ScanRecord]] = defaultdict(list)
-
-    def set_creator_list(self, user_fingerprint: str, creator_id: str, list_type: ListType):
-        self.user_lists[user_fingerprint][creator_id] = list_type
+        self.history_versions: dict[str, int] = defaultdict(int)
+        # Guards the history lists and versions; scans are recorded from the threadpool.
+        self._history_lock = threading.Lock()
+        # content id -> (result, time.monotonic() when stored), least recently used first.
+        self.model_results: OrderedDict[str, tuple[dict, float]] = OrderedDict()
+        self._model_results_lock = threading.Lock()
+        # job id -> content id for jobs this backend submitted with a callback URL.
+        self.pending_model_jobs: OrderedDict[str, str] = OrderedDict()
+        # Distinguishes versions of this process from those of a previous run in ETags.
+        self.epoch = uuid.uuid4().hex[:8]
+
+    def set_creator_list(self, user_fingerprint: str, creator_id: str, list_type: ListType) -> int:
+        return self.apply_list_operations(user_fingerprint, [(creator_id, list_type)])
 
     def get_creator_list(self, user_fingerprint: str, list_type: ListType | None = None) -> list[dict]:
-        entries: list[dict] = []
-        for creator_id, creator_list_type in self.user_lists[user_fingerprint].items():
-            if list_type is not None and creator_list_type != list_type:
-                continue
-            entries.append({"creatorId": creator_id, "listType": creator_list_type})
-        return entries
-
-    def remove_creator_from_list(self, user_fingerprint: str, creator_id: str):
-        self.user_lists[user_fingerprint].pop(creator_id, None)
+        return self.get_list_snapshot(user_fingerprint, list_type)[0]
+
+    def get_list_snapshot(self, user_fingerprint: str, list_type: ListType | None = None) -> tuple[list[dict], int]:
+        """The list entries and the version they correspond to."""
+        with self._lists_lock:
+            entries: list[dict] = []
+            for creator_id, creator_list_type in self.user_lists.get(user_fingerprint, {}).items():
+                if list_type is not None and creator_list_type != list_type:
+                    continue
+                entries.append({"creatorId": creator_id, "listType": creator_list_type})
+            return entries, self.list_versions.get(user_fingerprint, 0)
+
+    def remove_creator_from_list(self, user_fingerprint: str, creator_id: str) -> int:
+        return self.apply_list_operations(user_fingerprint, [(creator_id, None)])
+
+    def apply_list_operations(
+        self, user_fingerprint: str, operations: list[tuple[str, ListType | None]]
+    ) -> int:
+        """Applies ``(creator_id, list_type)`` edits atomically; None removes. Returns the new version.
+
+        All edits that change something share one version bump, so readers
+        never see a partially applied batch.
+        """
+        with self._lists_lock:
+            entries = self.user_lists[user_fingerprint]
+            changed: list[tuple[str, ListType | None]] = []
+            for creator_id, list_type in operations:
+                if entries.get(creator_id) == list_type:
+                    continue
+                if list_type is None:
+                    del entries[creator_id]
+                else:
+                    entries[creator_id] = list_type
+                changed.append((creator_id, list_type))
+            if changed:
+                self._log_list_changes_locked(user_fingerprint, changed)
+            return self.list_versions[user_fingerprint]
+
+    def get_list_changes(self, user_fingerprint: str, since: int) -> tuple[list[ListChange] | None, int]:
+        """Changes after list version ``since``, oldest first, and the current version.
+
+        The changes are None when ``since`` predates the retained change log
+        (or is ahead of the current version), so the caller has to resync from
+        the full list instead.
+        """
+        with self._lists_lock:
+            version = self.list_versions.get(user_fingerprint, 0)
+            if since > version or since < self.list_log_floors.get(user_fingerprint, 0):
+                return None, version
+            changes = self.list_changes.get(user_fingerprint, [])
+            return changes[bisect_right(changes, since, key=lambda change: change.version) :], version
+
+    def _log_list_changes_locked(self, user_fingerprint: str, changed: list[tuple[str, ListType | None]]):
+        self.list_versions[user_fingerprint] += 1
+        version = self.list_versions[user_fingerprint]
+        changes = self.list_changes[user_fingerprint]
+        changes.extend(ListChange(version, creator_id, list_type) for creator_id, list_type in changed)
+        # Drop the older half once the log outgrows the list, so it stays
+        # O(list size) in memory and appends stay amortized O(1).
+        limit = max(MIN_LIST_LOG_PER_USER, 2 * len(self.user_lists[user_fingerprint]))
+        if len(changes) > limit:
+            cut = len(changes) // 2
+            self.list_log_floors[user_fingerprint] = changes[cut - 1].version
+            del changes[:cut]
 
     def get_creator_list_value(self, user_fingerprint: str, creator_id: str) -> ListType | None:
-        return self.user_lists[user_fingerprint].get(creator_id)
+        return self.user_lists.get(user_fingerprint, {}).get(creator_id)
 
     def upsert_vote(self, content_id: str, user_fingerprint: str, vote: VoteType, weight: float):
         self.community_votes[content_id][user_fingerprint] = CommunityVote(
@@ -58,15 +156,94 @@ class MemoryStore:
     def get_votes_for_content(self, content_id: str) -> list[CommunityVote]:
         return list(self.community_votes[content_id].values())
 
-    def add_scan_history(self, content_id: str, user_fingerprint: str, payload: dict):
-        self.scan_history_by_user[user_fingerprint].insert(
-            0,
-            ScanRecord(content_id=content_id, user_fingerprint=user_fingerprint, payload=payload),
-        )
-        self.scan_history_by_user[user_fingerprint] = self.scan_history_by_user[user_fingerprint][:100]
-
-    def get_user_history(self, user_fingerprint: str) -> list[dict]:
-        return [record.payload for record in self.scan_history_by_user[user_fingerprint]]
+    def add_scan_history(self, content_id: str, user_fingerprint: str, creator_id: str, payload_json: bytes):
+        # Bump and append together, so sequences stay unique and sorted for bisect.
+        with self._history_lock:
+            self.history_versions[user_fingerprint] += 1
+            records = self.scan_history_by_user[user_fingerprint]
+            records.append(
+                ScanRecord(
+                    content_id=content_id,
+                    user_fingerprint=user_fingerprint,
+                    creator_id=creator_id,
+                    payload_json=payload_json,
+                    sequence=self.history_versions[user_fingerprint],
+                )
+            )
+            if len(records) > MAX_HISTORY_PER_USER:
+                del records[: len(records) - MAX_HISTORY_PER_USER]
+
+    def get_history_version(self, user_fingerprint: str) -> int:
+        with self._history_lock:
+            return self.history_versions.get(user_fingerprint, 0)
+
+    def get_user_history(
+        self,
+        user_fingerprint: str,
+        limit: int | None = None,
+        before: int | None = None,
+        since: int | None = None,
+    ) -> tuple[list[bytes], int | None, int]:
+        """Newest-first page of history, the cursor for the next page (None on the last page)
+        and the history version the page was read at.
+
+        ``before`` is an exclusive sequence cursor from a previous page; ``since``
+        keeps only entries added after that history version.
+        """
+        with self._history_lock:
+            version = self.history_versions.get(user_fingerprint, 0)
+            records = self.scan_history_by_user.get(user_fingerprint, [])
+            end = bisect_left(records, before, key=lambda record: record.sequence) if before is not None else len(records)
+            start = bisect_right(records, since, key=lambda record: record.sequence) if since is not None else 0
+            if limit is not None and end - start > limit:
+                start = end - limit
+                next_cursor = records[start].sequence
+            else:
+                next_cursor = None
+            page = records[start:end]
+        return [record.payload_json for record in reversed(page)], next_cursor, version
+
+    def set_model_result(self, content_id: str, result: dict):
+        with self._model_results_lock:
+            self.model_results[content_id] = (result, time.monotonic())
+            self.model_results.move_to_end(content_id)
+            while len(self.model_results) > MAX_MODEL_RESULTS:
+                self.model_results.popitem(last=False)
+
+    def get_model_result(self, content_id: str) -> dict | None:
+        with self._model_results_lock:
+            entry = self.model_results.get(content_id)
+            if entry is None:
+                return None
+            result, stored_at = entry
+            if time.monotonic() - stored_at > MODEL_RESULT_TTL_SECONDS:
+                del self.model_results[content_id]
+                return None
+            self.model_results.move_to_end(content_id)
+            return result
+
+    def register_model_job(self, job_id: str, content_id: str):
+        self.pending_model_jobs[job_id] = content_id
+        self.pending_model_jobs.move_to_end(job_id)
+        while len(self.pending_model_jobs) > MAX_PENDING_MODEL_JOBS:
+            self.pending_model_jobs.popitem(last=False)
+
+    def claim_model_job(self, job_id: str, content_id: str) -> bool:
+        """True (once) if this backend submitted ``job_id`` for ``content_id``."""
+        if self.pending_model_jobs.get(job_id) != content_id:
+            return False
+        del self.pending_model_jobs[job_id]
+        return True
+
+    def creator_counts(self) -> Counter[str]:
+        """How often each creator appears across all users' lists and scan history."""
+        # Snapshots with list() so a background reader does not trip over requests mutating the dicts.
+        counts: Counter[str] = Counter()
+        for entries in list(self.user_lists.values()):
+            counts.update(list(entries))
+        for records in list(self.scan_history_by_user.values()):
+            counts.update(record.creator_id for record in list(records))
+        return counts
 
 
 store = MemoryStore()
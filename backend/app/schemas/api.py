@@ -1,6 +1,6 @@
 from datetime import datetime
 from typing import Literal
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 Verdict = Literal["likely_ai", "unclear", "likely_human"]
@@ -14,6 +14,7 @@ class ScanRequest(BaseModel):
     url: str = Field(min_length=3)
     userFingerprint: str = Field(min_length=3)
     conservativeMode: bool = True
+    debug: bool = False
 
 
 class EvidenceItem(BaseModel):
@@ -22,6 +23,12 @@ class EvidenceItem(BaseModel):
     strength: ConfidenceBand
 
 
+class ScanDebugInfo(BaseModel):
+    traceId: str
+    traceSampled: bool
+    timingsMs: dict[str, float]
+
+
 class ScanResponse(BaseModel):
     contentId: str
     platform: str
@@ -38,6 +45,7 @@ class ScanResponse(BaseModel):
     rawModelScore: float | None = None
     evidence: list[EvidenceItem]
     scannedAt: datetime
+    debug: ScanDebugInfo | None = None
 
 
 class VoteRequest(BaseModel):
@@ -62,3 +70,53 @@ class CreatorListEntry(BaseModel):
 
 class UpdateListResponse(BaseModel):
     ok: bool
+    # List version after the change, so clients can sync deltas from it.
+    version: int | None = None
+
+
+class ListOperation(BaseModel):
+    op: Literal["set", "remove"]
+    creatorId: str = Field(min_length=1)
+    listType: ListType | None = None
+
+    @model_validator(mode="after")
+    def require_list_type_for_set(self):
+        if self.op == "set" and self.listType is None:
+            raise ValueError("listType is required for set operations")
+        return self
+
+
+class ListBatchRequest(BaseModel):
+    userFingerprint: str = Field(min_length=3)
+    operations: list[ListOperation] = Field(min_length=1, max_length=500)
+
+
+class ListChangeEntry(BaseModel):
+    creatorId: str
+    # None means the creator was removed from the list.
+    listType: ListType | None
+
+class ListChangesResponse(BaseModel):
+    version: int
+    epoch: str
+    # True when changes is the full list and replaces the client's copy.
+    reset: bool
+    changes: list[ListChangeEntry]
+
+
+class ModelInferenceResult(BaseModel):
+    score: float = Field(ge=0.0, le=1.0)
+    confidenceBand: Literal["low", "medium", "high"]
+    reason: str = ""
+    # True when the model service fell back to its URL heuristic.
+    fallback: bool = False
+
+
+class ModelJobCallback(BaseModel):
+    jobId: str = Field(min_length=1)
+    status: Literal["queued", "running", "done", "failed"]
+    result: ModelInferenceResult | None = None
+
+
+class ModelCallbackAck(BaseModel):
+    ok: bool
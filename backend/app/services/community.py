@@ -3,7 +3,11 @@ from dataclasses import dataclass
 import requests
 
 from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import trace_stage
+from app.db.channel_index import channel_index
 from app.db.memory_store import store
+from app.services.youtube_client import youtube
 
 
 @dataclass
@@ -21,47 +25,48 @@ def get_user_vote_weight(user_fingerprint: str) -> float:
     return 1.0
 
 
-def _channel_id_to_handle(channel_id, api_key):
-    r = requests.get(
-        "https://www.googleapis.com/youtube/v3/channels",
-        params={
-            "part": "snippet",
-            "id": channel_id,
-            "key": api_key
-        }
-    )
-    data = r.json()
-    if not data.get("items"):
+def _channel_id_to_handle(channel_id):
+    # Handles seen by any earlier lookup survive restarts in the channel index.
+    handle = channel_index.handle_for_channel(channel_id)
+    record_cache_lookup("channel_handle_index", handle is not None)
+    if handle is not None:
+        return handle
+    with trace_stage("youtube_community_channels"):
+        channel = youtube.get_channel(channel_id)
+    if channel is None:
         return None
-    return data["items"][0]["snippet"].get("customUrl")
+    return channel["snippet"].get("customUrl")
 
 def get_community_signal(content_id: str) -> CommunitySignal:
     inBlockList = False
     inWarnList = False
     if ('youtube' in content_id) and settings.youtube_api_key:
-        endpoint = "https://www.googleapis.com/youtube/v3/videos"
-        params = {"part": "status,snippet", "id": content_id.split(':')[-1], "key": settings.youtube_api_key}
-
+        video_id = content_id.split(':')[-1]
+        channelId = channel_index.channel_for_video(video_id)
+        if channelId is None:
+            try:
+                with trace_stage("youtube_community_videos"):
+                    video = youtube.get_video(video_id)
+            except Exception:
+                video = None
+
+            snip = (video or {}).get("snippet", {})
+            channelId = snip.get('channelId')
         try:
-            response = requests.get(endpoint, params=params, timeout=5)
-            response.raise_for_status()
-            payload = response.json()
+            handle = _channel_id_to_handle(channelId) if channelId else None
         except Exception:
-            pass
-
-        items = payload.get("items", [])
-
-        snip = items[0].get("snippet", {})
-        channelId = snip['channelId']
-        handle = _channel_id_to_handle(channelId, settings.youtube_api_key)
+            # QuotaExhausted with nothing stale cached, or an API error: score without the handle.
+            handle = None
 
-        blocklist = requests.get("https://raw.githubusercontent.com/Override92/AiSList/refs/heads/main/AiSList/aislist_blocklist.txt")
+        with trace_stage("aislist_fetch"):
+            blocklist = requests.get(f"{settings.aislist_base_url}/aislist_blocklist.txt")
         blocklist_parser = [i.lower() for i in blocklist.text.splitlines()]
 
         if handle in blocklist_parser:
             inBlockList = True
         else:
-            warnlist = requests.get("https://raw.githubusercontent.com/Override92/AiSList/refs/heads/main/AiSList/aislist_warnlist.txt")
+            with trace_stage("aislist_fetch"):
+                warnlist = requests.get(f"{settings.aislist_base_url}/aislist_warnlist.txt")
             warnlist_parser = [i.lower() for i in warnlist.text.splitlines()]
 
             if handle in warnlist_parser:
@@ -1,8 +1,13 @@
+import time
 from dataclasses import dataclass
+from urllib.parse import quote
 
 import requests
 
 from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import trace_headers, trace_stage
+from app.db.memory_store import store
 from app.services.url_parser import ParsedContent
 
 
@@ -13,34 +18,146 @@ class ModelSignal:
     strength: str
 
 
+class ModelJobPending(Exception):
+    pass
+
+
+class ModelServiceBusy(Exception):
+    pass
+
+
+class ModelFallback(Exception):
+    pass
+
+
 def _looks_like_image(url: str) -> bool:
     lower = url.lower()
     return lower.endswith((".jpg", ".jpeg", ".png", ".webp"))
 
 
-def get_model_signal(parsed_content: ParsedContent) -> ModelSignal:
-    endpoint = "/infer-image" if _looks_like_image(parsed_content.normalized_url) else "/infer-video"
-    payload = (
-        {"imageUrl": parsed_content.normalized_url}
-        if endpoint == "/infer-image"
-        else {"videoUrl": parsed_content.normalized_url}
+def is_fallback(body: dict) -> bool:
+    """True for URL-heuristic scores the model service returns when inference failed.
+
+    Those must not be cached: a transient download or model-load failure would
+    otherwise pin a heuristic score on the content for the cache TTL.
+    """
+    return bool(body.get("fallback"))
+
+
+def _signal_from_body(body: dict) -> ModelSignal:
+    score = float(body.get("score", 0.5))
+    score = max(0.0, min(1.0, score))
+    confidence_band = body.get("confidenceBand", "low")
+    return ModelSignal(
+        score=score,
+        message=f"Model score {score:.2f} ({confidence_band}).",
+        strength=confidence_band,
     )
 
-    try:
-        response = requests.post(
-            f"{settings.model_service_url}{endpoint}",
-            json=payload,
-            timeout=settings.model_timeout_seconds,
+
+def _raise_for_status(response: requests.Response):
+    if response.status_code == 429:
+        raise ModelServiceBusy(response.headers.get("Retry-After", ""))
+    response.raise_for_status()
+
+
+def _infer_image(parsed_content: ParsedContent) -> dict:
+    response = requests.post(
+        f"{settings.model_service_url}/infer-image",
+        json={"imageUrl": parsed_content.normalized_url},
+        headers=trace_headers(),
+        timeout=settings.model_timeout_seconds,
+    )
+    _raise_for_status(response)
+    return response.json()
+
+
+def _infer_video_job(parsed_content: ParsedContent, timeout_seconds: float | None = None) -> dict:
+    # Video inference regularly outlives the request budget, so it runs as a
+    # model-service job. The service deduplicates jobs per URL and keeps
+    # finished results, so a later scan (or the push callback) picks up the
+    # score instead of discarding the work.
+    deadline = time.monotonic() + (timeout_seconds or settings.model_timeout_seconds)
+    payload = {"videoUrl": parsed_content.normalized_url}
+    if settings.model_callback_url:
+        payload["callbackUrl"] = (
+            f"{settings.model_callback_url}?contentId={quote(parsed_content.content_id, safe='')}"
+        )
+
+    response = requests.post(
+        f"{settings.model_service_url}/jobs/infer-video",
+        json=payload,
+        headers=trace_headers(),
+        timeout=settings.model_timeout_seconds,
+    )
+    _raise_for_status(response)
+    job = response.json()
+    if "callbackUrl" in payload:
+        store.register_model_job(job["jobId"], parsed_content.content_id)
+
+    while job["status"] in {"queued", "running"}:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise ModelJobPending(job["jobId"])
+        time.sleep(min(settings.model_job_poll_interval_seconds, remaining))
+        response = requests.get(
+            f"{settings.model_service_url}/jobs/{job['jobId']}",
+            headers=trace_headers(),
+            timeout=max(1.0, remaining),
         )
         response.raise_for_status()
-        body = response.json()
-        score = float(body.get("score", 0.5))
-        score = max(0.0, min(1.0, score))
-        confidence_band = body.get("confidenceBand", "low")
+        job = response.json()
+
+    if job["status"] != "done" or job.get("result") is None:
+        raise RuntimeError(job.get("error") or "Model job failed.")
+    return job["result"]
+
+
+def prefetch_model_result(parsed_content: ParsedContent, timeout_seconds: float) -> bool:
+    """Scores content outside a scan and caches the result; False if it was cached already.
+
+    Busy, pending and failure exceptions propagate so the caller can stop or skip;
+    a heuristic fallback score is not cached and raises ModelFallback.
+    """
+    if store.get_model_result(parsed_content.content_id) is not None:
+        return False
+    with trace_stage("warmup_model_http"):
+        if _looks_like_image(parsed_content.normalized_url):
+            body = _infer_image(parsed_content)
+        else:
+            body = _infer_video_job(parsed_content, timeout_seconds)
+    if is_fallback(body):
+        raise ModelFallback(body.get("reason", ""))
+    store.set_model_result(parsed_content.content_id, body)
+    return True
+
+
+def get_model_signal(parsed_content: ParsedContent) -> ModelSignal:
+    cached = store.get_model_result(parsed_content.content_id)
+    record_cache_lookup("model_result", cached is not None)
+    if cached is not None:
+        return _signal_from_body(cached)
+
+    try:
+        with trace_stage("model_http"):
+            if _looks_like_image(parsed_content.normalized_url):
+                body = _infer_image(parsed_content)
+            else:
+                body = _infer_video_job(parsed_content)
+        if not is_fallback(body):
+            store.set_model_result(parsed_content.content_id, body)
+        return _signal_from_body(body)
+    except ModelServiceBusy:
         return ModelSignal(
-            score=score,
-            message=f"Model score {score:.2f} ({confidence_band}).",
-            strength=confidence_band,
+            score=0.5,
+            message="Model service is busy, using neutral model score.",
+            strength="low",
+        )
+    except ModelJobPending:
+        return ModelSignal(
+            score=0.5,
+            message="Model analysis still running, using neutral model score for now.",
+            strength="low",
         )
     except Exception:
         return ModelSignal(
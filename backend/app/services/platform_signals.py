@@ -1,10 +1,10 @@
 from dataclasses import dataclass
 from typing import Literal
 
-import requests
-
 from app.core.config import settings
+from app.core.tracing import trace_stage
 from app.services.url_parser import ParsedContent
+from app.services.youtube_client import youtube
 
 SignalStrength = Literal["high", "medium", "low"]
 
@@ -16,21 +16,6 @@ class PlatformSignal:
     strength: SignalStrength
 
 
-
-def _channel_id_to_handle(channel_id, api_key):
-    r = requests.get(
-        "https://www.googleapis.com/youtube/v3/channels",
-        params={
-            "part": "snippet",
-            "id": channel_id,
-            "key": api_key
-        }
-    )
-    data = r.json()
-    if not data.get("items"):
-        return None
-    return data["items"][0]["snippet"].get("customUrl")
-
 def _youtube_synthetic_signal(video_id: str) -> PlatformSignal:
     if not settings.youtube_api_key:
         return PlatformSignal(
@@ -39,13 +24,9 @@ def _youtube_synthetic_signal(video_id: str) -> PlatformSignal:
             strength="low",
         )
 
-    endpoint = "https://www.googleapis.com/youtube/v3/videos"
-    params = {"part": "status,snippet", "id": video_id, "key": settings.youtube_api_key}
-
     try:
-        response = requests.get(endpoint, params=params, timeout=5)
-        response.raise_for_status()
-        payload = response.json()
+        with trace_stage("youtube_platform_videos"):
+            video = youtube.get_video(video_id)
     except Exception:
         return PlatformSignal(
             score=0.5,
@@ -53,19 +34,14 @@ def _youtube_synthetic_signal(video_id: str) -> PlatformSignal:
             strength="low",
         )
 
-    items = payload.get("items", [])
-    if not items:
+    if video is None:
         return PlatformSignal(
             score=0.5,
             message="No YouTube metadata found for this content.",
             strength="low",
         )
 
-    snip = items[0].get("snippet", {})
-    channelId = snip['channelId']
-    handle = _channel_id_to_handle(channelId, settings.youtube_api_key)
-
-    status = items[0].get("status", {})
+    status = video.get("status", {})
     contains_synthetic = status.get("containsSyntheticMedia")
     if contains_synthetic is True:
         return PlatformSignal(
@@ -1,16 +1,86 @@
 from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Hashable, TypeVar
 
+from app.core.metrics import record_cache_lookup
+from app.core.singleflight import SingleFlight
+from app.core.tracing import collect_stage_timings, current_trace, record_stage_timing, trace_stage
 from app.db.memory_store import store
-from app.schemas.api import EvidenceItem, ScanResponse
-from app.services.community import get_community_signal
-from app.services.model_client import get_model_signal
-from app.services.platform_signals import get_platform_signal
+from app.schemas.api import EvidenceItem, ScanDebugInfo, ScanResponse
+from app.services.community import CommunitySignal, get_community_signal
+from app.services.model_client import ModelSignal, get_model_signal
+from app.services.platform_signals import PlatformSignal, get_platform_signal
 from app.services.scoring import calculate_final_score, decide_verdict
-from app.services.url_parser import parse_content
+from app.services.url_canonical import canonicalize
+from app.services.url_parser import ParsedContent, parse_content
 
-def run_scan(url: str, user_fingerprint: str, conservative_mode: bool = True) -> ScanResponse:
-    parsed = parse_content(url)
-    user_list_value = store.get_creator_list_value(user_fingerprint, parsed.creator_id)
+T = TypeVar("T")
+
+# Concurrent scans of the same URL / content share one parse and one signal
+# fetch. Only user-independent work is coalesced: list overlays, conservative
+# mode and history stay per caller.
+_parse_flights = SingleFlight()
+_signal_flights = SingleFlight()
+
+
+def _coalesced(flights: SingleFlight, name: str, key: Hashable, fn: Callable[[], T]) -> T:
+    started = perf_counter()
+    result, shared = flights.do(key, fn)
+    # A "hit" is a scan that joined a computation already in flight.
+    record_cache_lookup(name, shared)
+    if shared:
+        # The leader's stages are timed in its own request; followers report the wait instead.
+        record_stage_timing(f"{name}_wait", perf_counter() - started)
+    return result
+
+
+def _fetch_signals(parsed: ParsedContent) -> tuple[PlatformSignal, CommunitySignal, ModelSignal]:
+    return get_platform_signal(parsed), get_community_signal(parsed.content_id), get_model_signal(parsed)
+
+
+def run_scan(
+    url: str,
+    user_fingerprint: str,
+    conservative_mode: bool = True,
+    debug: bool = False,
+) -> bytes:
+    """Runs a scan and returns the ScanResponse as JSON bytes."""
+    with collect_stage_timings(enabled=debug) as timings:
+        response, payload_json = _run_scan(url, user_fingerprint, conservative_mode)
+
+    if timings is not None:
+        # Attached after the history entry is stored, so history stays debug-free;
+        # only debug responses are serialized a second time.
+        trace_id, sampled = current_trace()
+        response.debug = ScanDebugInfo(
+            traceId=trace_id,
+            traceSampled=sampled,
+            timingsMs={stage: round(seconds * 1000, 2) for stage, seconds in timings.items()},
+        )
+        return response.model_dump_json().encode()
+    return payload_json
+
+
+def _record_history(response: ScanResponse, user_fingerprint: str) -> tuple[ScanResponse, bytes]:
+    # Serialized once here; the scan response and history reads reuse these bytes.
+    payload_json = response.model_dump_json().encode()
+    store.add_scan_history(response.contentId, user_fingerprint, response.creatorId, payload_json)
+    return response, payload_json
+
+
+def _run_scan(url: str, user_fingerprint: str, conservative_mode: bool) -> tuple[ScanResponse, bytes]:
+    # Keyed on the canonical URL: shares of one video differ in tracking params (si=, igsh=, utm_*).
+    canonical = canonicalize(url)
+    parsed = _coalesced(
+        _parse_flights, "scan_inflight_parse", canonical.url, lambda: parse_content(url, canonical)
+    )
+    # An unresolved creator ("<platform>_creator_undefined") stands for many unrelated
+    # ones, so allow/block lists never apply to it.
+    user_list_value = (
+        None
+        if parsed.creator_id.endswith("_undefined")
+        else store.get_creator_list_value(user_fingerprint, parsed.creator_id)
+    )
 
     evidence: list[EvidenceItem] = []
 
@@ -36,8 +106,7 @@ def run_scan(url: str, user_fingerprint: str, conservative_mode: bool = True) ->
             ],
             scannedAt=datetime.now(timezone.utc),
         )
-        store.add_scan_history(response.contentId, user_fingerprint, response.model_dump())
-        return response
+        return _record_history(response, user_fingerprint)
 
     if user_list_value == "block":
         response = ScanResponse(
@@ -61,12 +130,11 @@ def run_scan(url: str, user_fingerprint: str, conservative_mode: bool = True) ->
             ],
             scannedAt=datetime.now(timezone.utc),
         )
-        store.add_scan_history(response.contentId, user_fingerprint, response.model_dump())
-        return response
+        return _record_history(response, user_fingerprint)
 
-    platform_signal = get_platform_signal(parsed)
-    community_signal = get_community_signal(parsed.content_id)
-    model_signal = get_model_signal(parsed)
+    platform_signal, community_signal, model_signal = _coalesced(
+        _signal_flights, "scan_inflight_signals", parsed.content_id, lambda: _fetch_signals(parsed)
+    )
 
     evidence.append(
         EvidenceItem(
@@ -101,19 +169,20 @@ def run_scan(url: str, user_fingerprint: str, conservative_mode: bool = True) ->
         )
     )
 
-    final_score = calculate_final_score(
-        platform_score=platform_signal.score,
-        community_score=community_signal.score,
-        model_score=model_signal.score,
-    )
-    platform_unavailable = platform_signal.score == 0.5 and platform_signal.strength == "low"
-    no_community_votes = not community_signal.has_votes
-    low_signal_mode = platform_unavailable and no_community_votes
-    verdict, confidence_band = decide_verdict(
-        final_score,
-        conservative_mode=conservative_mode,
-        low_signal_mode=low_signal_mode,
-    )
+    with trace_stage("aggregate"):
+        final_score = calculate_final_score(
+            platform_score=platform_signal.score,
+            community_score=community_signal.score,
+            model_score=model_signal.score,
+        )
+        platform_unavailable = platform_signal.score == 0.5 and platform_signal.strength == "low"
+        no_community_votes = not community_signal.has_votes
+        low_signal_mode = platform_unavailable and no_community_votes
+        verdict, confidence_band = decide_verdict(
+            final_score,
+            conservative_mode=conservative_mode,
+            low_signal_mode=low_signal_mode,
+        )
 
     response = ScanResponse(
         contentId=parsed.content_id,
@@ -131,5 +200,4 @@ def run_scan(url: str, user_fingerprint: str, conservative_mode: bool = True) ->
         scannedAt=datetime.now(timezone.utc),
     )
 
-    store.add_scan_history(response.contentId, user_fingerprint, response.model_dump())
-    return response
+    return _record_history(response, user_fingerprint)
@@ -0,0 +1,209 @@
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import trace_stage
+
+# Query parameters that only track the share/referrer and never select different content.
+TRACKING_PARAMS = {
+    "fbclid", "gclid", "dclid", "msclkid", "mc_cid", "mc_eid", "igshid", "igsh", "si", "feature", "pp",
+    "is_from_webapp", "sender_device", "sender_web_id", "share_app_id", "share_link_id", "social_sharing",
+    "_r", "_t", "ref", "ref_src", "ref_url",
+}
+TRACKING_PREFIXES = ("utm_",)
+
+YOUTUBE_ID = re.compile(r"^[A-Za-z0-9_-]{11}$")
+INSTAGRAM_CODE = re.compile(r"^[A-Za-z0-9_-]{5,40}$")
+TIKTOK_ID = re.compile(r"^\d{8,25}$")
+
+
+@dataclass(frozen=True)
+class CanonicalUrl:
+    platform: str
+    # None when the URL is on a known platform but no content id could be extracted.
+    content_id: str | None
+    url: str
+    # Owner handle when the URL itself names it (TikTok @user, Instagram /<username>/p/ paths).
+    owner: str | None = None
+
+
+@dataclass(frozen=True)
+class HostRule:
+    platform: str
+    extract: Callable[[list[str], dict[str, str]], tuple[str, str | None] | None]
+    canonical_url: Callable[[str, str | None], str]
+    # Share links that only redirect to the real content URL.
+    is_short_link: Callable[[list[str]], bool] = lambda segments: False
+
+
+def _youtube_extract(segments: list[str], query: dict[str, str]) -> tuple[str, str | None] | None:
+    candidate = None
+    if segments[:1] == ["watch"]:
+        candidate = query.get("v")
+    elif len(segments) >= 2 and segments[0] in {"shorts", "live", "embed", "v", "e"}:
+        candidate = segments[1]
+    return (candidate, None) if candidate and YOUTUBE_ID.match(candidate) else None
+
+
+def _youtu_be_extract(segments: list[str], query: dict[str, str]) -> tuple[str, str | None] | None:
+    return (segments[0], None) if segments and YOUTUBE_ID.match(segments[0]) else None
+
+
+def _instagram_extract(segments: list[str], query: dict[str, str]) -> tuple[str, str | None] | None:
+    # /p/<code>, /reel/<code>, /reels/<code>, /tv/<code>, optionally after /<username>/.
+    for index, segment in enumerate(segments[:-1]):
+        if segment in {"p", "reel", "reels", "tv"} and INSTAGRAM_CODE.match(segments[index + 1]):
+            return segments[index + 1], segments[0] if index == 1 else None
+    return None
+
+
+def _tiktok_extract(segments: list[str], query: dict[str, str]) -> tuple[str, str | None] | None:
+    owner = segments[0][1:] if segments and segments[0].startswith("@") and len(segments[0]) > 1 else None
+    for index, segment in enumerate(segments[:-1]):
+        if segment in {"video", "photo", "v", "embed", "v2"}:
+            candidate = segments[index + 1].removesuffix(".html")
+            if TIKTOK_ID.match(candidate):
+                return candidate, owner
+    return None
+
+
+YOUTUBE_RULE = HostRule(
+    platform="youtube",
+    extract=_youtube_extract,
+    canonical_url=lambda content_id, owner: f"https://www.youtube.com/watch?v={content_id}",
+)
+INSTAGRAM_RULE = HostRule(
+    platform="instagram",
+    extract=_instagram_extract,
+    canonical_url=lambda content_id, owner: f"https://www.instagram.com/p/{content_id}/",
+    is_short_link=lambda segments: segments[:1] == ["share"],
+)
+TIKTOK_RULE = HostRule(
+    platform="tiktok",
+    extract=_tiktok_extract,
+    # TikTok (and yt-dlp) accept an empty "@" when the owner is not in the URL.
+    canonical_url=lambda content_id, owner: f"https://www.tiktok.com/@{owner or ''}/video/{content_id}",
+    is_short_link=lambda segments: segments[:1] == ["t"],
+)
+
+# Matched on the host without "www." and then on each parent domain, so
+# "m.youtube.com" and "music.youtube.com" fall through to "youtube.com".
+HOST_RULES: dict[str, HostRule] = {
+    "youtube.com": YOUTUBE_RULE,
+    "youtube-nocookie.com": YOUTUBE_RULE,
+    "youtu.be": HostRule(platform="youtube", extract=_youtu_be_extract, canonical_url=YOUTUBE_RULE.canonical_url),
+    "instagram.com": INSTAGRAM_RULE,
+    "instagr.am": INSTAGRAM_RULE,
+    "tiktok.com": TIKTOK_RULE,
+    "vm.tiktok.com": HostRule(
+        platform="tiktok", extract=_tiktok_extract, canonical_url=TIKTOK_RULE.canonical_url,
+        is_short_link=lambda segments: True,
+    ),
+    "vt.tiktok.com": HostRule(
+        platform="tiktok", extract=_tiktok_extract, canonical_url=TIKTOK_RULE.canonical_url,
+        is_short_link=lambda segments: True,
+    ),
+}
+
+
+def _follow_redirects(url: str) -> str | None:
+    with trace_stage("short_link_resolve"):
+        response = requests.get(url, allow_redirects=True, stream=True, timeout=3)
+        response.close()
+    return response.url if response.ok else None
+
+
+class ShortLinkResolver:
+    """LRU cache in front of redirect resolution for share links.
+
+    ``fetch`` maps a short link to its final URL (or None); swap it for a dict
+    lookup to canonicalize offline. Failures are not cached.
+    """
+
+    def __init__(self, fetch: Callable[[str], str | None] = _follow_redirects, max_entries: int = 10_000):
+        self.fetch = fetch
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._cache: OrderedDict[str, str] = OrderedDict()
+
+    def resolve(self, url: str) -> str | None:
+        with self._lock:
+            target = self._cache.get(url)
+            if target is not None:
+                self._cache.move_to_end(url)
+        record_cache_lookup("short_link", target is not None)
+        if target is not None:
+            return target
+        try:
+            target = self.fetch(url)
+        except Exception:
+            return None
+        if target:
+            with self._lock:
+                self._cache[url] = target
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return target
+
+
+short_links = ShortLinkResolver()
+
+
+def _host_rule(host: str) -> HostRule | None:
+    host = host.removeprefix("www.")
+    while host:
+        rule = HOST_RULES.get(host)
+        if rule is not None:
+            return rule
+        _, _, host = host.partition(".")
+    return None
+
+
+def strip_tracking(url: str) -> str:
+    """Lowercases scheme/host, drops tracking parameters and the fragment, and sorts the rest."""
+    parts = urlsplit(_with_scheme(url))
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((parts.scheme.lower() or "https", parts.netloc.lower(), parts.path, urlencode(query), ""))
+
+
+def _with_scheme(url: str) -> str:
+    # Shared links are often pasted without a scheme ("youtu.be/...").
+    url = url.strip()
+    return url if "//" in url else f"https://{url}"
+
+
+def canonicalize(url: str, _depth: int = 0) -> CanonicalUrl:
+    rule = _host_rule(urlsplit(_with_scheme(url)).hostname or "")
+    if rule is None:
+        # Unknown hosts pass through untouched: signed or parameter-order
+        # sensitive media URLs break if their query is rewritten.
+        return CanonicalUrl(platform="other", content_id=None, url=url)
+
+    cleaned = strip_tracking(url)
+    parts = urlsplit(cleaned)
+    segments = [segment for segment in parts.path.split("/") if segment]
+    if rule.is_short_link(segments):
+        # Share codes look like content ids (/share/reel/<code>) but are not, so
+        # only the redirect target is trusted.
+        target = short_links.resolve(cleaned) if _depth < 2 else None
+        if target:
+            resolved = canonicalize(target, _depth + 1)
+            if resolved.platform == rule.platform and resolved.content_id is not None:
+                return resolved
+        return CanonicalUrl(platform=rule.platform, content_id=None, url=cleaned)
+
+    extracted = rule.extract(segments, dict(parse_qsl(parts.query)))
+    if extracted is None:
+        return CanonicalUrl(platform=rule.platform, content_id=None, url=cleaned)
+    content_id, owner = extracted
+    return CanonicalUrl(rule.platform, content_id, rule.canonical_url(content_id, owner), owner)
@@ -1,9 +1,13 @@
 from dataclasses import dataclass
 from hashlib import sha1
-from urllib.parse import parse_qs, urlparse
-import requests
+from urllib.parse import urlparse
 
 from app.core.config import settings
+from app.core.metrics import record_cache_lookup
+from app.core.tracing import trace_stage
+from app.db.channel_index import channel_index
+from app.services.url_canonical import CanonicalUrl, canonicalize
+from app.services.youtube_client import youtube
 
 
 @dataclass
@@ -18,52 +22,26 @@ class ParsedContent:
         return f"{self.platform}:{self.canonical_id}"
 
 
-def _youtube_id(url: str) -> str | None:
-    parsed = urlparse(url)
-    host = parsed.netloc.lower()
-    path = parsed.path.strip("/")
-    query = parse_qs(parsed.query)
+def parse_content(url: str, canonical: CanonicalUrl | None = None) -> ParsedContent:
+    """Pass ``canonical`` when the caller already canonicalized ``url``."""
+    with trace_stage("url_parse"):
+        return _parse_content(canonical or canonicalize(url))
 
-    if "youtu.be" in host and path:
-        return path.split("/")[0]
 
-    if "youtube.com" in host:
-        if path == "watch" and query.get("v"):
-            return query["v"][0]
-        if path.startswith("shorts/"):
-            return path.split("/")[1]
-        if path.startswith("live/"):
-            return path.split("/")[1]
+def _parse_content(canonical: CanonicalUrl) -> ParsedContent:
+    fallback_id = sha1(canonical.url.encode("utf-8")).hexdigest()[:16]
 
-    return None
-
-
-def parse_content(url: str) -> ParsedContent:
-    parsed = urlparse(url)
-    host = parsed.netloc.lower()
-
-    if "youtube.com" in host or "youtu.be" in host:
-        video_id = _youtube_id(url) or sha1(url.encode("utf-8")).hexdigest()[:16]
-        channelId = "undefined"
-        if settings.youtube_api_key:
+    if canonical.platform == "youtube":
+        video_id = canonical.content_id or fallback_id
+        channelId = channel_index.channel_for_video(video_id) or "undefined"
+        record_cache_lookup("channel_index", channelId != "undefined")
+        if channelId == "undefined" and settings.youtube_api_key:
             try:
-                api_get = requests.get(
-                    "https://www.googleapis.com/youtube/v3/videos",
-                    params={
-                        "part": "snippet",
-                        "id": video_id,
-                        "key": settings.youtube_api_key,
-                    },
-                    timeout=5,
-                )
-                api_get.raise_for_status()
-                api_json = api_get.json()
-                for item in api_json.get("items", []):
-                    snippet = item.get("snippet", {})
-                    candidate = snippet.get("channelId")
-                    if candidate:
-                        channelId = candidate
-                        break
+                with trace_stage("youtube_parser_videos"):
+                    video = youtube.get_video(video_id)
+                candidate = (video or {}).get("snippet", {}).get("channelId")
+                if candidate:
+                    channelId = candidate
             except Exception:
                 # Keep parsing resilient even if YouTube API lookup fails.
                 channelId = "undefined"
@@ -71,31 +49,24 @@ def parse_content(url: str) -> ParsedContent:
             platform="youtube",
             canonical_id=video_id,
             creator_id=f"youtube_creator_{channelId}",
-            normalized_url=url,
-        )
-
-    if "instagram.com" in host:
-        short_id = parsed.path.strip("/").replace("/", "_") or sha1(url.encode("utf-8")).hexdigest()[:16]
-        return ParsedContent(
-            platform="instagram",
-            canonical_id=short_id,
-            creator_id=f"instagram_creator_{short_id[:8]}",
-            normalized_url=url,
+            normalized_url=canonical.url,
         )
 
-    if "tiktok.com" in host:
-        short_id = parsed.path.strip("/").replace("/", "_") or sha1(url.encode("utf-8")).hexdigest()[:16]
+    if canonical.platform in {"instagram", "tiktok"}:
+        # Profile pages and unresolved share links keep the old path-based id.
+        short_id = canonical.content_id or urlparse(canonical.url).path.strip("/").replace("/", "_") or fallback_id
+        # The creator comes only from an owner named in the URL; content ids say nothing about who posted.
+        owner = canonical.owner.lower() if canonical.owner else "undefined"
         return ParsedContent(
-            platform="tiktok",
+            platform=canonical.platform,
             canonical_id=short_id,
-            creator_id=f"tiktok_creator_{short_id[:8]}",
-            normalized_url=url,
+            creator_id=f"{canonical.platform}_creator_{owner}",
+            normalized_url=canonical.url,
         )
 
-    hashed = sha1(url.encode("utf-8")).hexdigest()[:16]
     return ParsedContent(
         platform="other",
-        canonical_id=hashed,
-        creator_id=f"creator_{hashed[:8]}",
-        normalized_url=url,
+        canonical_id=fallback_id,
+        creator_id="creator_undefined",
+        normalized_url=canonical.url,
     )
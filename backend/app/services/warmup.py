@@ -0,0 +1,179 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Protocol
+
+from app.core.config import settings
+from app.core.metrics import WARMUP_ITEMS
+from app.core.tracing import trace_stage
+from app.db.memory_store import MemoryStore, store
+from app.services.model_client import ModelFallback, ModelJobPending, ModelServiceBusy, prefetch_model_result
+from app.services.url_parser import ParsedContent
+from app.services.youtube_client import youtube
+
+YOUTUBE_CREATOR_PREFIX = "youtube_creator_"
+
+
+class CreatorContentSource(Protocol):
+    def latest_content(self, creator_id: str, limit: int) -> list[ParsedContent]: ...
+
+
+class YouTubeUploadsSource:
+    """Newest uploads of a YouTube creator via the Data API (1 quota unit per creator)."""
+
+    def latest_content(self, creator_id: str, limit: int) -> list[ParsedContent]:
+        channel_id = creator_id.removeprefix(YOUTUBE_CREATOR_PREFIX)
+        if not creator_id.startswith(YOUTUBE_CREATOR_PREFIX) or not channel_id.startswith("UC"):
+            return []
+        if not settings.youtube_api_key:
+            return []
+
+        # A channel's uploads playlist is its id with UC swapped for UU, which
+        # saves the channels.list call that would otherwise look it up.
+        with trace_stage("youtube_warmup_playlist_items"):
+            items = youtube.list_playlist_items("UU" + channel_id[2:], limit)
+
+        contents = []
+        for item in items[:limit]:
+            video_id = item.get("contentDetails", {}).get("videoId")
+            if video_id:
+                contents.append(
+                    ParsedContent(
+                        platform="youtube",
+                        canonical_id=video_id,
+                        creator_id=creator_id,
+                        normalized_url=f"https://www.youtube.com/watch?v={video_id}",
+                    )
+                )
+        return contents
+
+
+class StaticContentSource:
+    """Fixed creator -> content mapping, for tests and local runs without the platform API."""
+
+    def __init__(self, contents: dict[str, list[ParsedContent]]):
+        self.contents = contents
+
+    def latest_content(self, creator_id: str, limit: int) -> list[ParsedContent]:
+        return self.contents.get(creator_id, [])[:limit]
+
+
+@dataclass
+class WarmupReport:
+    creators: list[str] = field(default_factory=list)
+    candidates: int = 0
+    warmed: int = 0
+    cached: int = 0
+    pending: int = 0
+    failed: int = 0
+    stopped: str | None = None
+    seconds: float = 0.0
+
+
+class WarmupScheduler:
+    """Periodically pre-scores the newest uploads of the most listed and scanned creators.
+
+    Each cycle stops at the first of: the item cap, the time budget, or the
+    model service answering 429, so warmup never competes with user scans for
+    long. Results land in the same store cache that scans read first.
+    """
+
+    def __init__(
+        self,
+        source: CreatorContentSource | None = None,
+        memory_store: MemoryStore = store,
+        interval_seconds: float | None = None,
+        top_creators: int | None = None,
+        items_per_creator: int | None = None,
+        budget_seconds: float | None = None,
+        max_items: int | None = None,
+    ):
+        self.source = source or YouTubeUploadsSource()
+        self.store = memory_store
+        # Explicit zeros are honoured: 0 items or budget makes every cycle a no-op.
+        self.interval_seconds = interval_seconds if interval_seconds is not None else settings.warmup_interval_seconds
+        self.top_creators = top_creators if top_creators is not None else settings.warmup_top_creators
+        self.items_per_creator = (
+            items_per_creator if items_per_creator is not None else settings.warmup_items_per_creator
+        )
+        self.budget_seconds = budget_seconds if budget_seconds is not None else settings.warmup_budget_seconds
+        self.max_items = max_items if max_items is not None else settings.warmup_max_items
+        self.last_report: WarmupReport | None = None
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        # A non-positive interval disables the background loop; run_once still works.
+        if self._thread is not None or self.interval_seconds <= 0:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="creator-warmup", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.wait(self.interval_seconds):
+            try:
+                self.run_once()
+            except Exception:
+                # A broken cycle (e.g. the store changing shape mid-read) must not kill the thread.
+                WARMUP_ITEMS.labels("cycle_error").inc()
+
+    def run_once(self) -> WarmupReport:
+        started = time.monotonic()
+        deadline = started + self.budget_seconds
+        report = WarmupReport()
+        report.creators = [
+            creator_id
+            for creator_id, _ in self.store.creator_counts().most_common()
+            if not creator_id.endswith("_undefined")
+        ][: self.top_creators]
+
+        for creator_id in report.creators:
+            if report.stopped:
+                break
+            try:
+                contents = self.source.latest_content(creator_id, self.items_per_creator)
+            except Exception:
+                WARMUP_ITEMS.labels("listing_failed").inc()
+                continue
+
+            for content in contents:
+                remaining = deadline - time.monotonic()
+                # Only items that reached the model service count against the cap; cache hits are free.
+                if report.candidates - report.cached >= self.max_items or remaining <= 0:
+                    report.stopped = "budget"
+                    break
+                report.candidates += 1
+                outcome = self._warm(content, remaining)
+                WARMUP_ITEMS.labels(outcome).inc()
+                if outcome == "busy":
+                    report.stopped = "busy"
+                    break
+                setattr(report, outcome, getattr(report, outcome) + 1)
+
+        report.seconds = round(time.monotonic() - started, 3)
+        self.last_report = report
+        return report
+
+    def _warm(self, content: ParsedContent, timeout_seconds: float) -> str:
+        try:
+            return "warmed" if prefetch_model_result(content, timeout_seconds) else "cached"
+        except ModelServiceBusy:
+            return "busy"
+        except ModelJobPending:
+            # The job keeps running in the model service; a later scan or callback collects it.
+            return "pending"
+        except ModelFallback:
+            # A heuristic score from a model or download outage is not worth caching.
+            return "failed"
+        except Exception:
+            return "failed"
+
+
+warmup_scheduler = WarmupScheduler()
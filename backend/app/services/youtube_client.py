@@ -0,0 +1,215 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from typing import Callable
+
+import requests
+
+from app.core.config import settings
+from app.core.metrics import (
+    YOUTUBE_BATCH_SIZE,
+    YOUTUBE_LOOKUPS,
+    YOUTUBE_QUOTA_REJECTED,
+    YOUTUBE_QUOTA_REMAINING,
+    YOUTUBE_QUOTA_UNITS,
+)
+from app.core.tracing import trace_stage
+from app.db.channel_index import channel_index
+
+# videos.list / channels.list accept up to 50 comma-separated ids and cost one
+# quota unit per call regardless of how many ids or parts are requested.
+MAX_IDS_PER_CALL = 50
+ENDPOINT_PARTS = {"videos": "status,snippet", "channels": "snippet"}
+
+
+class QuotaExhausted(Exception):
+    pass
+
+
+class TokenBucket:
+    """Daily quota as a bucket that refills continuously at ``capacity`` per day."""
+
+    def __init__(self, capacity: float, period_seconds: float = 86400.0, clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.refill_per_second = capacity / period_seconds
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def try_consume(self, units: float = 1.0) -> bool:
+        with self._lock:
+            self._refill_locked()
+            if self._tokens < units:
+                return False
+            self._tokens -= units
+            return True
+
+    @property
+    def remaining(self) -> float:
+        with self._lock:
+            self._refill_locked()
+            return self._tokens
+
+    def _refill_locked(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+        self._updated = now
+
+
+@dataclass
+class _CacheEntry:
+    # None records that the API had no item for the id.
+    item: dict | None
+    fetched_at: float
+
+
+class YouTubeClient:
+    """Batched, cached and quota-limited access to the YouTube Data API.
+
+    Lookups for the same endpoint that arrive within ``batch_window_seconds``
+    of each other share one multi-id call; the first caller waits out the
+    window and fetches for everyone. Results are cached per id; when the quota
+    bucket is empty or the API fails, entries up to ``stale_ttl_seconds`` old
+    are served instead of an error.
+    """
+
+    def __init__(
+        self,
+        daily_quota: int | None = None,
+        batch_window_seconds: float | None = None,
+        fresh_ttl_seconds: float | None = None,
+        stale_ttl_seconds: float | None = None,
+        max_cached_ids: int = 50_000,
+    ):
+        self.quota = TokenBucket(daily_quota or settings.youtube_daily_quota)
+        self.batch_window_seconds = (
+            settings.youtube_batch_window_ms / 1000 if batch_window_seconds is None else batch_window_seconds
+        )
+        self.fresh_ttl_seconds = fresh_ttl_seconds or settings.youtube_cache_ttl_seconds
+        self.stale_ttl_seconds = stale_ttl_seconds or settings.youtube_stale_ttl_seconds
+        self.max_cached_ids = max_cached_ids
+        self._lock = threading.Lock()
+        self._cache: dict[str, OrderedDict[str, _CacheEntry]] = {endpoint: OrderedDict() for endpoint in ENDPOINT_PARTS}
+        self._pending: dict[str, dict[str, Future]] = {endpoint: {} for endpoint in ENDPOINT_PARTS}
+        self._flushing: dict[str, bool] = {endpoint: False for endpoint in ENDPOINT_PARTS}
+
+    def get_video(self, video_id: str) -> dict | None:
+        return self._get("videos", video_id)
+
+    def get_channel(self, channel_id: str) -> dict | None:
+        return self._get("channels", channel_id)
+
+    def list_playlist_items(self, playlist_id: str, limit: int) -> list[dict]:
+        """Uncached single call, still charged against the quota bucket."""
+        self._charge("playlistItems")
+        with trace_stage("youtube_playlist_items"):
+            response = requests.get(
+                f"{settings.youtube_api_base_url}/playlistItems",
+                params={
+                    "part": "contentDetails",
+                    "playlistId": playlist_id,
+                    "maxResults": limit,
+                    "key": settings.youtube_api_key,
+                },
+                timeout=5,
+            )
+        response.raise_for_status()
+        return response.json().get("items", [])
+
+    def _get(self, endpoint: str, item_id: str) -> dict | None:
+        with self._lock:
+            entry = self._cache[endpoint].get(item_id)
+        age = time.monotonic() - entry.fetched_at if entry is not None else None
+        if age is not None and age < self.fresh_ttl_seconds:
+            YOUTUBE_LOOKUPS.labels(endpoint, "fresh").inc()
+            return entry.item
+
+        try:
+            item = self._enqueue(endpoint, item_id).result()
+        except Exception:
+            if age is not None and age < self.stale_ttl_seconds:
+                YOUTUBE_LOOKUPS.labels(endpoint, "stale").inc()
+                return entry.item
+            YOUTUBE_LOOKUPS.labels(endpoint, "failed").inc()
+            raise
+        YOUTUBE_LOOKUPS.labels(endpoint, "fetched").inc()
+        return item
+
+    def _enqueue(self, endpoint: str, item_id: str) -> Future:
+        with self._lock:
+            future = self._pending[endpoint].setdefault(item_id, Future())
+            leader = not self._flushing[endpoint]
+            self._flushing[endpoint] = True
+        if leader:
+            self._flush(endpoint)
+        return future
+
+    def _flush(self, endpoint: str):
+        if self.batch_window_seconds > 0:
+            time.sleep(self.batch_window_seconds)
+        # Take everything queued so far; later arrivals elect the next leader.
+        with self._lock:
+            batch = self._pending[endpoint]
+            self._pending[endpoint] = {}
+            self._flushing[endpoint] = False
+
+        ids = list(batch)
+        for start in range(0, len(ids), MAX_IDS_PER_CALL):
+            chunk = {item_id: batch[item_id] for item_id in ids[start : start + MAX_IDS_PER_CALL]}
+            try:
+                items = self._fetch(endpoint, list(chunk))
+            except Exception as exc:
+                for future in chunk.values():
+                    future.set_exception(exc)
+                continue
+            for item_id, future in chunk.items():
+                future.set_result(items.get(item_id))
+
+    def _fetch(self, endpoint: str, ids: list[str]) -> dict[str, dict]:
+        self._charge(endpoint)
+        YOUTUBE_BATCH_SIZE.labels(endpoint).observe(len(ids))
+        with trace_stage(f"youtube_{endpoint}_batch"):
+            response = requests.get(
+                f"{settings.youtube_api_base_url}/{endpoint}",
+                params={"part": ENDPOINT_PARTS[endpoint], "id": ",".join(ids), "key": settings.youtube_api_key},
+                timeout=5,
+            )
+        response.raise_for_status()
+        items = {item["id"]: item for item in response.json().get("items", []) if "id" in item}
+
+        now = time.monotonic()
+        with self._lock:
+            cache = self._cache[endpoint]
+            for item_id in ids:
+                cache[item_id] = _CacheEntry(item=items.get(item_id), fetched_at=now)
+                cache.move_to_end(item_id)
+            while len(cache) > self.max_cached_ids:
+                cache.popitem(last=False)
+
+        # Every lookup feeds the persistent index, so creators resolve offline next time.
+        if endpoint == "videos":
+            channel_index.add_videos(
+                {
+                    video_id: item["snippet"]["channelId"]
+                    for video_id, item in items.items()
+                    if item.get("snippet", {}).get("channelId")
+                }
+            )
+        else:
+            channel_index.add_handles(
+                {channel_id: item.get("snippet", {}).get("customUrl") for channel_id, item in items.items()}
+            )
+        return items
+
+    def _charge(self, endpoint: str):
+        if not self.quota.try_consume(1):
+            YOUTUBE_QUOTA_REJECTED.labels(endpoint).inc()
+            raise QuotaExhausted(f"YouTube daily quota exhausted, skipping {endpoint}.list.")
+        YOUTUBE_QUOTA_UNITS.labels(endpoint).inc()
+
+
+youtube = YouTubeClient()
+YOUTUBE_QUOTA_REMAINING.set_function(lambda: youtube.quota.remaining)
@@ -0,0 +1,468 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+from collections import defaultdict
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from pathlib import Path
+from time import monotonic, perf_counter, sleep
+
+import requests
+
+from benchmarks.scan_pipeline import percentile
+from benchmarks.stubs import RouteProfile, StubUpstreams, UpstreamProfile
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+OPERATIONS = ["scan_youtube", "scan_video", "scan_image", "history", "list_get", "list_update", "vote"]
+DEFAULT_MIX = "scan_youtube=35,scan_video=10,scan_image=10,history=20,list_get=10,list_update=5,vote=10"
+# Evidence messages model_client returns when it falls back to a neutral model score.
+DEGRADED_MODEL_MESSAGES = ("busy", "still running", "unavailable")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Ramp HTTP load against locally started backend and model service with stubbed upstreams."
+    )
+    parser.add_argument("--steps", type=str, default="1,2,4,8,16,32", help="Concurrent virtual users per step.")
+    parser.add_argument("--step-seconds", type=float, default=15.0)
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX, help="Weighted operation mix, op=weight.")
+    parser.add_argument("--users", type=int, default=50, help="Distinct user fingerprints.")
+    parser.add_argument(
+        "--unique-content",
+        type=int,
+        default=200,
+        help="Distinct videos/images scanned; smaller pools mean more cache hits.",
+    )
+    parser.add_argument("--backend-workers", type=int, default=1)
+    parser.add_argument("--model-workers", type=int, default=1)
+    parser.add_argument(
+        "--model-service",
+        choices=["real", "stub"],
+        default="real",
+        help="Start the real model service or answer model calls from the stub server.",
+    )
+    parser.add_argument("--model-onnx", type=Path, default=None, help="ONNX model for the real model service.")
+    parser.add_argument(
+        "--tiny-model",
+        action="store_true",
+        help="Build the random benchmark model (see video_pipeline) and use it as --model-onnx.",
+    )
+    parser.add_argument("--model-timeout-seconds", type=int, default=8)
+    parser.add_argument("--youtube-latency-ms", type=float, default=40.0)
+    parser.add_argument("--aislist-latency-ms", type=float, default=60.0)
+    parser.add_argument("--stub-model-latency-ms", type=float, default=120.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Failure rate for every upstream (0-1).")
+    parser.add_argument("--slo-p95-ms", type=float, default=1000.0, help="p95 latency that counts as saturated.")
+    parser.add_argument("--max-error-rate", type=float, default=0.01)
+    parser.add_argument(
+        "--min-throughput-gain",
+        type=float,
+        default=0.05,
+        help="A step that adds less throughput than this over the previous one counts as saturated.",
+    )
+    parser.add_argument("--bucket-seconds", type=float, default=1.0, help="Width of the latency timeline buckets.")
+    parser.add_argument("--work-dir", type=Path, default=Path("benchmarks/results/load_test"))
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/results/load_test.json"))
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results JSON to diff against.")
+    parser.add_argument("--seed", type=int, default=7)
+    return parser.parse_args()
+
+
+def parse_mix(raw: str) -> dict[str, float]:
+    mix = {}
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation {name!r}. Choose from {OPERATIONS}.")
+        mix[name] = float(weight or 1)
+    if not mix or sum(mix.values()) <= 0:
+        raise ValueError("--mix needs at least one operation with a positive weight.")
+    return mix
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def prepare_media(work_dir: Path, tiny_model: bool) -> Path | None:
+    # Imported lazily: only media/model generation needs OpenCV and ONNX.
+    import cv2
+    import numpy as np
+
+    from benchmarks.video_pipeline import VideoSpec, build_tiny_model, generate_video
+
+    work_dir.mkdir(parents=True, exist_ok=True)
+    clip = work_dir / "clip.mp4"
+    if not clip.exists() and not generate_video(VideoSpec(320, 240, 3, 24, "mp4v", 24), clip):
+        raise RuntimeError("cv2.VideoWriter could not write the synthetic clip.")
+    frame = work_dir / "frame.jpg"
+    if not frame.exists():
+        gradient = np.linspace(0, 255, 320, dtype=np.uint8)
+        cv2.imwrite(str(frame), np.dstack([np.tile(gradient, (240, 1))] * 3))
+
+    if not tiny_model:
+        return None
+    model_path = work_dir / "tiny_model.onnx"
+    if not model_path.exists():
+        build_tiny_model(model_path)
+    return model_path
+
+
+class ServiceProcess:
+    def __init__(self, name: str, app: str, workers: int, env: dict[str, str], health_path: str, log_dir: Path):
+        self.name = name
+        self.port = free_port()
+        self.base_url = f"http://127.0.0.1:{self.port}"
+        self._health_url = f"{self.base_url}{health_path}"
+        self._log = open(log_dir / f"{name}.log", "w", encoding="utf-8")
+        self._process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "uvicorn",
+                app,
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(self.port),
+                "--workers",
+                str(workers),
+                "--log-level",
+                "warning",
+            ],
+            cwd=BACKEND_DIR,
+            env={**os.environ, **env},
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+        )
+
+    def wait_ready(self, timeout_seconds: float = 60.0):
+        deadline = monotonic() + timeout_seconds
+        while monotonic() < deadline:
+            if self._process.poll() is not None:
+                raise RuntimeError(f"{self.name} exited early, see {self._log.name}")
+            try:
+                if requests.get(self._health_url, timeout=1).ok:
+                    return
+            except requests.RequestException:
+                pass
+            sleep(0.2)
+        raise RuntimeError(f"{self.name} did not become healthy within {timeout_seconds:.0f}s")
+
+    def stop(self):
+        self._process.terminate()
+        try:
+            self._process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            self._process.kill()
+            self._process.wait()
+        self._log.close()
+
+
+class Workload:
+    """Builds requests for the operation mix over fixed pools of users and content."""
+
+    def __init__(self, backend_url: str, media_url: str, args):
+        self.backend_url = backend_url
+        self.media_url = media_url
+        self.users = [f"load_user_{index:04d}" for index in range(args.users)]
+        self.video_ids = [f"load{index:07d}" for index in range(args.unique_content)]
+        self.unique_content = args.unique_content
+
+    def request(self, operation: str, rng: random.Random) -> tuple[str, str, dict]:
+        api = f"{self.backend_url}/api"
+        user = rng.choice(self.users)
+        video_id = rng.choice(self.video_ids)
+        if operation == "scan_youtube":
+            url = f"https://www.youtube.com/watch?v={video_id}"
+            return "POST", f"{api}/scan", {"json": {"url": url, "userFingerprint": user}}
+        if operation in ("scan_video", "scan_image"):
+            name = "clip.mp4" if operation == "scan_video" else "frame.jpg"
+            url = f"{self.media_url}/{rng.randrange(self.unique_content)}/{name}"
+            return "POST", f"{api}/scan", {"json": {"url": url, "userFingerprint": user}}
+        if operation == "history":
+            return "GET", f"{api}/history", {"params": {"userFingerprint": user}}
+        if operation == "list_get":
+            return "GET", f"{api}/list", {"params": {"userFingerprint": user}}
+        if operation == "list_update":
+            creator_id = f"youtube_creator_UC{video_id}"
+            if rng.random() < 0.25:
+                return "DELETE", f"{api}/list", {"params": {"userFingerprint": user, "creatorId": creator_id}}
+            body = {"creatorId": creator_id, "userFingerprint": user, "listType": rng.choice(["allow", "block"])}
+            return "POST", f"{api}/list", {"json": body}
+        vote = rng.choice(["ai", "not_ai", "unsure"])
+        return "POST", f"{api}/vote", {"json": {"contentId": f"youtube:{video_id}", "userFingerprint": user, "vote": vote}}
+
+
+def _degraded_scan(response: requests.Response) -> bool:
+    try:
+        evidence = response.json().get("evidence", [])
+    except ValueError:
+        return False
+    return any(
+        item.get("source") == "model" and any(text in item.get("message", "") for text in DEGRADED_MODEL_MESSAGES)
+        for item in evidence
+    )
+
+
+def run_step(
+    workload: Workload,
+    mix: dict[str, float],
+    concurrency: int,
+    seconds: float,
+    run_started: float,
+    seed: int,
+    timeout_seconds: float,
+) -> list[dict]:
+    samples: list[dict] = []
+    lock = threading.Lock()
+    deadline = perf_counter() + seconds
+    operations, weights = list(mix), list(mix.values())
+
+    def virtual_user(index: int):
+        rng = random.Random(seed * 10_000 + index)
+        local: list[dict] = []
+        with requests.Session() as session:
+            while perf_counter() < deadline:
+                operation = rng.choices(operations, weights)[0]
+                method, url, kwargs = workload.request(operation, rng)
+                started = perf_counter()
+                status, degraded = 0, False
+                try:
+                    response = session.request(method, url, timeout=timeout_seconds, **kwargs)
+                    status = response.status_code
+                    degraded = operation.startswith("scan") and response.ok and _degraded_scan(response)
+                except requests.RequestException:
+                    pass
+                finished = perf_counter()
+                local.append(
+                    {
+                        "operation": operation,
+                        "offset": finished - run_started,
+                        "latencyMs": (finished - started) * 1000,
+                        "status": status,
+                        "ok": 200 <= status < 400,
+                        "degraded": degraded,
+                    }
+                )
+        with lock:
+            samples.extend(local)
+
+    threads = [threading.Thread(target=virtual_user, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples
+
+
+def summarize(samples: list[dict], seconds: float) -> dict:
+    latencies = sorted(sample["latencyMs"] for sample in samples)
+    errors = sum(1 for sample in samples if not sample["ok"])
+    scans = [sample for sample in samples if sample["operation"].startswith("scan")]
+    statuses: dict[str, int] = defaultdict(int)
+    for sample in samples:
+        statuses[str(sample["status"])] += 1
+    return {
+        "requests": len(samples),
+        "throughputPerSec": len(samples) / seconds if seconds > 0 else 0.0,
+        "errors": errors,
+        "errorRate": errors / max(1, len(samples)),
+        "degradedScanRate": sum(1 for sample in scans if sample["degraded"]) / max(1, len(scans)),
+        "statusCounts": dict(sorted(statuses.items())),
+        "p50Ms": percentile(latencies, 50),
+        "p95Ms": percentile(latencies, 95),
+        "p99Ms": percentile(latencies, 99),
+        "maxMs": latencies[-1] if latencies else 0.0,
+    }
+
+
+def timeline(samples: list[dict], concurrency: int, bucket_seconds: float) -> list[dict]:
+    buckets: dict[int, list[dict]] = defaultdict(list)
+    for sample in samples:
+        buckets[int(sample["offset"] // bucket_seconds)].append(sample)
+    points = []
+    for bucket in sorted(buckets):
+        stats = summarize(buckets[bucket], bucket_seconds)
+        points.append(
+            {
+                "t": round(bucket * bucket_seconds, 3),
+                "concurrency": concurrency,
+                "requestsPerSec": stats["throughputPerSec"],
+                "errorRate": stats["errorRate"],
+                "p50Ms": stats["p50Ms"],
+                "p95Ms": stats["p95Ms"],
+            }
+        )
+    return points
+
+
+def find_saturation(steps: list[dict], args) -> dict:
+    healthy = None
+    for step in steps:
+        reason = None
+        if step["errorRate"] > args.max_error_rate:
+            reason = f"error rate {step['errorRate']:.1%} > {args.max_error_rate:.1%}"
+        elif step["p95Ms"] > args.slo_p95_ms:
+            reason = f"p95 {step['p95Ms']:.0f}ms > {args.slo_p95_ms:.0f}ms"
+        elif healthy is not None and step["throughputPerSec"] < healthy["throughputPerSec"] * (
+            1 + args.min_throughput_gain
+        ):
+            reason = "throughput stopped growing"
+        if reason is not None:
+            return {
+                "saturatedAtConcurrency": step["concurrency"],
+                "lastHealthyConcurrency": healthy["concurrency"] if healthy else None,
+                "maxHealthyThroughputPerSec": healthy["throughputPerSec"] if healthy else 0.0,
+                "reason": reason,
+            }
+        healthy = step
+    return {
+        "saturatedAtConcurrency": None,
+        "lastHealthyConcurrency": healthy["concurrency"] if healthy else None,
+        "maxHealthyThroughputPerSec": healthy["throughputPerSec"] if healthy else 0.0,
+        "reason": "not saturated within the tested steps",
+    }
+
+
+def print_comparison(current: dict, previous_path: Path):
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))
+    print(f"\nComparison against {previous_path}:")
+    before_steps = {step["concurrency"]: step for step in previous.get("steps", [])}
+    for step in current["steps"]:
+        before = before_steps.get(step["concurrency"])
+        if before is None:
+            print(f"  c={step['concurrency']:<4} (new step)")
+            continue
+        deltas = []
+        for key in ("throughputPerSec", "p50Ms", "p95Ms", "errorRate"):
+            old = before.get(key) or 0.0
+            change = ((step[key] - old) / old * 100) if old else 0.0
+            deltas.append(f"{key}={step[key]:.2f} ({change:+.1f}%)")
+        print(f"  c={step['concurrency']:<4} " + " ".join(deltas))
+    print(f"  saturation before: {previous.get('saturation')}")
+    print(f"  saturation now:    {current['saturation']}")
+
+
+def main():
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    steps = [int(value) for value in args.steps.split(",") if value.strip()]
+    model_onnx = args.model_onnx
+    generated_model = prepare_media(args.work_dir, args.tiny_model)
+    if generated_model is not None:
+        model_onnx = generated_model
+
+    route = lambda latency: RouteProfile(latency, args.jitter_ms, args.failure_rate)
+    profile = UpstreamProfile(
+        youtube=route(args.youtube_latency_ms),
+        aislist=route(args.aislist_latency_ms),
+        model=route(args.stub_model_latency_ms),
+    )
+    report = {
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+        },
+        "config": {
+            key: str(value) if isinstance(value, Path) else value
+            for key, value in vars(args).items()
+            if key not in {"out", "compare", "work_dir"}
+        },
+        "steps": [],
+        "timeline": [],
+    }
+
+    print("=== Backend + Model Service Load Test ===")
+    with ExitStack() as stack:
+        stubs = stack.enter_context(StubUpstreams(profile, seed=args.seed, media_dir=args.work_dir))
+        services: list[ServiceProcess] = []
+        stack.callback(lambda: [service.stop() for service in services])
+
+        model_url = f"{stubs.base_url}/model"
+        if args.model_service == "real":
+            model_env = {"MODEL_ONNX_PATH": str(model_onnx.resolve())} if model_onnx else {}
+            model = ServiceProcess(
+                "model_service", "model_service.main:app", args.model_workers, model_env, "/health", args.work_dir
+            )
+            services.append(model)
+            model.wait_ready()
+            model_url = model.base_url
+
+        backend_env = {
+            "YOUTUBE_API_KEY": "stub-key",
+            "YOUTUBE_API_BASE_URL": f"{stubs.base_url}/youtube/v3",
+            "AISLIST_BASE_URL": f"{stubs.base_url}/aislist",
+            "MODEL_SERVICE_URL": model_url,
+            "MODEL_TIMEOUT_SECONDS": str(args.model_timeout_seconds),
+            "MODEL_CALLBACK_URL": "",
+            # Keep the video -> channel index per run so every run starts cold.
+            "CHANNEL_INDEX_PATH": ":memory:",
+        }
+        backend = ServiceProcess("backend", "main:app", args.backend_workers, backend_env, "/api/health", args.work_dir)
+        services.append(backend)
+        backend.wait_ready()
+
+        workload = Workload(backend.base_url, f"{stubs.base_url}/media", args)
+        # Scans can legitimately wait out the backend's model timeout.
+        request_timeout = args.model_timeout_seconds + 30.0
+        run_started = perf_counter()
+        for index, concurrency in enumerate(steps):
+            step_started = perf_counter()
+            samples = run_step(
+                workload, mix, concurrency, args.step_seconds, run_started, args.seed + index, request_timeout
+            )
+            elapsed = perf_counter() - step_started
+            result = {"concurrency": concurrency, "seconds": elapsed, **summarize(samples, elapsed)}
+            result["operations"] = {
+                operation: summarize([sample for sample in samples if sample["operation"] == operation], elapsed)
+                for operation in mix
+            }
+            if args.model_service == "real":
+                try:
+                    result["modelServiceLoad"] = requests.get(f"{model_url}/health", timeout=2).json().get("load")
+                except (requests.RequestException, ValueError):
+                    result["modelServiceLoad"] = None
+            report["steps"].append(result)
+            report["timeline"].extend(timeline(samples, concurrency, args.bucket_seconds))
+            print(
+                f"c={concurrency:<4} n={result['requests']:<6} err={result['errorRate']:6.1%} "
+                f"degraded={result['degradedScanRate']:6.1%} thr={result['throughputPerSec']:8.1f}/s "
+                f"p50={result['p50Ms']:8.1f}ms p95={result['p95Ms']:8.1f}ms p99={result['p99Ms']:8.1f}ms"
+            )
+        report["upstreamCalls"] = dict(sorted(stubs.calls.items()))
+
+    report["saturation"] = find_saturation(report["steps"], args)
+    saturation = report["saturation"]
+    print(
+        f"Saturation: {saturation['reason']} "
+        f"(last healthy concurrency={saturation['lastHealthyConcurrency']}, "
+        f"saturated at={saturation['saturatedAtConcurrency']})"
+    )
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {args.out.resolve()}")
+
+    if args.compare is not None:
+        print_comparison(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import platform
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+from typing import Callable
+
+# Scenarios must not see video -> channel mappings persisted by earlier runs.
+os.environ.setdefault("CHANNEL_INDEX_PATH", ":memory:")
+
+from app.core.config import settings
+from app.db.channel_index import channel_index
+from app.db.memory_store import store
+from app.services.scan_orchestrator import run_scan
+from app.services.youtube_client import youtube
+from app.services.scoring import calculate_final_score, decide_verdict
+from benchmarks.stubs import RouteProfile, StubUpstreams, UpstreamProfile
+
+SCENARIOS = ["allow_listed", "cold_youtube", "cached", "model_timeout", "memory_store", "scoring"]
+FINGERPRINT = "bench_user"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="In-process scan pipeline benchmark with stubbed YouTube, AiSList and model service."
+    )
+    parser.add_argument("--scenarios", type=str, default=",".join(SCENARIOS))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--youtube-latency-ms", type=float, default=40.0)
+    parser.add_argument("--aislist-latency-ms", type=float, default=60.0)
+    parser.add_argument("--model-latency-ms", type=float, default=120.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0, help="Failure rate for every upstream (0-1).")
+    parser.add_argument(
+        "--model-timeout-seconds",
+        type=int,
+        default=1,
+        help="Backend model timeout used by the model_timeout scenario.",
+    )
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/results/scan_pipeline.json"))
+    parser.add_argument("--compare", type=Path, default=None, help="Previous results JSON to diff against.")
+    return parser.parse_args()
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, math.ceil(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_timed(operation: Callable[[int], object], iterations: int, concurrency: int) -> dict:
+    def timed(index: int) -> tuple[float, bool]:
+        started = perf_counter()
+        try:
+            operation(index)
+            ok = True
+        except Exception:
+            ok = False
+        return perf_counter() - started, ok
+
+    wall_started = perf_counter()
+    if concurrency <= 1:
+        results = [timed(index) for index in range(iterations)]
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(timed, range(iterations)))
+    wall_seconds = perf_counter() - wall_started
+
+    latencies_ms = sorted(seconds * 1000 for seconds, _ in results)
+    errors = sum(1 for _, ok in results if not ok)
+    return {
+        "iterations": iterations,
+        "concurrency": concurrency,
+        "errors": errors,
+        "errorRate": errors / max(1, iterations),
+        "throughputPerSec": iterations / wall_seconds if wall_seconds > 0 else 0.0,
+        "meanMs": sum(latencies_ms) / max(1, len(latencies_ms)),
+        "p50Ms": percentile(latencies_ms, 50),
+        "p95Ms": percentile(latencies_ms, 95),
+        "p99Ms": percentile(latencies_ms, 99),
+        "maxMs": latencies_ms[-1] if latencies_ms else 0.0,
+    }
+
+
+def _youtube_url(video_id: str) -> str:
+    return f"https://www.youtube.com/watch?v={video_id}"
+
+
+def scenario_allow_listed(stubs: StubUpstreams, args) -> tuple[Callable[[int], object], int]:
+    video_id = "allowVid001"
+    store.set_creator_list(FINGERPRINT, f"youtube_creator_UC{video_id}", "allow")
+    return lambda index: run_scan(_youtube_url(video_id), FINGERPRINT), args.iterations
+
+
+def scenario_cold_youtube(stubs: StubUpstreams, args) -> tuple[Callable[[int], object], int]:
+    return lambda index: run_scan(_youtube_url(f"cold{index:07d}"), FINGERPRINT), args.iterations
+
+
+def scenario_cached(stubs: StubUpstreams, args) -> tuple[Callable[[int], object], int]:
+    video_id = "cachedVid01"
+    # Warm every cache the pipeline has by scanning once before timing.
+    stubs.profile.model_job_seconds = 0.0
+    run_scan(_youtube_url(video_id), FINGERPRINT)
+    store.set_model_result(f"youtube:{video_id}", {"score": 0.7, "confidenceBand": "medium"})
+    return lambda index: run_scan(_youtube_url(video_id), FINGERPRINT), args.iterations
+
+
+def scenario_model_timeout(stubs: StubUpstreams, args) -> tuple[Callable[[int], object], int]:
+    settings.model_timeout_seconds = args.model_timeout_seconds
+    stubs.profile.model_job_seconds = 3600.0
+    # Every iteration waits out the full model timeout, so keep the run short.
+    iterations = min(args.iterations, 20)
+    return lambda index: run_scan(_youtube_url(f"slow{index:07d}"), FINGERPRINT), iterations
+
+
+def scenario_memory_store(stubs: StubUpstreams, args) -> tuple[Callable[[int], object], int]:
+    payload = b'{"contentId":"youtube:x","verdict":"unclear","finalScore":0.6,"evidence":[]}'
+
+    def operation(index: int):
+        fingerprint = f"user_{index % 50}"
+        store.add_scan_history(f"youtube:{index}", fingerprint, "creator_x", payload)
+        store.get_user_history(fingerprint)
+        store.set_creator_list(fingerprint, f"creator_{index % 500}", "block")
+        store.get_creator_list_value(fingerprint, f"creator_{(index * 7) % 500}")
+        store.upsert_vote(f"youtube:{index % 100}", fingerprint, "ai", 1.0)
+
+    return operation, args.iterations * 50
+
+
+def scenario_scoring(stubs: StubUpstreams, args) -> tuple[Callable[[int], object], int]:
+    def operation(index: int):
+        score = calculate_final_score(
+            platform_score=(index % 11) / 10,
+            community_score=(index % 7) / 6,
+            model_score=(index % 5) / 4,
+        )
+        decide_verdict(score, conservative_mode=index % 2 == 0)
+
+    return operation, args.iterations * 500
+
+
+SCENARIO_BUILDERS = {
+    "allow_listed": scenario_allow_listed,
+    "cold_youtube": scenario_cold_youtube,
+    "cached": scenario_cached,
+    "model_timeout": scenario_model_timeout,
+    "memory_store": scenario_memory_store,
+    "scoring": scenario_scoring,
+}
+
+
+def print_comparison(current: dict, previous_path: Path):
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))
+    print(f"\nComparison against {previous_path}:")
+    for name, result in current["scenarios"].items():
+        before = previous.get("scenarios", {}).get(name)
+        if before is None:
+            print(f"  {name:<14} (new scenario)")
+            continue
+        deltas = []
+        for key in ("p50Ms", "p95Ms", "p99Ms", "throughputPerSec"):
+            old = before.get(key) or 0.0
+            change = ((result[key] - old) / old * 100) if old else 0.0
+            deltas.append(f"{key}={result[key]:.2f} ({change:+.1f}%)")
+        print(f"  {name:<14} " + " ".join(deltas))
+
+
+def main():
+    args = parse_args()
+    selected = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = [name for name in selected if name not in SCENARIO_BUILDERS]
+    if unknown:
+        raise ValueError(f"Unknown scenarios: {unknown}. Choose from {SCENARIOS}.")
+
+    route = lambda latency: RouteProfile(latency, args.jitter_ms, args.failure_rate)
+    original_settings = settings.model_dump()
+    report = {
+        "startedAt": datetime.now(timezone.utc).isoformat(),
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpuCount": os.cpu_count(),
+        },
+        "config": {key: value for key, value in vars(args).items() if key not in {"out", "compare"}},
+        "scenarios": {},
+    }
+
+    print("=== Scan Pipeline Benchmark ===")
+    for name in selected:
+        profile = UpstreamProfile(
+            youtube=route(args.youtube_latency_ms),
+            aislist=route(args.aislist_latency_ms),
+            model=route(args.model_latency_ms),
+        )
+        store.__init__()
+        youtube.__init__()
+        channel_index.__init__(":memory:")
+        with StubUpstreams(profile) as stubs:
+            stubs.apply_to(settings)
+            operation, iterations = SCENARIO_BUILDERS[name](stubs, args)
+            stubs.reset_calls()
+            result = run_timed(operation, iterations, args.concurrency)
+            result["upstreamCallsPerIteration"] = {
+                call: count / iterations for call, count in sorted(stubs.calls.items())
+            }
+        for key, value in original_settings.items():
+            setattr(settings, key, value)
+
+        report["scenarios"][name] = result
+        print(
+            f"{name:<14} n={iterations:<6} err={result['errors']:<4} "
+            f"thr={result['throughputPerSec']:9.1f}/s p50={result['p50Ms']:8.3f}ms "
+            f"p95={result['p95Ms']:8.3f}ms p99={result['p99Ms']:8.3f}ms"
+        )
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Results written to {args.out.resolve()}")
+
+    if args.compare is not None:
+        print_comparison(report, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+from __future__ import annotations
+
+import json
+import mimetypes
+import random
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+
+@dataclass
+class RouteProfile:
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    failure_rate: float = 0.0
+
+
+@dataclass
+class UpstreamProfile:
+    youtube: RouteProfile = field(default_factory=RouteProfile)
+    aislist: RouteProfile = field(default_factory=RouteProfile)
+    model: RouteProfile = field(default_factory=RouteProfile)
+    # How long a submitted video job reports "running" before it is done.
+    model_job_seconds: float = 0.0
+    model_score: float = 0.7
+    contains_synthetic_media: bool | None = None
+    blocklisted_handles: list[str] = field(default_factory=list)
+    warnlisted_handles: list[str] = field(default_factory=list)
+
+
+class StubUpstreams:
+    """Local stand-ins for the YouTube Data API, the AiSList files and the model service.
+
+    Each upstream sits under its own path prefix (``/youtube/v3``, ``/aislist``,
+    ``/model``) and applies the latency and failure rate from the active profile.
+    Files in ``media_dir`` are served under ``/media`` with HTTP range support.
+    """
+
+    def __init__(self, profile: UpstreamProfile | None = None, seed: int = 7, media_dir: Path | None = None):
+        self.profile = profile or UpstreamProfile()
+        self.media_dir = media_dir
+        self.calls: Counter[str] = Counter()
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._jobs: dict[str, float] = {}
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> StubUpstreams:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def apply_to(self, settings):
+        settings.youtube_api_base_url = f"{self.base_url}/youtube/v3"
+        settings.aislist_base_url = f"{self.base_url}/aislist"
+        settings.model_service_url = f"{self.base_url}/model"
+        if not settings.youtube_api_key:
+            settings.youtube_api_key = "stub-key"
+
+    def reset_calls(self):
+        with self._lock:
+            self.calls.clear()
+
+    def _simulate(self, route: RouteProfile) -> bool:
+        with self._lock:
+            delay = route.latency_ms + self._random.uniform(0.0, route.jitter_ms)
+            failed = self._random.random() < route.failure_rate
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return not failed
+
+    def _respond(self, path: str, query: dict[str, list[str]], method: str) -> tuple[int, str, bytes]:
+        profile = self.profile
+        if path.startswith("/youtube/v3/"):
+            if not self._simulate(profile.youtube):
+                return 500, "application/json", b'{"error": "stub failure"}'
+            ids = [i for value in query.get("id", []) for i in value.split(",") if i]
+            if path.endswith("/playlistItems"):
+                # Uploads playlist UU<x> lists videos <x>-0, <x>-1, ... newest first.
+                playlist_id = query.get("playlistId", [""])[0]
+                count = int(query.get("maxResults", ["5"])[0])
+                items = [{"contentDetails": {"videoId": f"{playlist_id[2:]}-{i}"}} for i in range(count)]
+                return 200, "application/json", json.dumps({"items": items}).encode()
+            if path.endswith("/videos"):
+                items = [
+                    {
+                        "id": video_id,
+                        "snippet": {"channelId": f"UC{video_id}", "title": f"Video {video_id}"},
+                        "status": {"containsSyntheticMedia": profile.contains_synthetic_media},
+                    }
+                    for video_id in ids
+                ]
+            else:
+                items = [{"id": channel_id, "snippet": {"customUrl": f"@{channel_id.lower()}"}} for channel_id in ids]
+            return 200, "application/json", json.dumps({"items": items}).encode()
+
+        if path.startswith("/aislist/"):
+            if not self._simulate(profile.aislist):
+                return 500, "text/plain", b"stub failure"
+            handles = profile.blocklisted_handles if "blocklist" in path else profile.warnlisted_handles
+            return 200, "text/plain", "\n".join(handles).encode()
+
+        if path.startswith("/model/"):
+            if not self._simulate(profile.model):
+                return 500, "application/json", b'{"error": "stub failure"}'
+            result = {"score": profile.model_score, "confidenceBand": "medium", "reason": "stub"}
+            if path == "/model/infer-image" or path == "/model/infer-video":
+                return 200, "application/json", json.dumps(result).encode()
+            if path.startswith("/model/jobs/infer-") and method == "POST":
+                job_id = uuid.uuid4().hex
+                with self._lock:
+                    self._jobs[job_id] = time.monotonic() + profile.model_job_seconds
+                return 202, "application/json", json.dumps(self._job_body(job_id, result)).encode()
+            if path.startswith("/model/jobs/"):
+                job_id = path.rsplit("/", 1)[-1]
+                if job_id not in self._jobs:
+                    return 404, "application/json", b'{"detail": "Job not found or expired."}'
+                return 200, "application/json", json.dumps(self._job_body(job_id, result)).encode()
+
+        return 404, "text/plain", b"not found"
+
+    def _media(self, path: str, range_header: str) -> tuple[int, dict[str, str], bytes]:
+        # Served by file name, so callers can make distinct URLs like /media/<id>/clip.mp4.
+        name = path.rsplit("/", 1)[-1]
+        if self.media_dir is None or not name or not (self.media_dir / name).is_file():
+            return 404, {"Content-Type": "text/plain"}, b"not found"
+        data = (self.media_dir / name).read_bytes()
+        headers = {
+            "Content-Type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+            "Accept-Ranges": "bytes",
+        }
+        if range_header.startswith("bytes="):
+            start_raw, _, end_raw = range_header[len("bytes="):].partition("-")
+            start = int(start_raw or 0)
+            end = min(int(end_raw), len(data) - 1) if end_raw else len(data) - 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            return 206, headers, data[start : end + 1]
+        return 200, headers, data
+
+    def _job_body(self, job_id: str, result: dict) -> dict:
+        done = time.monotonic() >= self._jobs[job_id]
+        return {
+            "jobId": job_id,
+            "status": "done" if done else "running",
+            "result": result if done else None,
+            "error": None,
+        }
+
+    def _handler_class(self):
+        stubs = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self, method: str):
+                parsed = urlparse(self.path)
+                length = int(self.headers.get("content-length") or 0)
+                if length:
+                    self.rfile.read(length)
+                with stubs._lock:
+                    stubs.calls[f"{method} {parsed.path.split('/')[1]}"] += 1
+                if parsed.path.startswith("/media/"):
+                    status, headers, body = stubs._media(parsed.path, self.headers.get("Range", ""))
+                else:
+                    status, content_type, body = stubs._respond(parsed.path, parse_qs(parsed.query), method)
+                    headers = {"Content-Type": content_type}
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_HEAD(self):
+                parsed = urlparse(self.path)
+                status, headers, body = stubs._media(parsed.path, "")
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
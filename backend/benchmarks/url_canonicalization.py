@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+from collections import defaultdict
+from hashlib import sha1
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Canonicalization runs offline: no channel index on disk, no YouTube calls.
+os.environ.setdefault("CHANNEL_INDEX_PATH", ":memory:")
+
+from app.core.config import settings
+from app.services.url_canonical import short_links
+from app.services.url_parser import parse_content
+
+DEFAULT_CORPUS = Path(__file__).parent / "data" / "url_corpus.json"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Measure how many duplicate content ids URL canonicalization removes on a labelled corpus."
+    )
+    parser.add_argument("--corpus", type=Path, default=DEFAULT_CORPUS)
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/results/url_canonicalization.json"))
+    parser.add_argument("--verbose", action="store_true", help="Print every URL whose id is wrong or split.")
+    return parser.parse_args()
+
+
+def legacy_content_id(url: str) -> str:
+    """Content id as parse_content computed it before canonicalization, for comparison."""
+    parsed = urlparse(url)
+    host = parsed.netloc.lower()
+    path = parsed.path.strip("/")
+    if "youtube.com" in host or "youtu.be" in host:
+        query = parse_qs(parsed.query)
+        video_id = None
+        if "youtu.be" in host and path:
+            video_id = path.split("/")[0]
+        elif "youtube.com" in host:
+            if path == "watch" and query.get("v"):
+                video_id = query["v"][0]
+            elif path.startswith(("shorts/", "live/")):
+                video_id = path.split("/")[1]
+        return f"youtube:{video_id or sha1(url.encode('utf-8')).hexdigest()[:16]}"
+    for platform in ("instagram", "tiktok"):
+        if f"{platform}.com" in host:
+            return f"{platform}:{path.replace('/', '_') or sha1(url.encode('utf-8')).hexdigest()[:16]}"
+    return f"other:{sha1(url.encode('utf-8')).hexdigest()[:16]}"
+
+
+def score(groups: list[dict], content_id_for) -> dict:
+    """Distinct ids vs distinct contents, overall and per platform of the expected content."""
+    ids_by_group: list[set[str]] = []
+    groups_by_id: dict[str, set[int]] = defaultdict(set)
+    wrong: list[tuple[str, str, str]] = []
+    for index, group in enumerate(groups):
+        ids = set()
+        for url in group["urls"]:
+            content_id = content_id_for(url)
+            ids.add(content_id)
+            groups_by_id[content_id].add(index)
+            if group["contentId"] is not None and content_id != group["contentId"]:
+                wrong.append((url, content_id, group["contentId"]))
+        ids_by_group.append(ids)
+
+    per_platform: dict[str, dict] = defaultdict(lambda: {"urls": 0, "contents": 0, "ids": 0})
+    for group, ids in zip(groups, ids_by_group):
+        platform = (group["contentId"] or "other:").split(":")[0]
+        per_platform[platform]["urls"] += len(group["urls"])
+        per_platform[platform]["contents"] += 1
+        per_platform[platform]["ids"] += len(ids)
+
+    distinct_ids = len(groups_by_id)
+    return {
+        "urls": sum(len(group["urls"]) for group in groups),
+        "contents": len(groups),
+        "distinct_ids": distinct_ids,
+        "duplicate_ids": sum(len(ids) - 1 for ids in ids_by_group),
+        "collisions": sum(1 for owners in groups_by_id.values() if len(owners) > 1),
+        "wrong_ids": len(wrong),
+        "per_platform": dict(per_platform),
+        "_wrong": wrong,
+    }
+
+
+def main():
+    args = parse_args()
+    corpus = json.loads(args.corpus.read_text(encoding="utf-8"))
+    groups = corpus["groups"]
+    redirects = corpus.get("redirects", {})
+    settings.youtube_api_key = ""
+    short_links.fetch = redirects.get
+
+    legacy = score(groups, legacy_content_id)
+    canonical = score(groups, lambda url: parse_content(url).content_id)
+
+    print("=== URL Canonicalization Corpus ===")
+    print(f"Corpus: {args.corpus} ({canonical['urls']} URLs, {canonical['contents']} contents)")
+    print(f"{'platform':<10} {'urls':>5} {'contents':>9} {'legacy ids':>11} {'canonical ids':>14}")
+    for platform, row in sorted(canonical["per_platform"].items()):
+        legacy_ids = legacy["per_platform"][platform]["ids"]
+        print(f"{platform:<10} {row['urls']:>5} {row['contents']:>9} {legacy_ids:>11} {row['ids']:>14}")
+    for name, result in [("legacy", legacy), ("canonical", canonical)]:
+        print(
+            f"{name:<10} distinct_ids={result['distinct_ids']} duplicate_ids={result['duplicate_ids']} "
+            f"collisions={result['collisions']} wrong_ids={result['wrong_ids']}"
+        )
+    removed = legacy["duplicate_ids"] - canonical["duplicate_ids"]
+    share = removed / legacy["duplicate_ids"] if legacy["duplicate_ids"] else 0.0
+    print(f"Duplicate ids removed: {removed} of {legacy['duplicate_ids']} ({share:.1%})")
+
+    if args.verbose:
+        for url, got, expected in canonical["_wrong"]:
+            print(f"  wrong: {url} -> {got} (expected {expected})")
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "corpus": str(args.corpus),
+                "legacy": {key: value for key, value in legacy.items() if not key.startswith("_")},
+                "canonical": {key: value for key, value in canonical.items() if not key.startswith("_")},
+                "duplicate_ids_removed": removed,
+            },
+            file,
+            indent=2,
+        )
+    print(f"Results written to {args.out.resolve()}")
+
+    # Non-zero exit so the corpus doubles as a regression check.
+    if canonical["duplicate_ids"] or canonical["collisions"] or canonical["wrong_ids"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import resource
+import threading
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from time import perf_counter
+
+import cv2
+import numpy as np
+import onnxruntime as ort
+
+from model_service import inference
+from model_service.metrics import STAGE_LATENCY
+
+CODEC_EXTENSIONS = {"mp4v": ".mp4", "MJPG": ".avi", "XVID": ".avi", "VP80": ".webm"}
+STAGES = ["open", "decode", "convert", "preprocess", "session_run", "aggregate"]
+
+
+@dataclass(frozen=True)
+class VideoSpec:
+    width: int
+    height: int
+    seconds: int
+    fps: int
+    codec: str
+    keyframe_interval: int
+
+    @property
+    def filename(self) -> str:
+        extension = CODEC_EXTENSIONS.get(self.codec, ".mp4")
+        return (
+            f"synthetic_{self.width}x{self.height}_{self.seconds}s_{self.fps}fps_"
+            f"{self.codec}_gop{self.keyframe_interval}{extension}"
+        )
+
+
+@dataclass(frozen=True)
+class RunConfig:
+    strategy: str
+    max_frames: int
+    batch_size: int
+    intra_op_threads: int
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Benchmark frame sampling + ONNX scoring on synthetic videos and a tiny random model."
+    )
+    parser.add_argument("--work-dir", type=Path, default=Path("benchmarks/results/video_assets"))
+    parser.add_argument("--resolutions", type=str, default="640x360,1280x720")
+    parser.add_argument("--durations", type=str, default="5,20", help="Video lengths in seconds.")
+    parser.add_argument("--fps", type=int, default=25)
+    parser.add_argument("--codecs", type=str, default="mp4v,MJPG")
+    parser.add_argument("--keyframe-intervals", type=str, default="12,250")
+    parser.add_argument(
+        "--strategies",
+        type=str,
+        default="pipeline,seek,grab",
+        help=(
+            "pipeline = current _extract_video_frame_scores, seek = set POS_FRAMES per sample, "
+            "grab = decode forward and only retrieve sampled frames."
+        ),
+    )
+    parser.add_argument("--max-frames", type=str, default="10,30")
+    parser.add_argument("--batch-sizes", type=str, default="1,10")
+    parser.add_argument("--threads", type=str, default="0", help="onnxruntime intra-op threads (0 = default).")
+    parser.add_argument("--repeats", type=int, default=1)
+    parser.add_argument("--out", type=Path, default=Path("benchmarks/results/video_pipeline.json"))
+    return parser.parse_args()
+
+
+def _int_list(raw: str) -> list[int]:
+    return [int(value) for value in raw.split(",") if value.strip()]
+
+
+def _str_list(raw: str) -> list[str]:
+    return [value.strip() for value in raw.split(",") if value.strip()]
+
+
+def build_tiny_model(path: Path, seed: int = 0):
+    # Same I/O contract as the exported classifier: input [batch,3,224,224] -> logits [batch,1].
+    import onnx
+    from onnx import TensorProto, helper, numpy_helper
+
+    rng = np.random.default_rng(seed)
+    conv_w = rng.normal(0, 0.1, size=(8, 3, 3, 3)).astype(np.float32)
+    conv_b = np.zeros(8, dtype=np.float32)
+    fc_w = rng.normal(0, 0.1, size=(8, 1)).astype(np.float32)
+    fc_b = np.zeros(1, dtype=np.float32)
+
+    graph = helper.make_graph(
+        [
+            helper.make_node("Conv", ["input", "conv_w", "conv_b"], ["conv"], strides=[2, 2], pads=[1, 1, 1, 1]),
+            helper.make_node("Relu", ["conv"], ["relu"]),
+            helper.make_node("GlobalAveragePool", ["relu"], ["pool"]),
+            helper.make_node("Flatten", ["pool"], ["flat"]),
+            helper.make_node("Gemm", ["flat", "fc_w", "fc_b"], ["logits"]),
+        ],
+        "tiny_random_classifier",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, ["batch", 3, 224, 224])],
+        [helper.make_tensor_value_info("logits", TensorProto.FLOAT, ["batch", 1])],
+        initializer=[
+            numpy_helper.from_array(conv_w, "conv_w"),
+            numpy_helper.from_array(conv_b, "conv_b"),
+            numpy_helper.from_array(fc_w, "fc_w"),
+            numpy_helper.from_array(fc_b, "fc_b"),
+        ],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 17)])
+    model.ir_version = 8
+    onnx.checker.check_model(model)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    onnx.save(model, str(path))
+
+
+def generate_video(spec: VideoSpec, path: Path) -> bool:
+    params = []
+    if hasattr(cv2, "VIDEOWRITER_PROP_KEY_INTERVAL"):
+        params = [cv2.VIDEOWRITER_PROP_KEY_INTERVAL, spec.keyframe_interval]
+    writer = cv2.VideoWriter(
+        str(path),
+        cv2.CAP_FFMPEG,
+        cv2.VideoWriter_fourcc(*spec.codec),
+        spec.fps,
+        (spec.width, spec.height),
+        params,
+    )
+    if not writer.isOpened():
+        return False
+
+    rng = np.random.default_rng(1)
+    x = np.broadcast_to(np.linspace(0, 255, spec.width, dtype=np.float32), (spec.height, spec.width))
+    y = np.broadcast_to(np.linspace(0, 255, spec.height, dtype=np.float32)[:, None], (spec.height, spec.width))
+    base = np.stack([x, y, (x + y) / 2], axis=-1).astype(np.uint8)
+    for index in range(spec.seconds * spec.fps):
+        # Moving gradient plus a noisy patch keeps the encoder doing real work.
+        frame = np.roll(base, shift=index * 4, axis=1)
+        patch_y = (index * 3) % max(1, spec.height - 64)
+        frame[patch_y : patch_y + 64, :128] = rng.integers(0, 256, size=(min(64, spec.height), 128, 3), dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+    return path.exists() and path.stat().st_size > 0
+
+
+class PeakRssSampler:
+    def __init__(self, interval_seconds: float = 0.005):
+        self.interval_seconds = interval_seconds
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    @staticmethod
+    def current_kb() -> int:
+        try:
+            with open("/proc/self/status", encoding="utf-8") as status:
+                for line in status:
+                    if line.startswith("VmRSS:"):
+                        return int(line.split()[1])
+        except OSError:
+            pass
+        # Non-Linux fallback: lifetime peak (kilobytes on Linux, bytes on macOS).
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, self.current_kb())
+            self._stop.wait(self.interval_seconds)
+
+    def __enter__(self) -> PeakRssSampler:
+        self.peak_kb = self.current_kb()
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, self.current_kb())
+
+
+def make_session(model_path: Path, intra_op_threads: int) -> ort.InferenceSession:
+    options = ort.SessionOptions()
+    if intra_op_threads > 0:
+        options.intra_op_num_threads = intra_op_threads
+    return ort.InferenceSession(str(model_path), sess_options=options)
+
+
+def _score_batch(session: ort.InferenceSession, tensors: list[np.ndarray], stages: dict[str, float]) -> list[float]:
+    batch = np.concatenate(tensors, axis=0)
+    input_name = session.get_inputs()[0].name
+    started = perf_counter()
+    logits = np.ravel(session.run(None, {input_name: batch})[0])
+    stages["session_run"] += perf_counter() - started
+    return (1.0 / (1.0 + np.exp(-logits))).tolist()
+
+
+def run_staged(video_path: Path, session: ort.InferenceSession, config: RunConfig) -> tuple[dict[str, float], int]:
+    stages = {stage: 0.0 for stage in STAGES}
+
+    started = perf_counter()
+    capture = cv2.VideoCapture(str(video_path))
+    frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    stages["open"] = perf_counter() - started
+    if not capture.isOpened() or frame_count <= 0:
+        capture.release()
+        return stages, 0
+
+    wanted = np.linspace(0, frame_count - 1, num=min(config.max_frames, frame_count), dtype=int).tolist()
+    wanted_set = set(wanted)
+    pending: list[np.ndarray] = []
+    scores: list[float] = []
+
+    def handle(frame_bgr: np.ndarray):
+        t0 = perf_counter()
+        frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        t1 = perf_counter()
+        resized = cv2.resize(frame_rgb, (224, 224), interpolation=cv2.INTER_AREA)
+        pending.append(inference._preprocess_image_array(resized))
+        t2 = perf_counter()
+        stages["convert"] += t1 - t0
+        stages["preprocess"] += t2 - t1
+        if len(pending) >= config.batch_size:
+            scores.extend(_score_batch(session, pending, stages))
+            pending.clear()
+
+    if config.strategy == "seek":
+        for index in wanted:
+            t0 = perf_counter()
+            capture.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame_bgr = capture.read()
+            stages["decode"] += perf_counter() - t0
+            if ok and frame_bgr is not None:
+                handle(frame_bgr)
+    else:
+        for index in range(wanted[-1] + 1):
+            t0 = perf_counter()
+            if not capture.grab():
+                stages["decode"] += perf_counter() - t0
+                break
+            frame_bgr = None
+            if index in wanted_set:
+                ok, frame_bgr = capture.retrieve()
+                frame_bgr = frame_bgr if ok else None
+            stages["decode"] += perf_counter() - t0
+            if frame_bgr is not None:
+                handle(frame_bgr)
+    capture.release()
+
+    if pending:
+        scores.extend(_score_batch(session, pending, stages))
+
+    t0 = perf_counter()
+    if scores:
+        top_k = sorted(scores, reverse=True)[: min(5, len(scores))]
+        float(np.mean(top_k))
+    stages["aggregate"] = perf_counter() - t0
+    return stages, len(scores)
+
+
+def _stage_sums() -> dict[str, float]:
+    sums: dict[str, float] = {}
+    for metric in STAGE_LATENCY.collect():
+        for sample in metric.samples:
+            if sample.name.endswith("_sum"):
+                sums[sample.labels["stage"]] = sample.value
+    return sums
+
+
+def run_pipeline(video_path: Path, session: ort.InferenceSession, config: RunConfig) -> tuple[dict[str, float], int]:
+    # The production path, timed by its own stage instrumentation.
+    inference._SESSION = session
+    before = _stage_sums()
+    started = perf_counter()
+    scores = inference._extract_video_frame_scores(str(video_path), max_frames=config.max_frames)
+    total_seconds = perf_counter() - started
+    after = _stage_sums()
+    stages = {stage: after.get(stage, 0.0) - before.get(stage, 0.0) for stage in STAGES}
+    # Whatever the stage timers do not cover (open, colour conversion) is reported as open.
+    stages["open"] = max(0.0, total_seconds - sum(stages.values()))
+    return stages, len(scores)
+
+
+def main():
+    args = parse_args()
+    args.work_dir.mkdir(parents=True, exist_ok=True)
+    model_path = args.work_dir / "tiny_random.onnx"
+    if not model_path.exists():
+        build_tiny_model(model_path)
+
+    specs = [
+        VideoSpec(int(res.split("x")[0]), int(res.split("x")[1]), seconds, args.fps, codec, gop)
+        for res, seconds, codec, gop in itertools.product(
+            _str_list(args.resolutions), _int_list(args.durations), _str_list(args.codecs),
+            _int_list(args.keyframe_intervals),
+        )
+    ]
+    configs = [
+        RunConfig(strategy, max_frames, batch_size if strategy != "pipeline" else 1, threads)
+        for strategy, max_frames, batch_size, threads in itertools.product(
+            _str_list(args.strategies), _int_list(args.max_frames), _int_list(args.batch_sizes),
+            _int_list(args.threads),
+        )
+    ]
+    configs = list(dict.fromkeys(configs))
+
+    print("=== Video Pipeline Benchmark ===")
+    results = []
+    sessions: dict[int, ort.InferenceSession] = {}
+    for spec in specs:
+        video_path = args.work_dir / spec.filename
+        if not video_path.exists():
+            print(f"Generating {video_path.name}...")
+            if not generate_video(spec, video_path):
+                print(f"  codec {spec.codec} not available, skipping.")
+                continue
+
+        for config in configs:
+            session = sessions.get(config.intra_op_threads)
+            if session is None:
+                session = sessions[config.intra_op_threads] = make_session(model_path, config.intra_op_threads)
+            runner = run_pipeline if config.strategy == "pipeline" else run_staged
+            totals: dict[str, float] = {}
+            frames = 0
+            with PeakRssSampler() as rss:
+                wall_started = perf_counter()
+                for _ in range(args.repeats):
+                    stages, frames = runner(video_path, session, config)
+                    for stage, seconds in stages.items():
+                        totals[stage] = totals.get(stage, 0.0) + seconds
+                wall_seconds = (perf_counter() - wall_started) / args.repeats
+
+            stages_ms = {stage: round(seconds / args.repeats * 1000, 3) for stage, seconds in totals.items()}
+            result = {
+                "video": {**asdict(spec), "bytes": video_path.stat().st_size},
+                "config": asdict(config),
+                "stagesMs": stages_ms,
+                "totalMs": round(wall_seconds * 1000, 3),
+                "framesScored": frames,
+                "framesPerSec": round(frames / wall_seconds, 2) if wall_seconds > 0 else 0.0,
+                "peakRssMb": round(rss.peak_kb / 1024, 1),
+            }
+            results.append(result)
+            print(
+                f"{spec.width}x{spec.height} {spec.seconds:>3}s {spec.codec:<4} gop={spec.keyframe_interval:<4} "
+                f"{config.strategy:<8} frames={config.max_frames:<3} batch={config.batch_size:<3} "
+                f"threads={config.intra_op_threads} -> {result['totalMs']:9.1f}ms "
+                f"{result['framesPerSec']:7.1f} fps rss={result['peakRssMb']}MB"
+            )
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    args.out.write_text(
+        json.dumps(
+            {
+                "startedAt": datetime.now(timezone.utc).isoformat(),
+                "environment": {
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "cpuCount": os.cpu_count(),
+                    "opencv": cv2.__version__,
+                    "onnxruntime": ort.__version__,
+                },
+                "results": results,
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+    print(f"Results written to {args.out.resolve()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,30 @@
-from fastapi import FastAPI
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from opentelemetry import propagate
+from opentelemetry.trace import SpanKind
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 
 from app.api.routes import router as api_router
+from app.core.config import settings
+from app.core.metrics import REQUEST_LATENCY, REQUESTS_IN_FLIGHT
+from app.core.tracing import configure_tracing, tracer
+from app.services.warmup import warmup_scheduler
+
+configure_tracing()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.warmup_enabled:
+        warmup_scheduler.start()
+    yield
+    warmup_scheduler.stop()
+
 
-app = FastAPI(title="AI Content Guardian Backend", version="1.0.0")
+app = FastAPI(title="AI Content Guardian Backend", version="1.0.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -11,11 +32,39 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-History-Version", "X-Next-Cursor"],
 )
 
 app.include_router(api_router)
 
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=propagate.extract(request.headers),
+        kind=SpanKind.SERVER,
+    ) as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+            span.update_name(f"{request.method} {route}")
+            span.set_attribute("http.response.status_code", status)
+
+
 @app.get("/")
 def root():
     return {"name": "AI Content Guardian Backend", "status": "running"}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
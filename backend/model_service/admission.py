@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator, Literal
+
+WorkClass = Literal["image", "video"]
+
+# Image requests are cheap, so they are always offered a free slot first.
+PRIORITY_ORDER: tuple[WorkClass, ...] = ("image", "video")
+
+MAX_CONCURRENCY = int(os.getenv("MODEL_MAX_CONCURRENCY", "4"))
+MAX_WAIT_SECONDS = float(os.getenv("MODEL_ADMISSION_MAX_WAIT_SECONDS", "30"))
+
+
+class Overloaded(Exception):
+    def __init__(self, work_class: WorkClass, retry_after: int):
+        super().__init__(f"Model service is busy with {work_class} work, retry in {retry_after}s.")
+        self.work_class = work_class
+        self.retry_after = retry_after
+
+
+@dataclass
+class ClassLimits:
+    concurrency: int
+    max_queue: int
+    # Seed for the running average used in Retry-After estimates.
+    expected_seconds: float
+
+
+@dataclass
+class _ClassState:
+    running: int = 0
+    waiting: int = 0
+    avg_seconds: float = 1.0
+
+
+class AdmissionController:
+    def __init__(self, limits: dict[WorkClass, ClassLimits], max_concurrency: int = MAX_CONCURRENCY):
+        self.limits = limits
+        self.max_concurrency = max_concurrency
+        self._cond = threading.Condition()
+        self._state = {
+            work_class: _ClassState(avg_seconds=class_limits.expected_seconds)
+            for work_class, class_limits in limits.items()
+        }
+
+    @contextmanager
+    def slot(self, work_class: WorkClass, background: bool = False) -> Iterator[None]:
+        self.acquire(work_class, background=background)
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(work_class, time.monotonic() - started)
+
+    def acquire(self, work_class: WorkClass, background: bool = False):
+        # Background work (already bounded by the job pool) skips the queue cap
+        # and waits as long as needed; interactive requests are shed instead.
+        state = self._state[work_class]
+        with self._cond:
+            if not background and state.waiting >= self.limits[work_class].max_queue:
+                raise Overloaded(work_class, self._retry_after_locked(work_class))
+
+            deadline = None if background else time.monotonic() + MAX_WAIT_SECONDS
+            state.waiting += 1
+            try:
+                while not self._can_start_locked(work_class):
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        raise Overloaded(work_class, self._retry_after_locked(work_class))
+                    self._cond.wait(remaining)
+            finally:
+                state.waiting -= 1
+            state.running += 1
+
+    def release(self, work_class: WorkClass, elapsed_seconds: float):
+        state = self._state[work_class]
+        with self._cond:
+            state.running -= 1
+            state.avg_seconds = (0.8 * state.avg_seconds) + (0.2 * elapsed_seconds)
+            self._cond.notify_all()
+
+    def retry_after(self, work_class: WorkClass, backlog: int = 0) -> int:
+        with self._cond:
+            return self._retry_after_locked(work_class, backlog)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        with self._cond:
+            return {
+                work_class: {
+                    "running": state.running,
+                    "waiting": state.waiting,
+                    "avgSeconds": round(state.avg_seconds, 3),
+                }
+                for work_class, state in self._state.items()
+            }
+
+    def _can_start_locked(self, work_class: WorkClass) -> bool:
+        state = self._state[work_class]
+        if state.running >= self.limits[work_class].concurrency:
+            return False
+        if sum(s.running for s in self._state.values()) >= self.max_concurrency:
+            return False
+        # Leave the free slot to a higher-priority class that is waiting for it.
+        for other in PRIORITY_ORDER:
+            if other == work_class:
+                break
+            other_state = self._state[other]
+            if other_state.waiting > 0 and other_state.running < self.limits[other].concurrency:
+                return False
+        return True
+
+    def _retry_after_locked(self, work_class: WorkClass, backlog: int = 0) -> int:
+        state = self._state[work_class]
+        ahead = state.waiting + backlog + 1
+        estimate = ahead * state.avg_seconds / max(1, self.limits[work_class].concurrency)
+        return max(1, math.ceil(estimate))
+
+
+admission = AdmissionController(
+    limits={
+        "image": ClassLimits(
+            concurrency=int(os.getenv("MODEL_IMAGE_CONCURRENCY", "4")),
+            max_queue=int(os.getenv("MODEL_IMAGE_MAX_QUEUE", "16")),
+            expected_seconds=0.5,
+        ),
+        "video": ClassLimits(
+            concurrency=int(os.getenv("MODEL_VIDEO_CONCURRENCY", "2")),
+            max_queue=int(os.getenv("MODEL_VIDEO_MAX_QUEUE", "4")),
+            expected_seconds=10.0,
+        ),
+    }
+)
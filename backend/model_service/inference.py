@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from pathlib import Path
 from urllib.parse import urlparse
-from typing import Any
+from typing import Any, Callable
 import math
 import tempfile
 
@@ -11,16 +11,48 @@ import cv2
 import numpy as np
 import onnxruntime as ort
 import requests
-from PIL import Image
-from io import BytesIO
+from PIL import Image, ImageFile
 import yt_dlp
 import json
 import glob
 
+from model_service.metrics import CASCADE_DECISIONS
+from model_service.tracing import trace_stage
 
-MODEL_PATH = Path(__file__).parent / "artifacts" / "model.onnx"
+
+MODEL_PATH = Path(os.getenv("MODEL_ONNX_PATH", str(Path(__file__).parent / "artifacts" / "model.onnx")))
 _SESSION: ort.InferenceSession | None = None
 
+# Optional cheap first-stage model; only scores inside (LOW, HIGH) reach model.onnx.
+CASCADE_MODEL_PATH = os.getenv("MODEL_CASCADE_PATH", "")
+CASCADE_LOW = float(os.getenv("MODEL_CASCADE_LOW", "0.2"))
+CASCADE_HIGH = float(os.getenv("MODEL_CASCADE_HIGH", "0.8"))
+_CASCADE_SESSION: ort.InferenceSession | None = None
+_CASCADE_LOAD_FAILED = False
+_STAGE_REASONS = {
+    "first_stage": "decided by first-stage model",
+    "escalated": "escalated to full model",
+}
+
+MAX_IMAGE_BYTES = int(os.getenv("MODEL_MAX_IMAGE_BYTES", str(10 * 1024 * 1024)))
+IMAGE_CHUNK_BYTES = 64 * 1024
+# Enough leading bytes to recognise every supported container (WEBP needs 12).
+_SNIFF_BYTES = 12
+_IMAGE_SIGNATURES: tuple[tuple[bytes, str], ...] = (
+    (b"\xff\xd8\xff", "jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png"),
+    (b"GIF87a", "gif"),
+    (b"GIF89a", "gif"),
+    (b"BM", "bmp"),
+)
+
+# "download" copies the video to a temp file; "stream" (opt-in) samples frames
+# straight from the remote URL, the decoder issuing HTTP range reads around
+# each seek, and falls back to downloading when that yields no frames.
+VIDEO_SOURCE_MODE = os.getenv("MODEL_VIDEO_SOURCE_MODE", "download").lower()
+VIDEO_STREAM_TIMEOUT_MS = int(os.getenv("MODEL_VIDEO_STREAM_TIMEOUT_MS", "8000"))
+VIDEO_EXTENSIONS = (".mp4", ".mov", ".m4v", ".webm")
+
 
 def _confidence_band(score: float) -> str:
     if score >= 0.80:
@@ -49,8 +81,75 @@ def _load_session() -> ort.InferenceSession | None:
     return _SESSION
 
 
-def _preprocess_image(raw_bytes: bytes) -> np.ndarray:
-    image = Image.open(BytesIO(raw_bytes)).convert("RGB").resize((224, 224))
+def _load_cascade_session() -> ort.InferenceSession | None:
+    global _CASCADE_SESSION, _CASCADE_LOAD_FAILED
+    if _CASCADE_SESSION is not None:
+        return _CASCADE_SESSION
+    if _CASCADE_LOAD_FAILED or not CASCADE_MODEL_PATH or not Path(CASCADE_MODEL_PATH).exists():
+        return None
+    try:
+        _CASCADE_SESSION = ort.InferenceSession(CASCADE_MODEL_PATH)
+    except Exception:
+        # A corrupt first-stage file is not retried on every frame; the full model runs alone.
+        _CASCADE_LOAD_FAILED = True
+        CASCADE_DECISIONS.labels("first_stage_error").inc()
+        return None
+    return _CASCADE_SESSION
+
+
+def _model_input_size(session: ort.InferenceSession) -> int:
+    # Distilled students may be exported at a lower resolution than 224.
+    shape = session.get_inputs()[0].shape
+    return shape[-1] if len(shape) == 4 and isinstance(shape[-1], int) else 224
+
+
+def _sniff_image_format(head: bytes) -> str | None:
+    for signature, image_format in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "webp"
+    return None
+
+
+def _fetch_image(url: str, max_bytes: int = MAX_IMAGE_BYTES) -> Image.Image | None:
+    # Chunks are fed straight into PIL's incremental parser so the payload is
+    # never held twice; None means "not an image" or "over the size cap".
+    with requests.get(url, stream=True, timeout=6) as response:
+        response.raise_for_status()
+
+        declared = response.headers.get("content-length") or ""
+        if declared.isdigit() and int(declared) > max_bytes:
+            return None
+
+        parser = ImageFile.Parser()
+        head: bytes | None = b""
+        downloaded = 0
+        for chunk in response.iter_content(chunk_size=IMAGE_CHUNK_BYTES):
+            if not chunk:
+                continue
+            downloaded += len(chunk)
+            if downloaded > max_bytes:
+                return None
+            if head is not None:
+                head += chunk
+                if len(head) < _SNIFF_BYTES:
+                    continue
+                if _sniff_image_format(head) is None:
+                    return None
+                chunk, head = head, None
+            parser.feed(chunk)
+
+        if head is not None:
+            # Tiny payload that never filled the sniff window.
+            if _sniff_image_format(head) is None:
+                return None
+            parser.feed(head)
+        return parser.close()
+
+
+def _preprocess_image(image: Image.Image, size: int = 224) -> np.ndarray:
+    image = image.convert("RGB").resize((size, size))
     return _preprocess_image_array(np.asarray(image))
 
 
@@ -66,37 +165,88 @@ def _preprocess_image_array(image_rgb: np.ndarray) -> np.ndarray:
     return arr
 
 
-def _run_onnx_model(raw_bytes: bytes) -> float | None:
+def _score_tensor(session: ort.InferenceSession, tensor: np.ndarray, stage: str = "session_run") -> float:
+    input_name = session.get_inputs()[0].name
+    with trace_stage(stage):
+        output = session.run(None, {input_name: tensor})[0]
+    logits = float(np.ravel(output)[0])
+    return 1.0 / (1.0 + math.exp(-logits))
+
+
+def _tensor_per_input_size(build: Callable[[int], np.ndarray]) -> Callable[[ort.InferenceSession], np.ndarray]:
+    # Both cascade stages usually share an input size; preprocess once per size.
+    tensors: dict[int, np.ndarray] = {}
+
+    def tensor_for(session: ort.InferenceSession) -> np.ndarray:
+        size = _model_input_size(session)
+        if size not in tensors:
+            with trace_stage("preprocess"):
+                tensors[size] = build(size)
+        return tensors[size]
+
+    return tensor_for
+
+
+def _cascade_score(tensor_for: Callable[[ort.InferenceSession], np.ndarray]) -> tuple[float, str] | None:
     session = _load_session()
     if session is None:
         return None
+    first_stage = _load_cascade_session()
+    if first_stage is None:
+        return _score_tensor(session, tensor_for(session)), "full"
+
     try:
-        tensor = _preprocess_image(raw_bytes)
-        input_name = session.get_inputs()[0].name
-        output = session.run(None, {input_name: tensor})[0]
-        logits = float(np.ravel(output)[0])
-        return 1.0 / (1.0 + math.exp(-logits))
+        score = _score_tensor(first_stage, tensor_for(first_stage), stage="cascade_session_run")
     except Exception:
-        return None
+        # e.g. an input-shape mismatch: a broken first stage must not take the healthy full model down with it.
+        CASCADE_DECISIONS.labels("first_stage_error").inc()
+        return _score_tensor(session, tensor_for(session)), "full"
+    if not CASCADE_LOW < score < CASCADE_HIGH:
+        CASCADE_DECISIONS.labels("first_stage").inc()
+        return score, "first_stage"
+    CASCADE_DECISIONS.labels("escalated").inc()
+    return _score_tensor(session, tensor_for(session)), "escalated"
 
 
-def _run_onnx_model_from_rgb(image_rgb: np.ndarray) -> float | None:
-    session = _load_session()
-    if session is None:
+def _run_onnx_model(image: Image.Image) -> tuple[float, str] | None:
+    try:
+        return _cascade_score(_tensor_per_input_size(lambda size: _preprocess_image(image, size)))
+    except Exception:
         return None
+
+
+def _run_onnx_model_from_rgb(image_rgb: np.ndarray) -> tuple[float, str] | None:
+    def build(size: int) -> np.ndarray:
+        resized = cv2.resize(image_rgb, (size, size), interpolation=cv2.INTER_AREA)
+        return _preprocess_image_array(resized)
+
     try:
-        resized = cv2.resize(image_rgb, (224, 224), interpolation=cv2.INTER_AREA)
-        tensor = _preprocess_image_array(resized)
-        input_name = session.get_inputs()[0].name
-        output = session.run(None, {input_name: tensor})[0]
-        logits = float(np.ravel(output)[0])
-        return 1.0 / (1.0 + math.exp(-logits))
+        return _cascade_score(_tensor_per_input_size(build))
     except Exception:
         return None
 
 
-def _extract_video_frame_scores(video_path: str, max_frames: int = 10) -> list[float]:
-    capture = cv2.VideoCapture(video_path)
+def _open_capture(video_source: str) -> cv2.VideoCapture:
+    if not video_source.startswith(("http://", "https://")):
+        return cv2.VideoCapture(video_source)
+    return cv2.VideoCapture(
+        video_source,
+        cv2.CAP_FFMPEG,
+        [
+            cv2.CAP_PROP_OPEN_TIMEOUT_MSEC,
+            VIDEO_STREAM_TIMEOUT_MS,
+            cv2.CAP_PROP_READ_TIMEOUT_MSEC,
+            VIDEO_STREAM_TIMEOUT_MS,
+        ],
+    )
+
+
+def _extract_video_frame_scores(video_source: str, max_frames: int = 10) -> list[float]:
+    return [score for score, _ in _extract_video_frame_results(video_source, max_frames)]
+
+
+def _extract_video_frame_results(video_source: str, max_frames: int = 10) -> list[tuple[float, str]]:
+    capture = _open_capture(video_source)
     if not capture.isOpened():
         return []
 
@@ -106,19 +256,21 @@ def _extract_video_frame_scores(video_path: str, max_frames: int = 10) -> list[f
         return []
 
     frame_indexes = np.linspace(0, frame_count - 1, num=min(max_frames, frame_count), dtype=int)
-    scores: list[float] = []
+    results: list[tuple[float, str]] = []
     for index in frame_indexes:
-        capture.set(cv2.CAP_PROP_POS_FRAMES, int(index))
-        ok, frame_bgr = capture.read()
+        with trace_stage("decode"):
+            capture.set(cv2.CAP_PROP_POS_FRAMES, int(index))
+            ok, frame_bgr = capture.read()
         if not ok or frame_bgr is None:
             continue
         frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        score = _run_onnx_model_from_rgb(frame_rgb)
-        if score is not None:
-            scores.append(float(max(0.0, min(1.0, score))))
+        result = _run_onnx_model_from_rgb(frame_rgb)
+        if result is not None:
+            score, stage = result
+            results.append((float(max(0.0, min(1.0, score))), stage))
 
     capture.release()
-    return scores
+    return results
 
 def _url_platform(url: str) -> str:
     host = urlparse(url).netloc.lower()
@@ -130,6 +282,49 @@ def _url_platform(url: str) -> str:
         return "tiktok"
     return "other"
 
+def _resolve_ytdlp_stream_url(url: str) -> str | None:
+    try:
+        ydl_opts = {
+            # A single progressive (or video-only) file over plain HTTP(S) is
+            # seekable with range requests; merged/HLS formats are not. Capped at
+            # 720p H.264 so the decoder never gets 4K or AV1 streams it cannot open.
+            "format": (
+                "bestvideo[ext=mp4][protocol^=http][height<=720][vcodec^=avc1]"
+                "/best[ext=mp4][protocol^=http][height<=720][vcodec^=avc1]"
+            ),
+            "noplaylist": True,
+            "quiet": True,
+            "no_warnings": True,
+        }
+        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            info = ydl.extract_info(url, download=False)
+        return info.get("url") if info else None
+    except Exception:
+        return None
+
+
+def _resolve_direct_stream_url(url: str) -> str | None:
+    try:
+        response = requests.head(url, allow_redirects=True, timeout=6)
+        response.raise_for_status()
+    except Exception:
+        return None
+
+    content_type = (response.headers.get("content-type") or "").lower()
+    if "video/" not in content_type and not url.lower().endswith(VIDEO_EXTENSIONS):
+        return None
+    if (response.headers.get("accept-ranges") or "").lower() != "bytes":
+        # Without range support every seek would restart the transfer.
+        return None
+    return response.url
+
+
+def _resolve_stream_url(url: str) -> str | None:
+    if _url_platform(url) in {"youtube", "instagram", "tiktok"}:
+        return _resolve_ytdlp_stream_url(url)
+    return _resolve_direct_stream_url(url)
+
+
 def _download_with_ytdlp(url: str, max_bytes: int) -> str | None:
     try:
         with tempfile.TemporaryDirectory() as tmp_dir:
@@ -172,9 +367,7 @@ def _download_video_to_temp_file(url: str, max_bytes: int = 40 * 1024 * 1024) ->
             response.raise_for_status()
 
             content_type = (response.headers.get("content-type") or "").lower()
-            looks_like_video = "video/" in content_type or url.lower().endswith(
-                (".mp4", ".mov", ".m4v", ".webm")
-            )
+            looks_like_video = "video/" in content_type or url.lower().endswith(VIDEO_EXTENSIONS)
             if not looks_like_video:
                 return None
 
@@ -269,16 +462,27 @@ def _download_video_to_temp_file(url: str, max_bytes: int = 40 * 1024 * 1024) ->
 
 
 def infer_image_url(url: str) -> dict[str, Any]:
-    try:
-        response = requests.get(url, timeout=6)
-        response.raise_for_status()
-        model_score = _run_onnx_model(response.content)
-    except Exception:
-        model_score = None
-
-    if model_score is None:
+    model_score = None
+    stage = "full"
+    reason = "Used URL fallback heuristic because ONNX inference is unavailable."
+    if _load_session() is not None:
+        try:
+            with trace_stage("download"):
+                image = _fetch_image(url)
+            if image is None:
+                reason = "Image was not a supported format or exceeded size cap; used URL fallback heuristic."
+            else:
+                result = _run_onnx_model(image)
+                if result is not None:
+                    model_score, stage = result
+        except Exception:
+            model_score = None
+
+    fallback = model_score is None
+    if fallback:
         model_score = _heuristic_score_from_url(url)
-        reason = "Used URL fallback heuristic because ONNX inference is unavailable."
+    elif stage in _STAGE_REASONS:
+        reason = f"Used ONNX image model inference ({_STAGE_REASONS[stage]})."
     else:
         reason = "Used ONNX image model inference."
 
@@ -286,6 +490,8 @@ def infer_image_url(url: str) -> dict[str, Any]:
         "score": float(max(0.0, min(1.0, model_score))),
         "confidenceBand": _confidence_band(model_score),
         "reason": reason,
+        # Heuristic scores are not model output; callers must not cache them as such.
+        "fallback": fallback,
     }
 
 
@@ -296,33 +502,56 @@ def infer_video_url(url: str) -> dict[str, Any]:
             "score": score,
             "confidenceBand": _confidence_band(score),
             "reason": "ONNX model not found; used URL heuristic fallback.",
+            "fallback": True,
         }
 
-    video_path = _download_video_to_temp_file(url)
-    if video_path is None:
-        score = _heuristic_score_from_url(url)
-        return {
-            "score": score,
-            "confidenceBand": _confidence_band(score),
-            "reason": "Video download failed or exceeded size cap; used URL heuristic fallback.",
-        }
+    frame_results: list[tuple[float, str]] = []
+    source_label = "remote stream"
+    if VIDEO_SOURCE_MODE == "stream":
+        with trace_stage("stream_resolve"):
+            stream_url = _resolve_stream_url(url)
+        if stream_url is not None:
+            frame_results = _extract_video_frame_results(stream_url)
+
+    if not frame_results:
+        source_label = "downloaded file"
+        with trace_stage("download"):
+            video_path = _download_video_to_temp_file(url)
+        if video_path is None:
+            score = _heuristic_score_from_url(url)
+            return {
+                "score": score,
+                "confidenceBand": _confidence_band(score),
+                "reason": "Video download failed or exceeded size cap; used URL heuristic fallback.",
+                "fallback": True,
+            }
 
-    frame_scores = _extract_video_frame_scores(video_path)
-    Path(video_path).unlink(missing_ok=True)
+        frame_results = _extract_video_frame_results(video_path)
+        Path(video_path).unlink(missing_ok=True)
 
-    if not frame_scores:
+    if not frame_results:
         score = _heuristic_score_from_url(url)
         return {
             "score": score,
             "confidenceBand": _confidence_band(score),
             "reason": "Could not extract model-usable frames; used URL heuristic fallback.",
+            "fallback": True,
         }
 
-    sorted_scores = sorted(frame_scores, reverse=True)
-    top_k = sorted_scores[: min(5, len(sorted_scores))]
-    score = float(np.mean(top_k))
+    with trace_stage("aggregate"):
+        sorted_scores = sorted((frame_score for frame_score, _ in frame_results), reverse=True)
+        top_k = sorted_scores[: min(5, len(sorted_scores))]
+        score = float(np.mean(top_k))
+    detail = f"{len(frame_results)} frames analyzed from {source_label}"
+    escalated = sum(1 for _, stage in frame_results if stage == "escalated")
+    if any(stage in _STAGE_REASONS for _, stage in frame_results):
+        detail += (
+            f"; {len(frame_results) - escalated} decided by first-stage model, "
+            f"{escalated} escalated to full model"
+        )
     return {
         "score": score,
         "confidenceBand": _confidence_band(score),
-        "reason": f"ONNX frame sampling used ({len(frame_scores)} frames analyzed).",
+        "reason": f"ONNX frame sampling used ({detail}).",
+        "fallback": False,
     }
@@ -0,0 +1,175 @@
+from __future__ import annotations
+
+import contextvars
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Literal
+
+import requests
+
+from model_service.admission import Overloaded, admission
+from model_service.metrics import JOBS, record_cache_lookup
+
+JobStatus = Literal["queued", "running", "done", "failed"]
+JobKind = Literal["image", "video"]
+
+JOB_WORKERS = int(os.getenv("MODEL_JOB_WORKERS", "2"))
+JOB_RESULT_TTL_SECONDS = int(os.getenv("MODEL_JOB_RESULT_TTL_SECONDS", "900"))
+JOB_MAX_QUEUED = int(os.getenv("MODEL_JOB_MAX_QUEUED", "32"))
+JOB_CALLBACK_TIMEOUT_SECONDS = 5
+
+
+@dataclass
+class InferenceJob:
+    job_id: str
+    kind: JobKind
+    media_url: str
+    status: JobStatus = "queued"
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    callback_urls: list[str] = field(default_factory=list)
+    created_at: float = field(default_factory=time.time)
+    finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.status in {"done", "failed"}
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "jobId": self.job_id,
+            "kind": self.kind,
+            "mediaUrl": self.media_url,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at,
+        }
+
+
+class JobManager:
+    def __init__(
+        self,
+        workers: int = JOB_WORKERS,
+        result_ttl_seconds: int = JOB_RESULT_TTL_SECONDS,
+        max_queued: int = JOB_MAX_QUEUED,
+    ):
+        self.workers = workers
+        self.result_ttl_seconds = result_ttl_seconds
+        self.max_queued = max_queued
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="infer-job")
+        self._lock = threading.Lock()
+        self._jobs: dict[str, InferenceJob] = {}
+        # (kind, media_url) -> job id of the newest non-failed job for that media.
+        self._by_media: dict[tuple[str, str], str] = {}
+
+    def submit(
+        self,
+        kind: JobKind,
+        media_url: str,
+        runner: Callable[[str], dict[str, Any]],
+        callback_url: str | None = None,
+    ) -> dict[str, Any]:
+        # Prune, dedupe lookup, queue cap and insert share one critical section so
+        # identical submissions arriving together end up on the same job.
+        backlog = None
+        with self._lock:
+            self._prune_locked()
+            existing_id = self._by_media.get((kind, media_url))
+            existing = self._jobs.get(existing_id) if existing_id else None
+            # Failed jobs and heuristic fallbacks (e.g. a transient download error) are retried.
+            if existing is not None and (existing.status == "failed" or (existing.result or {}).get("fallback")):
+                existing = None
+            record_cache_lookup("job_dedupe", existing is not None)
+            if existing is not None:
+                snapshot = existing.to_dict()
+                notify_now = callback_url is not None and existing.finished
+                if callback_url is not None and not existing.finished:
+                    existing.callback_urls.append(callback_url)
+            else:
+                queued = sum(1 for queued_job in self._jobs.values() if queued_job.status == "queued")
+                if queued >= self.max_queued:
+                    backlog = queued // max(1, self.workers)
+                else:
+                    job = InferenceJob(job_id=uuid.uuid4().hex, kind=kind, media_url=media_url)
+                    if callback_url is not None:
+                        job.callback_urls.append(callback_url)
+                    self._jobs[job.job_id] = job
+                    self._by_media[(kind, media_url)] = job.job_id
+                    snapshot = job.to_dict()
+
+        if backlog is not None:
+            # Outside the lock: retry_after takes the admission controller's lock.
+            raise Overloaded(kind, admission.retry_after(kind, backlog=backlog))
+
+        if existing is not None:
+            if notify_now:
+                self._executor.submit(self._send_callback, callback_url, snapshot)
+            return snapshot
+
+        # Carry the submitter's trace context into the worker thread.
+        self._executor.submit(contextvars.copy_context().run, self._run, job, runner)
+        return snapshot
+
+    def count(self, status: JobStatus) -> int:
+        with self._lock:
+            return sum(1 for job in self._jobs.values() if job.status == status)
+
+    def get(self, job_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job is not None else None
+
+    def _run(self, job: InferenceJob, runner: Callable[[str], dict[str, Any]]):
+        with self._lock:
+            job.status = "running"
+
+        result: dict[str, Any] | None = None
+        error: str | None = None
+        try:
+            with admission.slot(job.kind, background=True):
+                result = runner(job.media_url)
+        except Exception as exc:
+            error = str(exc) or exc.__class__.__name__
+
+        with self._lock:
+            job.result = result
+            job.error = error
+            job.status = "done" if error is None else "failed"
+            job.finished_at = time.time()
+            callback_urls = list(job.callback_urls)
+            snapshot = job.to_dict()
+
+        for callback_url in callback_urls:
+            self._send_callback(callback_url, snapshot)
+
+    @staticmethod
+    def _send_callback(callback_url: str, snapshot: dict[str, Any]):
+        try:
+            requests.post(callback_url, json=snapshot, timeout=JOB_CALLBACK_TIMEOUT_SECONDS)
+        except Exception:
+            # Callbacks are best effort; the result stays available for polling.
+            pass
+
+    def _prune_locked(self):
+        cutoff = time.time() - self.result_ttl_seconds
+        expired = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            job = self._jobs.pop(job_id)
+            key = (job.kind, job.media_url)
+            if self._by_media.get(key) == job_id:
+                del self._by_media[key]
+
+
+jobs = JobManager()
+for _status in ("queued", "running"):
+    JOBS.labels(_status).set_function(lambda status=_status: jobs.count(status))
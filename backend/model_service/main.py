@@ -1,11 +1,61 @@
-from fastapi import FastAPI
+import time
+
+from fastapi import FastAPI, HTTPException, Request, Response
+from fastapi.responses import JSONResponse
+from opentelemetry import propagate
+from opentelemetry.trace import SpanKind
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from pydantic import BaseModel, HttpUrl
 
+from model_service.admission import Overloaded, admission
 from model_service.inference import infer_image_url, infer_video_url
+from model_service.jobs import jobs
+from model_service.metrics import ADMISSION_REJECTED, REQUEST_LATENCY, REQUESTS_IN_FLIGHT, record_cache_lookup
+from model_service.singleflight import SingleFlight
+from model_service.tracing import configure_tracing, tracer
+
+configure_tracing()
+
+# Identical synchronous requests arriving together run one inference. Only the
+# caller doing the work holds an admission slot; the others wait for its result.
+# Jobs already deduplicate per media URL in JobManager.
+inflight = SingleFlight()
 
 app = FastAPI(title="AI Content Guardian Model Service", version="1.0.0")
 
 
+@app.middleware("http")
+async def observe_request(request: Request, call_next):
+    REQUESTS_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
+    with tracer.start_as_current_span(
+        f"{request.method} {request.url.path}",
+        context=propagate.extract(request.headers),
+        kind=SpanKind.SERVER,
+    ) as span:
+        try:
+            response = await call_next(request)
+            status = response.status_code
+            return response
+        finally:
+            REQUESTS_IN_FLIGHT.dec()
+            route = getattr(request.scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+            span.update_name(f"{request.method} {route}")
+            span.set_attribute("http.response.status_code", status)
+
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, exc: Overloaded):
+    ADMISSION_REJECTED.labels(exc.work_class).inc()
+    return JSONResponse(
+        status_code=429,
+        content={"detail": str(exc), "retryAfter": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
 class ImageRequest(BaseModel):
     imageUrl: HttpUrl
 
@@ -14,16 +64,67 @@ class VideoRequest(BaseModel):
     videoUrl: HttpUrl
 
 
+class ImageJobRequest(ImageRequest):
+    callbackUrl: HttpUrl | None = None
+
+
+class VideoJobRequest(VideoRequest):
+    callbackUrl: HttpUrl | None = None
+
+
 @app.get("/health")
 def health():
-    return {"ok": True}
+    return {"ok": True, "load": admission.snapshot()}
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def _infer_coalesced(kind: str, url: str, runner) -> dict:
+    def run() -> dict:
+        with admission.slot(kind):
+            return runner(url)
+
+    result, shared = inflight.do((kind, url), run)
+    record_cache_lookup("inflight_inference", shared)
+    return result
 
 
 @app.post("/infer-image")
 def infer_image(payload: ImageRequest):
-    return infer_image_url(str(payload.imageUrl))
+    return _infer_coalesced("image", str(payload.imageUrl), infer_image_url)
 
 
 @app.post("/infer-video")
 def infer_video(payload: VideoRequest):
-    return infer_video_url(str(payload.videoUrl))
+    return _infer_coalesced("video", str(payload.videoUrl), infer_video_url)
+
+
+@app.post("/jobs/infer-image", status_code=202)
+def submit_image_job(payload: ImageJobRequest):
+    return jobs.submit(
+        "image",
+        str(payload.imageUrl),
+        infer_image_url,
+        callback_url=str(payload.callbackUrl) if payload.callbackUrl else None,
+    )
+
+
+@app.post("/jobs/infer-video", status_code=202)
+def submit_video_job(payload: VideoJobRequest):
+    return jobs.submit(
+        "video",
+        str(payload.videoUrl),
+        infer_video_url,
+        callback_url=str(payload.callbackUrl) if payload.callbackUrl else None,
+    )
+
+
+@app.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired.")
+    return job
@@ -0,0 +1,67 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+from model_service.admission import admission
+
+# Covers per-frame preprocessing (sub-millisecond) up to whole video downloads.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STAGE_LATENCY = Histogram(
+    "model_stage_duration_seconds",
+    "Time spent in each inference pipeline stage.",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+CACHE_LOOKUPS = Counter(
+    "model_cache_lookups_total",
+    "Cache lookups by cache name and result (hit/miss).",
+    ["cache", "result"],
+)
+REQUEST_LATENCY = Histogram(
+    "model_http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+REQUESTS_IN_FLIGHT = Gauge(
+    "model_http_requests_in_flight",
+    "HTTP requests currently being handled.",
+)
+ADMISSION_RUNNING = Gauge(
+    "model_admission_running",
+    "Inference work currently holding an admission slot.",
+    ["work_class"],
+)
+ADMISSION_WAITING = Gauge(
+    "model_admission_waiting",
+    "Inference work queued for an admission slot.",
+    ["work_class"],
+)
+JOBS = Gauge(
+    "model_jobs",
+    "Inference jobs by status.",
+    ["status"],
+)
+ADMISSION_REJECTED = Counter(
+    "model_admission_rejected_total",
+    "Requests shed with 429 by admission control.",
+    ["work_class"],
+)
+CASCADE_DECISIONS = Counter(
+    "model_cascade_decisions_total",
+    "Cascade outcomes per image/frame: decided by the first stage, escalated to the full model, or first_stage_error.",
+    ["outcome"],
+)
+
+# Queue gauges are read from the controller at scrape time, so the hot path
+# pays nothing for them.
+for _work_class in admission.limits:
+    ADMISSION_RUNNING.labels(_work_class).set_function(
+        lambda work_class=_work_class: admission.snapshot()[work_class]["running"]
+    )
+    ADMISSION_WAITING.labels(_work_class).set_function(
+        lambda work_class=_work_class: admission.snapshot()[work_class]["waiting"]
+    )
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    CACHE_LOOKUPS.labels(cache, "hit" if hit else "miss").inc()
@@ -0,0 +1,45 @@
+import os
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Iterator
+
+from opentelemetry import trace
+from opentelemetry.sdk.resources import Resource
+from opentelemetry.sdk.trace import TracerProvider
+from opentelemetry.sdk.trace.export import BatchSpanProcessor, ConsoleSpanExporter
+from opentelemetry.sdk.trace.sampling import ParentBased, TraceIdRatioBased
+
+from model_service.metrics import STAGE_LATENCY
+
+TRACE_SAMPLE_RATIO = float(os.getenv("TRACE_SAMPLE_RATIO", "0.1"))
+TRACE_EXPORT_PATH = os.getenv("TRACE_EXPORT_PATH", "")
+TRACE_OTLP_ENDPOINT = os.getenv("TRACE_OTLP_ENDPOINT", "")
+
+tracer = trace.get_tracer("aislopguard.model_service")
+
+
+def configure_tracing():
+    # ParentBased keeps the backend's sampling decision for propagated traces.
+    provider = TracerProvider(
+        resource=Resource.create({"service.name": "aislopguard-model-service"}),
+        sampler=ParentBased(TraceIdRatioBased(TRACE_SAMPLE_RATIO)),
+    )
+    if TRACE_EXPORT_PATH:
+        out = open(TRACE_EXPORT_PATH, "a", encoding="utf-8")
+        exporter = ConsoleSpanExporter(out=out, formatter=lambda span: span.to_json(indent=None) + "\n")
+        provider.add_span_processor(BatchSpanProcessor(exporter))
+    if TRACE_OTLP_ENDPOINT:
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+
+        provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=TRACE_OTLP_ENDPOINT)))
+    trace.set_tracer_provider(provider)
+
+
+@contextmanager
+def trace_stage(stage: str) -> Iterator[None]:
+    started = perf_counter()
+    with tracer.start_as_current_span(stage):
+        try:
+            yield
+        finally:
+            STAGE_LATENCY.labels(stage).observe(perf_counter() - started)
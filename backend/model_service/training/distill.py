@@ -0,0 +1,240 @@
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from pathlib import Path
+
+import numpy as np
+import onnxruntime as ort
+import timm
+import torch
+import torch.nn.functional as F
+from torch import nn
+from tqdm import tqdm
+
+from evaluation import roc_auc
+from export_onnx import export_checkpoint, load_checkpoint_model
+from train import autocast_context, evaluate, get_device, make_loaders
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Distill the trained classifier into smaller students and compare latency vs AUC."
+    )
+    parser.add_argument("--data-dir", type=Path, default=Path("data"))
+    parser.add_argument("--data-format", choices=["folder", "shards"], default="folder")
+    parser.add_argument("--shards-dir", type=Path, default=None)
+    parser.add_argument("--teacher-checkpoint", type=Path, default=Path("artifacts/best.pt"))
+    parser.add_argument(
+        "--students",
+        type=str,
+        default="mobilenetv3_small_100:224,mobilenetv3_small_100:160,mobilenetv3_large_100:160",
+        help="Comma-separated timm_model_name:input_size pairs.",
+    )
+    parser.add_argument("--out-dir", type=Path, default=Path("artifacts/students"))
+    parser.add_argument("--epochs", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--lr", type=float, default=3e-4)
+    parser.add_argument("--temperature", type=float, default=2.0, help="Softens teacher and student logits.")
+    parser.add_argument(
+        "--alpha",
+        type=float,
+        default=0.3,
+        help="Weight of the hard-label loss; 1 - alpha goes to matching the teacher.",
+    )
+    parser.add_argument(
+        "--pretrained",
+        action=argparse.BooleanOptionalAction,
+        default=True,
+        help="Start students from ImageNet weights.",
+    )
+    parser.add_argument("--num-workers", type=int, default=2)
+    parser.add_argument("--bf16", action="store_true", help="bfloat16 autocast for forward passes.")
+    parser.add_argument("--latency-runs", type=int, default=100, help="Timed single-image ONNX runs per model.")
+    parser.add_argument("--latency-threads", type=int, default=1, help="onnxruntime intra-op threads when timing.")
+    return parser.parse_args()
+
+
+def parse_students(raw: str) -> list[tuple[str, int]]:
+    students = []
+    for part in raw.split(","):
+        if not part.strip():
+            continue
+        name, _, size = part.strip().partition(":")
+        students.append((name, int(size or 224)))
+    return students
+
+
+class AtResolution(nn.Module):
+    """Feeds a model its own input size from the 224x224 batches the loaders produce."""
+
+    def __init__(self, model: nn.Module, input_size: int):
+        super().__init__()
+        self.model = model
+        self.input_size = input_size
+
+    def forward(self, images: torch.Tensor) -> torch.Tensor:
+        if images.shape[-1] != self.input_size or images.shape[-2] != self.input_size:
+            images = F.interpolate(
+                images, size=(self.input_size, self.input_size), mode="bilinear", antialias=True, align_corners=False
+            )
+        return self.model(images)
+
+
+def distillation_loss(
+    student_logits: torch.Tensor, teacher_logits: torch.Tensor, targets: torch.Tensor, temperature: float, alpha: float
+) -> torch.Tensor:
+    hard = F.binary_cross_entropy_with_logits(student_logits, targets)
+    soft_targets = torch.sigmoid(teacher_logits / temperature)
+    # T^2 keeps the soft-loss gradient scale independent of the temperature.
+    soft = F.binary_cross_entropy_with_logits(student_logits / temperature, soft_targets) * temperature**2
+    return alpha * hard + (1 - alpha) * soft
+
+
+def measure_onnx_latency(onnx_path: Path, input_size: int, runs: int, threads: int) -> dict:
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = threads
+    session = ort.InferenceSession(str(onnx_path), options)
+    input_name = session.get_inputs()[0].name
+    tensor = np.random.default_rng(0).standard_normal((1, 3, input_size, input_size)).astype(np.float32)
+    for _ in range(min(10, runs)):
+        session.run(None, {input_name: tensor})
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        session.run(None, {input_name: tensor})
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    return {
+        "latency_p50_ms": round(timings[len(timings) // 2], 3),
+        "latency_p95_ms": round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 3),
+        "onnx_mb": round(onnx_path.stat().st_size / 1e6, 2),
+    }
+
+
+def train_student(args, name: str, input_size: int, teacher: nn.Module, loaders, device) -> Path:
+    train_loader, val_loader, _ = loaders
+    student = AtResolution(timm.create_model(name, pretrained=args.pretrained, num_classes=1), input_size).to(device)
+    optimizer = torch.optim.AdamW(student.parameters(), lr=args.lr, weight_decay=1e-4)
+    loss_fn = nn.BCEWithLogitsLoss()
+    checkpoint_path = args.out_dir / f"{name}_{input_size}.pt"
+    best_val_auc = -1.0
+
+    for epoch in range(1, args.epochs + 1):
+        student.train()
+        running_loss = 0.0
+        for images, targets in tqdm(train_loader, desc=f"{name}@{input_size} epoch {epoch}/{args.epochs}"):
+            images = images.to(device)
+            targets = targets.to(device)
+            with torch.no_grad(), autocast_context(device, args.bf16):
+                teacher_logits = teacher(images)
+            optimizer.zero_grad()
+            with autocast_context(device, args.bf16):
+                student_logits = student(images)
+            loss = distillation_loss(
+                student_logits.float(), teacher_logits.float(), targets, args.temperature, args.alpha
+            )
+            loss.backward()
+            optimizer.step()
+            running_loss += loss.item() * images.shape[0]
+
+        _, val_labels, val_probs = evaluate(student, val_loader, loss_fn, device, bf16=args.bf16)
+        val_auc = roc_auc(val_labels, val_probs)
+        print(
+            f"student={name}@{input_size} epoch={epoch} "
+            f"distill_loss={running_loss / max(1, len(train_loader.dataset)):.4f} val_auc={val_auc:.4f}"
+        )
+        if val_auc > best_val_auc:
+            best_val_auc = val_auc
+            torch.save(
+                {
+                    "state_dict": student.model.state_dict(),
+                    "model_name": name,
+                    "input_size": input_size,
+                    "teacher_checkpoint": str(args.teacher_checkpoint),
+                },
+                checkpoint_path,
+            )
+    return checkpoint_path
+
+
+def report_row(label: str, checkpoint: Path, onnx_path: Path, test_loader, device, args) -> dict:
+    model, input_size = load_checkpoint_model(checkpoint, device)
+    _, test_labels, test_probs = evaluate(
+        AtResolution(model, input_size), test_loader, nn.BCEWithLogitsLoss(), device, bf16=args.bf16
+    )
+    export_checkpoint(checkpoint, onnx_path)
+    return {
+        "model": label,
+        "input_size": input_size,
+        "params_m": round(sum(p.numel() for p in model.parameters()) / 1e6, 2),
+        "test_auc": round(roc_auc(test_labels, test_probs), 4),
+        "onnx_path": str(onnx_path),
+        **measure_onnx_latency(onnx_path, input_size, args.latency_runs, args.latency_threads),
+    }
+
+
+def format_table(rows: list[dict]) -> str:
+    teacher = rows[0]
+    lines = [
+        "| model | input | params (M) | ONNX (MB) | p50 ms | p95 ms | speedup | test AUC | AUC delta |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    for row in rows:
+        speedup = teacher["latency_p50_ms"] / row["latency_p50_ms"] if row["latency_p50_ms"] else 0.0
+        lines.append(
+            f"| {row['model']} | {row['input_size']} | {row['params_m']} | {row['onnx_mb']} | "
+            f"{row['latency_p50_ms']:.2f} | {row['latency_p95_ms']:.2f} | {speedup:.2f}x | "
+            f"{row['test_auc']:.4f} | {row['test_auc'] - teacher['test_auc']:+.4f} |"
+        )
+    return "\n".join(lines)
+
+
+def main():
+    args = parse_args()
+    args.out_dir.mkdir(parents=True, exist_ok=True)
+    device = get_device()
+    students = parse_students(args.students)
+    print("=== Distillation Started ===")
+    print(f"Using device: {device}")
+    print(f"Teacher: {args.teacher_checkpoint}")
+    print(f"Students: {students}")
+    print(f"Config -> epochs={args.epochs}, T={args.temperature}, alpha={args.alpha}, lr={args.lr}")
+    if not args.teacher_checkpoint.exists():
+        raise FileNotFoundError(f"Teacher checkpoint not found: {args.teacher_checkpoint}. Run train.py first.")
+
+    loaders = make_loaders(
+        args.data_dir, args.batch_size, args.data_format, args.shards_dir, num_workers=args.num_workers
+    )
+    teacher_model, teacher_size = load_checkpoint_model(args.teacher_checkpoint, device)
+    teacher = AtResolution(teacher_model, teacher_size).to(device).eval()
+
+    rows = [report_row("teacher", args.teacher_checkpoint, args.out_dir / "teacher.onnx", loaders[2], device, args)]
+    for name, input_size in students:
+        checkpoint = train_student(args, name, input_size, teacher, loaders, device)
+        rows.append(report_row(name, checkpoint, args.out_dir / f"{name}_{input_size}.onnx", loaders[2], device, args))
+
+    table = format_table(rows)
+    with open(args.out_dir / "distillation_report.json", "w", encoding="utf-8") as file:
+        json.dump(
+            {
+                "teacher_checkpoint": str(args.teacher_checkpoint),
+                "temperature": args.temperature,
+                "alpha": args.alpha,
+                "epochs": args.epochs,
+                "latency_threads": args.latency_threads,
+                "models": rows,
+            },
+            file,
+            indent=2,
+        )
+    (args.out_dir / "distillation_report.md").write_text(table + "\n", encoding="utf-8")
+
+    print(table)
+    print(f"Reports and ONNX students written to {args.out_dir.resolve()}")
+    print("=== Distillation Finished ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class PredictionBuffer:
+    """Collects labels and probabilities batch by batch into preallocated arrays."""
+
+    def __init__(self, capacity: int):
+        self._labels = np.empty(capacity, dtype=np.float32)
+        self._probs = np.empty(capacity, dtype=np.float32)
+        self._size = 0
+
+    def add(self, labels: np.ndarray, probs: np.ndarray):
+        end = self._size + len(labels)
+        if end > len(self._labels):
+            grown = max(end, 2 * len(self._labels))
+            self._labels = np.resize(self._labels, grown)
+            self._probs = np.resize(self._probs, grown)
+        self._labels[self._size : end] = labels
+        self._probs[self._size : end] = probs
+        self._size = end
+
+    @property
+    def labels(self) -> np.ndarray:
+        return self._labels[: self._size]
+
+    @property
+    def probs(self) -> np.ndarray:
+        return self._probs[: self._size]
+
+
+def threshold_curve(labels: np.ndarray, probs: np.ndarray) -> dict[str, np.ndarray]:
+    """Confusion counts and precision/recall/F1 at every distinct score, highest first.
+
+    Entry i describes predicting positive for ``probs >= thresholds[i]``. One
+    sort plus cumulative sums replaces a full pass per threshold.
+    """
+    labels = np.asarray(labels, dtype=np.float64)
+    probs = np.asarray(probs, dtype=np.float64)
+    order = np.argsort(-probs, kind="mergesort")
+    sorted_probs = probs[order]
+    sorted_labels = labels[order]
+
+    # Last position of each run of equal scores: ties flip together.
+    last_of_run = np.r_[np.flatnonzero(np.diff(sorted_probs)), len(sorted_probs) - 1] if len(probs) else []
+    last_of_run = np.asarray(last_of_run, dtype=np.int64)
+    tp = np.cumsum(sorted_labels)[last_of_run]
+    fp = np.cumsum(1.0 - sorted_labels)[last_of_run]
+    positives = float(labels.sum())
+    negatives = float(len(labels)) - positives
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        precision = np.where(tp + fp > 0, tp / (tp + fp), 0.0)
+        recall = tp / positives if positives > 0 else np.zeros_like(tp)
+        f1 = np.where(tp + fp + positives > 0, 2 * tp / (tp + fp + positives), 0.0)
+        fpr = fp / negatives if negatives > 0 else np.zeros_like(fp)
+
+    return {
+        "thresholds": sorted_probs[last_of_run],
+        "tp": tp,
+        "fp": fp,
+        "precision": precision,
+        "recall": recall,
+        "f1": f1,
+        "fpr": fpr,
+        "positives": np.float64(positives),
+        "negatives": np.float64(negatives),
+    }
+
+
+def roc_auc(labels: np.ndarray, probs: np.ndarray) -> float:
+    curve = threshold_curve(labels, probs)
+    if curve["positives"] == 0 or curve["negatives"] == 0:
+        return 0.0
+    # Trapezoids over (fpr, tpr) give ties half credit, matching sklearn's roc_auc_score.
+    fpr = np.r_[0.0, curve["fpr"]]
+    tpr = np.r_[0.0, curve["recall"]]
+    return float(np.sum(np.diff(fpr) * (tpr[1:] + tpr[:-1]) / 2))
+
+
+def best_threshold(
+    labels: np.ndarray, probs: np.ndarray, min_threshold: float = 0.30, max_threshold: float = 0.90
+) -> tuple[float, float]:
+    """Threshold in [min_threshold, max_threshold] with the best F1 (lowest wins ties)."""
+    curve = threshold_curve(labels, probs)
+    thresholds = curve["thresholds"]
+    in_range = (thresholds >= min_threshold) & (thresholds <= max_threshold)
+    candidates = list(zip(thresholds[in_range].tolist(), curve["f1"][in_range].tolist()))
+    # max_threshold itself selects the same positives as the next score above it.
+    above = np.flatnonzero(thresholds > max_threshold)
+    max_f1 = float(curve["f1"][above[-1]]) if len(above) else 0.0
+    candidates.append((max_threshold, max_f1))
+    best_f1 = max(f1 for _, f1 in candidates)
+    return float(min(t for t, f1 in candidates if f1 == best_f1)), float(best_f1)
+
+
+def metrics_at_threshold(labels: np.ndarray, probs: np.ndarray, threshold: float) -> dict:
+    labels = np.asarray(labels) > 0.5
+    preds = np.asarray(probs) >= threshold
+    tp = float(np.count_nonzero(labels & preds))
+    fp = float(np.count_nonzero(~labels & preds))
+    fn = float(np.count_nonzero(labels & ~preds))
+    return {
+        "auc": roc_auc(labels, probs),
+        "f1": 2 * tp / (2 * tp + fp + fn) if tp + fp + fn > 0 else 0.0,
+        "precision": tp / (tp + fp) if tp + fp > 0 else 0.0,
+        "recall": tp / (tp + fn) if tp + fn > 0 else 0.0,
+        "threshold": float(threshold),
+    }
+
+
+def _downsample(length: int, max_points: int) -> np.ndarray:
+    if length <= max_points:
+        return np.arange(length)
+    return np.unique(np.linspace(0, length - 1, max_points).round().astype(int))
+
+
+def roc_points(labels: np.ndarray, probs: np.ndarray, max_points: int = 201) -> dict[str, list[float]]:
+    curve = threshold_curve(labels, probs)
+    keep = _downsample(len(curve["thresholds"]), max_points)
+    return {
+        "fpr": [0.0] + curve["fpr"][keep].round(6).tolist(),
+        "tpr": [0.0] + curve["recall"][keep].round(6).tolist(),
+        "thresholds": [1.0] + curve["thresholds"][keep].round(6).tolist(),
+    }
+
+
+def pr_points(labels: np.ndarray, probs: np.ndarray, max_points: int = 201) -> dict[str, list[float]]:
+    curve = threshold_curve(labels, probs)
+    keep = _downsample(len(curve["thresholds"]), max_points)
+    return {key: curve[key][keep].round(6).tolist() for key in ("thresholds", "precision", "recall", "f1")}
+
+
+def calibration(labels: np.ndarray, probs: np.ndarray, bins: int = 10) -> dict:
+    """Reliability diagram bins plus expected calibration error and Brier score."""
+    labels = np.asarray(labels, dtype=np.float64)
+    probs = np.asarray(probs, dtype=np.float64)
+    index = np.minimum((probs * bins).astype(int), bins - 1)
+    counts = np.bincount(index, minlength=bins)
+    prob_sums = np.bincount(index, weights=probs, minlength=bins)
+    label_sums = np.bincount(index, weights=labels, minlength=bins)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_prob = np.where(counts > 0, prob_sums / counts, 0.0)
+        positive_rate = np.where(counts > 0, label_sums / counts, 0.0)
+    total = max(1, len(labels))
+    return {
+        "bin_edges": np.linspace(0.0, 1.0, bins + 1).round(6).tolist(),
+        "counts": counts.tolist(),
+        "mean_probability": mean_prob.round(6).tolist(),
+        "positive_rate": positive_rate.round(6).tolist(),
+        "ece": float(np.sum(counts / total * np.abs(mean_prob - positive_rate))),
+        "brier": float(np.mean((probs - labels) ** 2)) if len(labels) else 0.0,
+    }
@@ -6,6 +6,9 @@ from pathlib import Path
 import timm
 import torch
 
+DEFAULT_MODEL_NAME = "mobilenetv3_large_100"
+DEFAULT_INPUT_SIZE = 224
+
 
 def parse_args():
     parser = argparse.ArgumentParser()
@@ -14,47 +17,56 @@ def parse_args():
     return parser.parse_args()
 
 
-def main():
-    args = parse_args()
-    print("=== ONNX Export Started ===")
-    if not args.checkpoint.exists():
-        raise FileNotFoundError(f"Checkpoint not found: {args.checkpoint}")
-
-    print(f"Checkpoint: {args.checkpoint.resolve()}")
-    print(f"Output path: {args.out.resolve()}")
-    device = torch.device("cpu")
-    model = timm.create_model("mobilenetv3_large_100", pretrained=False, num_classes=1)
-    checkpoint = torch.load(args.checkpoint, map_location=device)
+def load_checkpoint_model(checkpoint_path: Path, device: torch.device) -> tuple[torch.nn.Module, int]:
+    # Older checkpoints from train.py only carry the state_dict and model name.
+    checkpoint = torch.load(checkpoint_path, map_location=device)
+    model = timm.create_model(checkpoint.get("model_name", DEFAULT_MODEL_NAME), pretrained=False, num_classes=1)
     model.load_state_dict(checkpoint["state_dict"])
     model.eval()
+    return model, int(checkpoint.get("input_size", DEFAULT_INPUT_SIZE))
+
 
-    args.out.parent.mkdir(parents=True, exist_ok=True)
-    dummy_input = torch.randn(1, 3, 224, 224)
+def export_checkpoint(checkpoint_path: Path, out_path: Path) -> str:
+    model, input_size = load_checkpoint_model(checkpoint_path, torch.device("cpu"))
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    dummy_input = torch.randn(1, 3, input_size, input_size)
     # Prefer legacy exporter path to avoid requiring onnxscript on some environments.
     try:
         torch.onnx.export(
             model,
             dummy_input,
-            str(args.out),
+            str(out_path),
             input_names=["input"],
             output_names=["logits"],
             dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
             opset_version=17,
             dynamo=False,
         )
-        print("Export mode: legacy ONNX exporter (dynamo=False).")
+        return "legacy ONNX exporter (dynamo=False)"
     except TypeError:
         # Fallback for environments where the dynamo kwarg does not exist.
         torch.onnx.export(
             model,
             dummy_input,
-            str(args.out),
+            str(out_path),
             input_names=["input"],
             output_names=["logits"],
             dynamic_axes={"input": {0: "batch"}, "logits": {0: "batch"}},
             opset_version=17,
         )
-        print("Export mode: default ONNX exporter.")
+        return "default ONNX exporter"
+
+
+def main():
+    args = parse_args()
+    print("=== ONNX Export Started ===")
+    if not args.checkpoint.exists():
+        raise FileNotFoundError(f"Checkpoint not found: {args.checkpoint}")
+
+    print(f"Checkpoint: {args.checkpoint.resolve()}")
+    print(f"Output path: {args.out.resolve()}")
+    export_mode = export_checkpoint(args.checkpoint, args.out)
+    print(f"Export mode: {export_mode}.")
     print(f"ONNX model exported to: {args.out.resolve()}")
     print("=== ONNX Export Finished ===")
 
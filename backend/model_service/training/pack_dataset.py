@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+from prepare_dataset import IMAGE_EXTENSIONS
+
+SPLITS = ["train", "val", "test"]
+POSITIVE_CLASS = "ai"
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Decode train/val/test image folders once into memory-mappable uint8 shards."
+    )
+    parser.add_argument("--data-dir", type=Path, default=Path("data"), help="Output of prepare_dataset.py.")
+    parser.add_argument(
+        "--out-dir",
+        type=Path,
+        default=None,
+        help="Shard folder. Defaults to <data-dir>/shards, which train.py --data-format shards reads.",
+    )
+    parser.add_argument(
+        "--image-size",
+        type=int,
+        default=256,
+        help=(
+            "Images are resized (shorter side) and center-cropped to a square of this size. "
+            "256 matches the eval Resize(256); use the native size for small datasets like CIFAKE (32)."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=os.cpu_count() or 1,
+        help="Parallel decode processes.",
+    )
+    parser.add_argument("--chunk-size", type=int, default=256, help="Images decoded per worker task.")
+    return parser.parse_args()
+
+
+def shard_paths(shards_dir: Path, split: str) -> tuple[Path, Path]:
+    return shards_dir / f"{split}_images.npy", shards_dir / f"{split}_labels.npy"
+
+
+def list_split(split_dir: Path) -> list[tuple[Path, int]]:
+    # Same class discovery as torchvision ImageFolder: one sorted subfolder per class.
+    items: list[tuple[Path, int]] = []
+    for class_dir in sorted(p for p in split_dir.iterdir() if p.is_dir()):
+        label = 1 if class_dir.name == POSITIVE_CLASS else 0
+        for path in sorted(class_dir.iterdir()):
+            if path.suffix.lower() in IMAGE_EXTENSIONS:
+                items.append((path, label))
+    return items
+
+
+def decode_square(path: Path, image_size: int) -> np.ndarray:
+    with Image.open(path) as image:
+        image = image.convert("RGB")
+        width, height = image.size
+        scale = image_size / min(width, height)
+        resized = (max(image_size, round(width * scale)), max(image_size, round(height * scale)))
+        if resized != image.size:
+            image = image.resize(resized, Image.BILINEAR)
+        left = (image.width - image_size) // 2
+        top = (image.height - image_size) // 2
+        image = image.crop((left, top, left + image_size, top + image_size))
+        return np.asarray(image, dtype=np.uint8)
+
+
+def _decode_chunk(images_path: str, start: int, paths: list[str], image_size: int) -> int:
+    images = np.load(images_path, mmap_mode="r+")
+    for offset, path in enumerate(paths):
+        images[start + offset] = decode_square(Path(path), image_size)
+    images.flush()
+    return len(paths)
+
+
+def pack_split(split_dir: Path, shards_dir: Path, split: str, image_size: int, workers: int, chunk_size: int) -> dict:
+    items = list_split(split_dir)
+    if not items:
+        raise ValueError(f"No images found in {split_dir}")
+    images_path, labels_path = shard_paths(shards_dir, split)
+
+    # Allocate the whole split up front so workers can write their slices in place.
+    images = np.lib.format.open_memmap(
+        images_path, mode="w+", dtype=np.uint8, shape=(len(items), image_size, image_size, 3)
+    )
+    del images
+    labels = np.array([label for _, label in items], dtype=np.uint8)
+    np.save(labels_path, labels)
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=max(1, workers)) as pool:
+        futures = [
+            pool.submit(
+                _decode_chunk,
+                str(images_path),
+                start,
+                [str(path) for path, _ in items[start : start + chunk_size]],
+                image_size,
+            )
+            for start in range(0, len(items), chunk_size)
+        ]
+        with tqdm(total=len(items), desc=f"Packing {split}", unit="img") as progress:
+            for future in as_completed(futures):
+                progress.update(future.result())
+    elapsed = time.perf_counter() - started
+
+    return {
+        "count": len(items),
+        "positives": int(labels.sum()),
+        "images_file": images_path.name,
+        "labels_file": labels_path.name,
+        "bytes": images_path.stat().st_size,
+        "seconds": round(elapsed, 3),
+        "images_per_second": round(len(items) / elapsed, 1) if elapsed > 0 else 0.0,
+    }
+
+
+def main():
+    args = parse_args()
+    shards_dir = args.out_dir or args.data_dir / "shards"
+    print("=== Dataset Packing Started ===")
+    print(f"Data dir: {args.data_dir}")
+    print(f"Shards dir: {shards_dir}")
+    print(f"Image size: {args.image_size}x{args.image_size}, workers={args.workers}")
+
+    shards_dir.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "image_size": args.image_size,
+        "layout": "NHWC uint8 RGB",
+        "positive_class": POSITIVE_CLASS,
+        "data_dir": str(args.data_dir.resolve()),
+        "splits": {},
+    }
+    for split in SPLITS:
+        split_dir = args.data_dir / split
+        if not split_dir.exists():
+            raise FileNotFoundError(f"Split folder does not exist: {split_dir}")
+        meta["splits"][split] = pack_split(
+            split_dir, shards_dir, split, args.image_size, args.workers, args.chunk_size
+        )
+        print(f"{split}: {json.dumps(meta['splits'][split])}")
+
+    with open(shards_dir / "meta.json", "w", encoding="utf-8") as file:
+        json.dump(meta, file, indent=2)
+    print("=== Dataset Packing Finished ===")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,42 @@
 from __future__ import annotations
 
 import argparse
+import errno
+import hashlib
 import json
+import os
 import random
 import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from pathlib import Path
 
 from tqdm import tqdm
 
+from source_manifest import SourceTree, load_manifest, save_manifest, scan_tree
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
 IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".bmp"}
 
+# Methods tried in order per --materialize mode; "copy" always works and ends every chain.
+MATERIALIZE_METHODS = {
+    "auto": ["reflink", "hardlink", "copy"],
+    "reflink": ["reflink", "copy"],
+    "hardlink": ["hardlink", "copy"],
+    "symlink": ["symlink", "copy"],
+    "copy": ["copy"],
+}
+# Linux FICLONE ioctl: copy-on-write clone on btrfs, XFS (reflink=1), bcachefs, ...
+FICLONE = 0x40049409
+
 
 @dataclass
 class CifakeLayout:
@@ -94,11 +120,197 @@ def parse_args():
         default="ai,fake,synthetic,generated,gan,diffusion",
         help="Comma-separated keywords to detect ai class from file path (generic mode).",
     )
+    parser.add_argument(
+        "--materialize",
+        choices=sorted(MATERIALIZE_METHODS),
+        default="auto",
+        help=(
+            "How files are placed in the output folders. auto tries reflink, then hardlink, "
+            "then falls back to copying. Linked files share storage with the input, so do not edit them in place."
+        ),
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=min(32, (os.cpu_count() or 1) * 4),
+        help="Parallel workers used to scan the input tree and materialize the output.",
+    )
+    parser.add_argument(
+        "--max-depth",
+        type=int,
+        default=0,
+        help="Deepest input subfolder level to scan (0 for unlimited).",
+    )
+    parser.add_argument(
+        "--manifest",
+        type=Path,
+        default=None,
+        help=(
+            "Cached listing of the input tree (path, size, mtime, label). Later runs only re-list folders "
+            "whose mtime changed. Defaults to <output-root>/source_manifest.json.gz."
+        ),
+    )
+    parser.add_argument(
+        "--rescan",
+        action="store_true",
+        help="Ignore the manifest and walk the whole input tree again.",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=(
+            "Keep the existing output and only add, remove or refresh files that changed. Splits come from a "
+            "hash of each source path and --seed instead of a shuffle, so they stay stable between runs."
+        ),
+    )
     return parser.parse_args()
 
 
-def list_images(root: Path) -> list[Path]:
-    return [p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in IMAGE_EXTENSIONS]
+def scan_input(args) -> tuple[SourceTree, SourceTree | None]:
+    manifest_path = args.manifest or args.output_root / "source_manifest.json.gz"
+    # The previous manifest is still returned with --rescan so incremental runs can diff against it.
+    previous = load_manifest(manifest_path, args.input_root)
+    reuse = None if args.rescan else previous
+    print(f"Scanning input tree ({'reusing ' + str(manifest_path) if reuse else 'full walk'})...")
+    started = time.perf_counter()
+    tree, stats = scan_tree(args.input_root, IMAGE_EXTENSIONS, args.max_depth, args.workers, reuse)
+    print(
+        f"Scanned {stats.dirs_scanned} folders, reused {stats.dirs_reused} from manifest, "
+        f"{stats.files} image files in {time.perf_counter() - started:.1f}s"
+    )
+    return tree, previous
+
+
+def changed_sources(tree: SourceTree, previous: SourceTree | None) -> set[Path]:
+    """Sources listed in both scans whose size or mtime differs."""
+    if previous is None:
+        return set()
+    before = previous.file_stats()
+    return {
+        tree.root / rel
+        for rel, stat in tree.file_stats().items()
+        if rel in before and before[rel] != stat
+    }
+
+
+def stable_key(seed: int, root: Path, path: Path, salt: str) -> int:
+    # Keyed on the path relative to the input root, so moving the dataset does not reshuffle it.
+    rel = path.relative_to(root).as_posix()
+    return int.from_bytes(hashlib.blake2b(f"{seed}:{salt}:{rel}".encode(), digest_size=8).digest(), "big")
+
+
+def stable_order(paths: list[Path], seed: int, root: Path, cap: int = 0) -> list[Path]:
+    ordered = sorted(paths, key=lambda path: stable_key(seed, root, path, "order"))
+    return ordered[:cap] if cap > 0 else ordered
+
+
+def stable_splits(
+    pools: dict[str, dict[str, list[Path]]], args
+) -> dict[str, dict[str, list[Path]]]:
+    """Maps label -> pool -> paths to split -> label -> paths, balanced per split.
+
+    Pool "train" is split into train/val, pool "all" into train/val/test and
+    pool "test" is used as is. A path keeps its split as long as the seed does.
+    """
+    val_share = args.val_ratio / (args.train_ratio + args.val_ratio)
+    splits: dict[str, dict[str, list[Path]]] = {split: {} for split in ["train", "val", "test"]}
+    for label, label_pools in pools.items():
+        for split in splits:
+            splits[split][label] = []
+        for pool, paths in label_pools.items():
+            for path in paths:
+                fraction = stable_key(args.seed, args.input_root, path, "split") / 2**64
+                if pool == "test":
+                    split = "test"
+                elif pool == "train":
+                    split = "val" if fraction < val_share else "train"
+                elif fraction < args.train_ratio:
+                    split = "train"
+                elif fraction < args.train_ratio + args.val_ratio:
+                    split = "val"
+                else:
+                    split = "test"
+                splits[split][label].append(path)
+
+    for split, labels in splits.items():
+        balanced = min(len(paths) for paths in labels.values())
+        for label in labels:
+            labels[label] = stable_order(labels[label], args.seed, args.input_root)[:balanced]
+    return splits
+
+
+def sync_output(
+    desired: dict[Path, Path], output_root: Path, refresh: set[Path], mode: str, workers: int
+) -> dict:
+    existing: set[Path] = set()
+    for split in ["train", "val", "test"]:
+        for label in ["ai", "real"]:
+            label_dir = output_root / split / label
+            label_dir.mkdir(parents=True, exist_ok=True)
+            with os.scandir(label_dir) as entries:
+                existing.update(label_dir / entry.name for entry in entries)
+
+    stale = {dst for dst, src in desired.items() if dst in existing and src in refresh}
+    removed = existing - desired.keys()
+    for dst in removed | stale:
+        dst.unlink()
+    pairs = [(src, dst) for dst, src in desired.items() if dst not in existing or dst in stale]
+    materialization = materialize(pairs, mode, workers) if pairs else {"mode": mode, "files": 0}
+    return {
+        "added": len(pairs) - len(stale),
+        "refreshed": len(stale),
+        "removed": len(removed),
+        "unchanged": len(desired) - len(pairs),
+        "materialization": materialization,
+    }
+
+
+# Summary fields a run computes from its own inputs and outputs; stale once the folders change.
+PER_RUN_SUMMARY_KEYS = (
+    "mode", "resolved_cifake_root", "counts", "detected", "splits_per_class",
+    "caps", "keywords", "note", "materialization", "incremental",
+)
+
+
+def run_incremental(args, pools: dict[str, dict[str, list[Path]]], refresh: set[Path], summary: dict) -> dict:
+    splits = stable_splits(pools, args)
+    desired: dict[Path, Path] = {}
+    for split, labels in splits.items():
+        for label, paths in labels.items():
+            for path in paths:
+                name = f"{label}_{stable_key(args.seed, args.input_root, path, 'order'):016x}{path.suffix.lower()}"
+                desired[args.output_root / split / label / name] = path
+    per_class = {split: len(labels["real"]) for split, labels in splits.items()}
+    print(
+        "Stable split per class -> "
+        f"train={per_class['train']}, val={per_class['val']}, test={per_class['test']}"
+    )
+
+    print("Syncing output split folders...")
+    changes = sync_output(desired, args.output_root, refresh, args.materialize, args.workers)
+    print(
+        f"Incremental update -> added={changes['added']}, refreshed={changes['refreshed']}, "
+        f"removed={changes['removed']}, unchanged={changes['unchanged']}"
+    )
+
+    # Update the previous summary in place so fields added by other tools survive,
+    # but drop everything a previous run computed: the summary describes what is on disk now.
+    summary_path = args.output_root / "dataset_summary.json"
+    merged = json.loads(summary_path.read_text(encoding="utf-8")) if summary_path.exists() else {}
+    for key in PER_RUN_SUMMARY_KEYS:
+        merged.pop(key, None)
+    merged.update(summary)
+    merged["splits_per_class"] = per_class
+    if summary["mode"] == "cifake":
+        # Same shape as a full CIFAKE run writes.
+        merged["counts"] = {f"{split}_per_class": count for split, count in per_class.items()}
+    merged["incremental"] = {
+        "seed": args.seed,
+        "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        **{key: value for key, value in changes.items() if key != "materialization"},
+    }
+    merged["materialization"] = changes["materialization"]
+    return merged
 
 
 def make_split_counts(total: int, train_ratio: float, val_ratio: float, test_ratio: float):
@@ -111,51 +323,118 @@ def make_split_counts(total: int, train_ratio: float, val_ratio: float, test_rat
 
 
 def reset_output_root(output_root: Path):
-    if output_root.exists():
-        shutil.rmtree(output_root)
+    # Only the split folders: the source manifest lives next to them.
+    for split in ["train", "val", "test"]:
+        if (output_root / split).exists():
+            shutil.rmtree(output_root / split)
     for split in ["train", "val", "test"]:
         for label in ["ai", "real"]:
             (output_root / split / label).mkdir(parents=True, exist_ok=True)
 
 
-def copy_many(items: list[Path], dst_root: Path, split: str, label: str):
+def plan_many(items: list[Path], dst_root: Path, split: str, label: str) -> list[tuple[Path, Path]]:
     dst_dir = dst_root / split / label
-    for idx, src in enumerate(tqdm(items, desc=f"Copying {label} -> {split}", unit="img")):
-        dst = dst_dir / f"{label}_{idx:07d}{src.suffix.lower()}"
-        shutil.copy2(src, dst)
+    return [(src, dst_dir / f"{label}_{idx:07d}{src.suffix.lower()}") for idx, src in enumerate(items)]
 
 
-def copy_explicit_splits(
+def plan_explicit_splits(
     output_root: Path,
     label: str,
     train_paths: list[Path],
     val_paths: list[Path],
     test_paths: list[Path],
-):
-    copy_many(train_paths, output_root, "train", label)
-    copy_many(val_paths, output_root, "val", label)
-    copy_many(test_paths, output_root, "test", label)
-
-
-def _child_case_insensitive(parent: Path, target_names: set[str]) -> Path | None:
-    if not parent.exists() or not parent.is_dir():
-        return None
-    for child in parent.iterdir():
-        if child.is_dir() and child.name.lower() in target_names:
-            return child
-    return None
+) -> list[tuple[Path, Path]]:
+    return (
+        plan_many(train_paths, output_root, "train", label)
+        + plan_many(val_paths, output_root, "val", label)
+        + plan_many(test_paths, output_root, "test", label)
+    )
+
+
+def _reflink(src: Path, dst: Path):
+    if fcntl is None or not sys.platform.startswith("linux"):
+        raise OSError(errno.EOPNOTSUPP, "reflink is only supported on Linux")
+    try:
+        with open(src, "rb") as source, open(dst, "wb") as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+    except OSError:
+        dst.unlink(missing_ok=True)
+        raise
+
+
+def _place(method: str, src: Path, dst: Path):
+    if method == "reflink":
+        _reflink(src, dst)
+    elif method == "hardlink":
+        os.link(src, dst)
+    elif method == "symlink":
+        os.symlink(src.resolve(), dst)
+    else:
+        shutil.copy2(src, dst)
 
 
-def detect_cifake_layout(input_root: Path) -> CifakeLayout | None:
-    candidate_roots: list[Path] = []
-    if input_root.exists():
-        candidate_roots.append(input_root)
+class Materializer:
+    """Places files using the first method the filesystem supports.
+
+    A link/clone method that fails once (cross-device, unsupported filesystem,
+    permissions) is dropped for the rest of the run, so the fallback is only
+    probed a handful of times instead of once per file.
+    """
+
+    def __init__(self, mode: str):
+        self.mode = mode
+        self.methods = list(MATERIALIZE_METHODS[mode])
+        self.counts: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def place(self, pair: tuple[Path, Path]):
+        src, dst = pair
+        for method in list(self.methods):
+            try:
+                _place(method, src, dst)
+            except OSError:
+                if method == "copy":
+                    raise
+                with self._lock:
+                    if method in self.methods:
+                        self.methods.remove(method)
+                        tqdm.write(f"{method} not supported for {dst.parent}, falling back to {self.methods[0]}")
+                continue
+            with self._lock:
+                self.counts[method] += 1
+            return
+
+
+def materialize(pairs: list[tuple[Path, Path]], mode: str, workers: int) -> dict:
+    materializer = Materializer(mode)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        with tqdm(total=len(pairs), desc=f"Materializing ({mode})", unit="img") as progress:
+            for _ in pool.map(materializer.place, pairs):
+                progress.update()
+    elapsed = time.perf_counter() - started
+    files_per_second = len(pairs) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"Materialized {len(pairs)} files in {elapsed:.1f}s ({files_per_second:.0f} files/s) "
+        f"-> {dict(materializer.counts)}"
+    )
+    return {
+        "mode": mode,
+        "workers": workers,
+        "files": len(pairs),
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(files_per_second, 1),
+        "methods": dict(materializer.counts),
+    }
+
+
+def detect_cifake_layout(input_root: Path, tree: SourceTree) -> CifakeLayout | None:
+    candidate_roots: list[Path] = [input_root]
 
     # Handle nested mounts like /kaggle/input/datasets/birdy654/cifake...
-    if input_root.exists() and input_root.is_dir():
-        for child in input_root.rglob("*"):
-            if child.is_dir() and child.name.lower() in {"train", "test"}:
-                candidate_roots.append(child.parent)
+    for child in tree.directories():
+        if child != input_root and child.name.lower() in {"train", "test"}:
+            candidate_roots.append(child.parent)
 
     seen = set()
     unique_candidates = []
@@ -166,15 +445,15 @@ def detect_cifake_layout(input_root: Path) -> CifakeLayout | None:
             unique_candidates.append(root)
 
     for root in unique_candidates:
-        train_dir = _child_case_insensitive(root, {"train"})
-        test_dir = _child_case_insensitive(root, {"test"})
+        train_dir = tree.child_dir(root, {"train"})
+        test_dir = tree.child_dir(root, {"test"})
         if train_dir is None or test_dir is None:
             continue
 
-        train_fake = _child_case_insensitive(train_dir, {"fake", "ai"})
-        train_real = _child_case_insensitive(train_dir, {"real"})
-        test_fake = _child_case_insensitive(test_dir, {"fake", "ai"})
-        test_real = _child_case_insensitive(test_dir, {"real"})
+        train_fake = tree.child_dir(train_dir, {"fake", "ai"})
+        train_real = tree.child_dir(train_dir, {"real"})
+        test_fake = tree.child_dir(test_dir, {"fake", "ai"})
+        test_real = tree.child_dir(test_dir, {"real"})
 
         if all([train_fake, train_real, test_fake, test_real]):
             return CifakeLayout(
@@ -234,7 +513,7 @@ def classify_paths_generic(
     return real_paths, ai_paths, unknown_paths
 
 
-def run_cifake_mode(args, layout: CifakeLayout):
+def run_cifake_mode(args, layout: CifakeLayout, tree: SourceTree, refresh: set[Path]):
     print("Detected CIFAKE layout.")
     print(f"CIFAKE root: {layout.root}")
     print(f"TRAIN/FAKE: {layout.train_fake}")
@@ -242,10 +521,16 @@ def run_cifake_mode(args, layout: CifakeLayout):
     print(f"TEST/FAKE:  {layout.test_fake}")
     print(f"TEST/REAL:  {layout.test_real}")
 
-    train_real_paths = list_images(layout.train_real)
-    train_ai_paths = list_images(layout.train_fake)
-    test_real_paths = list_images(layout.test_real)
-    test_ai_paths = list_images(layout.test_fake)
+    train_real_paths = tree.images_under(layout.train_real)
+    train_ai_paths = tree.images_under(layout.train_fake)
+    test_real_paths = tree.images_under(layout.test_real)
+    test_ai_paths = tree.images_under(layout.test_fake)
+    for label, paths in [
+        ("real", train_real_paths + test_real_paths),
+        ("ai", train_ai_paths + test_ai_paths),
+    ]:
+        for path in paths:
+            tree.set_label(path, label)
 
     print(
         "Raw CIFAKE counts -> "
@@ -253,6 +538,34 @@ def run_cifake_mode(args, layout: CifakeLayout):
         f"test_real={len(test_real_paths)}, test_ai={len(test_ai_paths)}"
     )
 
+    if args.incremental:
+        pools = {
+            label: {
+                "train": stable_order(train_paths, args.seed, args.input_root, args.max_per_class),
+                "test": stable_order(test_paths, args.seed, args.input_root, args.max_test_per_class),
+            }
+            for label, train_paths, test_paths in [
+                ("real", train_real_paths, test_real_paths),
+                ("ai", train_ai_paths, test_ai_paths),
+            ]
+        }
+        return run_incremental(
+            args,
+            pools,
+            refresh,
+            {
+                "mode": "cifake",
+                "input_root": str(args.input_root.resolve()),
+                "resolved_cifake_root": str(layout.root.resolve()),
+                "output_root": str(args.output_root.resolve()),
+                "caps": {
+                    "max_per_class_train": args.max_per_class,
+                    "max_per_class_test": args.max_test_per_class,
+                },
+                "note": "test split sourced from CIFAKE TEST folder; val split hashed from TRAIN folder.",
+            },
+        )
+
     random.shuffle(train_real_paths)
     random.shuffle(train_ai_paths)
     random.shuffle(test_real_paths)
@@ -285,9 +598,10 @@ def run_cifake_mode(args, layout: CifakeLayout):
     )
     print("Resetting output folders...")
     reset_output_root(args.output_root)
-    print("Copying files to output split folders...")
-    copy_explicit_splits(args.output_root, "real", real_train, real_val, test_real_paths)
-    copy_explicit_splits(args.output_root, "ai", ai_train, ai_val, test_ai_paths)
+    print("Materializing files in output split folders...")
+    pairs = plan_explicit_splits(args.output_root, "real", real_train, real_val, test_real_paths)
+    pairs += plan_explicit_splits(args.output_root, "ai", ai_train, ai_val, test_ai_paths)
+    materialization = materialize(pairs, args.materialize, args.workers)
 
     summary = {
         "mode": "cifake",
@@ -303,20 +617,23 @@ def run_cifake_mode(args, layout: CifakeLayout):
             "max_per_class_train": args.max_per_class,
             "max_per_class_test": args.max_test_per_class,
         },
+        "materialization": materialization,
         "note": "test split sourced from CIFAKE TEST folder; val split sampled from TRAIN folder.",
     }
     return summary
 
 
-def run_generic_mode(args):
+def run_generic_mode(args, tree: SourceTree, refresh: set[Path]):
     print("Using generic keyword-based dataset mode.")
     real_keywords = [k.strip().lower() for k in args.real_keywords.split(",") if k.strip()]
     ai_keywords = [k.strip().lower() for k in args.ai_keywords.split(",") if k.strip()]
 
-    print("Scanning images recursively...")
-    all_images = list_images(args.input_root)
+    all_images = tree.images_under(args.input_root)
     print(f"Found total image files: {len(all_images)}")
     real_paths, ai_paths, unknown_paths = classify_paths_generic(all_images, real_keywords, ai_keywords)
+    for label, paths in [("real", real_paths), ("ai", ai_paths)]:
+        for path in paths:
+            tree.set_label(path, label)
     print(
         "Class detection summary before balancing -> "
         f"real={len(real_paths)}, ai={len(ai_paths)}, unknown={len(unknown_paths)}"
@@ -329,6 +646,32 @@ def run_generic_mode(args):
             "Use --real-keywords and --ai-keywords to match your folder names."
         )
 
+    if args.incremental:
+        pools = {
+            label: {"all": stable_order(paths, args.seed, args.input_root, args.max_per_class)}
+            for label, paths in [("real", real_paths), ("ai", ai_paths)]
+        }
+        return run_incremental(
+            args,
+            pools,
+            refresh,
+            {
+                "mode": "generic",
+                "input_root": str(args.input_root.resolve()),
+                "output_root": str(args.output_root.resolve()),
+                "detected": {
+                    "all_images": len(all_images),
+                    "real_detected": len(real_paths),
+                    "ai_detected": len(ai_paths),
+                    "unknown_skipped": len(unknown_paths),
+                },
+                "keywords": {
+                    "real_keywords": real_keywords,
+                    "ai_keywords": ai_keywords,
+                },
+            },
+        )
+
     random.shuffle(real_paths)
     random.shuffle(ai_paths)
 
@@ -348,21 +691,22 @@ def run_generic_mode(args):
 
     print("Resetting output folders...")
     reset_output_root(args.output_root)
-    print("Copying files to output split folders...")
-    copy_explicit_splits(
+    print("Materializing files in output split folders...")
+    pairs = plan_explicit_splits(
         args.output_root,
         "real",
         real_paths[:train_count],
         real_paths[train_count : train_count + val_count],
         real_paths[train_count + val_count :],
     )
-    copy_explicit_splits(
+    pairs += plan_explicit_splits(
         args.output_root,
         "ai",
         ai_paths[:train_count],
         ai_paths[train_count : train_count + val_count],
         ai_paths[train_count + val_count :],
     )
+    materialization = materialize(pairs, args.materialize, args.workers)
 
     summary = {
         "mode": "generic",
@@ -383,6 +727,7 @@ def run_generic_mode(args):
             "real_keywords": real_keywords,
             "ai_keywords": ai_keywords,
         },
+        "materialization": materialization,
     }
     return summary
 
@@ -393,6 +738,7 @@ def main():
     print(f"Input root: {args.input_root}")
     print(f"Output root: {args.output_root}")
     print(f"Dataset format mode: {args.dataset_format}")
+    print(f"Materialize mode: {args.materialize} ({args.workers} workers)")
     print(f"Split ratios: train={args.train_ratio}, val={args.val_ratio}, test={args.test_ratio}")
     print(
         f"Caps -> train max per class: {args.max_per_class if args.max_per_class > 0 else 'no cap'}, "
@@ -408,11 +754,14 @@ def main():
     if not args.input_root.exists():
         raise FileNotFoundError(f"Input folder does not exist: {args.input_root}")
 
+    tree, previous = scan_input(args)
+    refresh = changed_sources(tree, previous) if args.incremental else set()
+
     summary = None
     if args.dataset_format in {"auto", "cifake"}:
-        layout = detect_cifake_layout(args.input_root)
+        layout = detect_cifake_layout(args.input_root, tree)
         if layout is not None:
-            summary = run_cifake_mode(args, layout)
+            summary = run_cifake_mode(args, layout, tree, refresh)
         elif args.dataset_format == "cifake":
             raise ValueError(
                 "CIFAKE mode was requested but CIFAKE folder structure was not detected.\n"
@@ -420,7 +769,9 @@ def main():
             )
 
     if summary is None:
-        summary = run_generic_mode(args)
+        summary = run_generic_mode(args, tree, refresh)
+
+    save_manifest(args.manifest or args.output_root / "source_manifest.json.gz", tree)
 
     with open(args.output_root / "dataset_summary.json", "w", encoding="utf-8") as file:
         json.dump(summary, file, indent=2)
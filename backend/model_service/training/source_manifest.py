@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class DirRecord:
+    mtime_ns: int
+    subdirs: list[str]
+    # (name, size, mtime_ns) for image files directly inside the directory.
+    files: list[tuple[str, int, int]]
+
+
+@dataclass
+class ScanStats:
+    dirs_scanned: int = 0
+    dirs_reused: int = 0
+    files: int = 0
+
+
+@dataclass
+class SourceTree:
+    """Directory listing of an input tree, keyed by path relative to ``root``."""
+
+    root: Path
+    dirs: dict[str, DirRecord]
+    labels: dict[str, str] = field(default_factory=dict)
+
+    def directories(self) -> list[Path]:
+        return [self.root / rel if rel else self.root for rel in self.dirs]
+
+    def child_dir(self, parent: Path, names: set[str]) -> Path | None:
+        record = self.dirs.get(self._rel(parent))
+        if record is None:
+            return None
+        for name in record.subdirs:
+            if name.lower() in names:
+                return parent / name
+        return None
+
+    def images_under(self, path: Path) -> list[Path]:
+        prefix = self._rel(path)
+        images = []
+        for rel, record in self.dirs.items():
+            if prefix and rel != prefix and not rel.startswith(prefix + "/"):
+                continue
+            base = self.root / rel if rel else self.root
+            images.extend(base / name for name, _, _ in record.files)
+        return images
+
+    def file_stats(self) -> dict[str, tuple[int, int]]:
+        return {
+            f"{rel}/{name}" if rel else name: (size, mtime_ns)
+            for rel, record in self.dirs.items()
+            for name, size, mtime_ns in record.files
+        }
+
+    def set_label(self, path: Path, label: str):
+        self.labels[path.relative_to(self.root).as_posix()] = label
+
+    def _rel(self, path: Path) -> str:
+        rel = path.relative_to(self.root).as_posix()
+        return "" if rel == "." else rel
+
+
+def _scan_dir(directory: Path, extensions: set[str], previous: DirRecord | None) -> tuple[DirRecord, bool]:
+    # A directory's mtime changes whenever an entry is added, removed or renamed
+    # in it, so an unchanged mtime means the cached listing is still complete.
+    mtime_ns = os.stat(directory).st_mtime_ns
+    if previous is not None and previous.mtime_ns == mtime_ns:
+        return previous, False
+
+    subdirs: list[str] = []
+    files: list[tuple[str, int, int]] = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # DirEntry type checks come from the directory listing itself; only
+            # image files pay for a stat.
+            if entry.is_dir(follow_symlinks=False):
+                subdirs.append(entry.name)
+            elif os.path.splitext(entry.name)[1].lower() in extensions and entry.is_file():
+                stat = entry.stat()
+                files.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    subdirs.sort()
+    files.sort()
+    return DirRecord(mtime_ns=mtime_ns, subdirs=subdirs, files=files), True
+
+
+def scan_tree(
+    root: Path,
+    extensions: set[str],
+    max_depth: int = 0,
+    workers: int = 8,
+    previous: SourceTree | None = None,
+) -> tuple[SourceTree, ScanStats]:
+    """Breadth-first parallel walk; ``max_depth`` 0 means unlimited."""
+    previous_dirs = previous.dirs if previous is not None else {}
+    dirs: dict[str, DirRecord] = {}
+    stats = ScanStats()
+    level = [""]
+    depth = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        while level:
+            results = pool.map(
+                lambda rel: _scan_dir(root / rel if rel else root, extensions, previous_dirs.get(rel)),
+                level,
+            )
+            next_level = []
+            for rel, (record, scanned) in zip(level, results):
+                dirs[rel] = record
+                stats.files += len(record.files)
+                if scanned:
+                    stats.dirs_scanned += 1
+                else:
+                    stats.dirs_reused += 1
+                if max_depth <= 0 or depth < max_depth:
+                    next_level.extend(f"{rel}/{name}" if rel else name for name in record.subdirs)
+            level = next_level
+            depth += 1
+    tree = SourceTree(root=root, dirs=dirs)
+    if previous is not None and previous.labels:
+        # Carry labels over for files whose size and mtime are unchanged.
+        before = previous.file_stats()
+        tree.labels = {
+            rel: previous.labels[rel]
+            for rel, stat in tree.file_stats().items()
+            if rel in previous.labels and before.get(rel) == stat
+        }
+    return tree, stats
+
+
+def load_manifest(path: Path, root: Path) -> SourceTree | None:
+    if not path.exists():
+        return None
+    with gzip.open(path, "rt", encoding="utf-8") as file:
+        payload = json.load(file)
+    if payload.get("version") != MANIFEST_VERSION or payload.get("root") != str(root.resolve()):
+        return None
+    dirs = {
+        rel: DirRecord(
+            mtime_ns=record["mtime_ns"],
+            subdirs=record["subdirs"],
+            files=[tuple(item[:3]) for item in record["files"]],
+        )
+        for rel, record in payload["dirs"].items()
+    }
+    labels = {
+        f"{rel}/{item[0]}" if rel else item[0]: item[3]
+        for rel, record in payload["dirs"].items()
+        for item in record["files"]
+        if len(item) > 3 and item[3] is not None
+    }
+    return SourceTree(root=root, dirs=dirs, labels=labels)
+
+
+def save_manifest(path: Path, tree: SourceTree):
+    payload = {
+        "version": MANIFEST_VERSION,
+        "root": str(tree.root.resolve()),
+        "dirs": {
+            rel: {
+                "mtime_ns": record.mtime_ns,
+                "subdirs": record.subdirs,
+                # [name, size, mtime_ns, label]; label is null for files no split used.
+                "files": [
+                    [name, size, mtime_ns, tree.labels.get(f"{rel}/{name}" if rel else name)]
+                    for name, size, mtime_ns in record.files
+                ],
+            }
+            for rel, record in tree.dirs.items()
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    with gzip.open(tmp_path, "wt", encoding="utf-8") as file:
+        json.dump(payload, file, separators=(",", ":"))
+    os.replace(tmp_path, path)
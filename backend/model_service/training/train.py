@@ -2,17 +2,34 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
+import time
+from contextlib import nullcontext
 from pathlib import Path
 
 import numpy as np
 import timm
 import torch
-from sklearn.metrics import f1_score, precision_score, recall_score, roc_auc_score
 from torch import nn
-from torch.utils.data import DataLoader
+from torch.utils.data import DataLoader, Dataset
 from torchvision import datasets, transforms
+from torchvision.transforms import v2
 from tqdm import tqdm
 
+from evaluation import (
+    PredictionBuffer,
+    best_threshold,
+    calibration,
+    metrics_at_threshold,
+    pr_points,
+    roc_auc,
+    roc_points,
+)
+from pack_dataset import shard_paths
+
+IMAGENET_MEAN = [0.485, 0.456, 0.406]
+IMAGENET_STD = [0.229, 0.224, 0.225]
+
 
 def get_device() -> torch.device:
     if torch.backends.mps.is_available():
@@ -22,6 +39,20 @@ def get_device() -> torch.device:
     return torch.device("cpu")
 
 
+def cpu_supports_bf16() -> bool:
+    # oneDNN reports native bf16 (AVX512-BF16/AMX); without it bf16 autocast is slower than FP32.
+    try:
+        return bool(torch.ops.mkldnn._is_mkldnn_bf16_supported())
+    except (AttributeError, RuntimeError):
+        return False
+
+
+def autocast_context(device: torch.device, bf16: bool):
+    if not bf16:
+        return nullcontext()
+    return torch.autocast(device_type=device.type, dtype=torch.bfloat16)
+
+
 class BinaryImageFolder(datasets.ImageFolder):
     def __init__(self, root: Path, transform, positive_class: str):
         super().__init__(root=str(root), transform=transform)
@@ -37,14 +68,68 @@ class BinaryImageFolder(datasets.ImageFolder):
         return image, torch.tensor([binary_label], dtype=torch.float32)
 
 
-def make_loaders(data_dir: Path, batch_size: int):
+class ShardDataset(Dataset):
+    """Reads one split written by pack_dataset.py.
+
+    Images are memory-mapped uint8 NHWC arrays, so a sample is a slice copy
+    instead of a file open + JPEG/PNG decode. The mapping is opened lazily so
+    each DataLoader worker gets its own handle.
+    """
+
+    def __init__(self, shards_dir: Path, split: str, transform):
+        self.images_path, labels_path = shard_paths(shards_dir, split)
+        if not self.images_path.exists():
+            raise FileNotFoundError(
+                f"Shard not found: {self.images_path}. Run pack_dataset.py --data-dir <data-dir> first."
+            )
+        self.labels = np.load(labels_path)
+        self.transform = transform
+        self._images: np.ndarray | None = None
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def __getitem__(self, index: int):
+        if self._images is None:
+            self._images = np.load(self.images_path, mmap_mode="r")
+        image = torch.from_numpy(np.array(self._images[index])).permute(2, 0, 1)
+        return self.transform(image), torch.tensor([float(self.labels[index])], dtype=torch.float32)
+
+
+def make_shard_datasets(shards_dir: Path):
+    # Tensor counterparts of the folder transforms, applied to decoded uint8 CHW images.
+    train_transforms = v2.Compose(
+        [
+            v2.RandomResizedCrop(224, scale=(0.7, 1.0), antialias=True),
+            v2.RandomHorizontalFlip(),
+            v2.ColorJitter(0.15, 0.15, 0.15, 0.05),
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Normalize(IMAGENET_MEAN, IMAGENET_STD),
+        ]
+    )
+    eval_transforms = v2.Compose(
+        [
+            v2.Resize(256, antialias=True),
+            v2.CenterCrop(224),
+            v2.ToDtype(torch.float32, scale=True),
+            v2.Normalize(IMAGENET_MEAN, IMAGENET_STD),
+        ]
+    )
+    return (
+        ShardDataset(shards_dir, "train", train_transforms),
+        ShardDataset(shards_dir, "val", eval_transforms),
+        ShardDataset(shards_dir, "test", eval_transforms),
+    )
+
+
+def make_folder_datasets(data_dir: Path):
     train_transforms = transforms.Compose(
         [
             transforms.RandomResizedCrop(224, scale=(0.7, 1.0)),
             transforms.RandomHorizontalFlip(),
             transforms.ColorJitter(0.15, 0.15, 0.15, 0.05),
             transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+            transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD),
         ]
     )
 
@@ -53,63 +138,62 @@ def make_loaders(data_dir: Path, batch_size: int):
             transforms.Resize(256),
             transforms.CenterCrop(224),
             transforms.ToTensor(),
-            transforms.Normalize([0.485, 0.456, 0.406], [0.229, 0.224, 0.225]),
+            transforms.Normalize(IMAGENET_MEAN, IMAGENET_STD),
         ]
     )
 
-    train_dataset = BinaryImageFolder(data_dir / "train", train_transforms, positive_class="ai")
-    val_dataset = BinaryImageFolder(data_dir / "val", eval_transforms, positive_class="ai")
-    test_dataset = BinaryImageFolder(data_dir / "test", eval_transforms, positive_class="ai")
+    return (
+        BinaryImageFolder(data_dir / "train", train_transforms, positive_class="ai"),
+        BinaryImageFolder(data_dir / "val", eval_transforms, positive_class="ai"),
+        BinaryImageFolder(data_dir / "test", eval_transforms, positive_class="ai"),
+    )
+
 
-    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, num_workers=2)
-    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, num_workers=2)
-    test_loader = DataLoader(test_dataset, batch_size=batch_size, shuffle=False, num_workers=2)
+def make_loaders(
+    data_dir: Path,
+    batch_size: int,
+    data_format: str = "folder",
+    shards_dir: Path | None = None,
+    num_workers: int = 2,
+    prefetch_factor: int | None = None,
+    persistent_workers: bool = False,
+):
+    if data_format == "shards":
+        train_dataset, val_dataset, test_dataset = make_shard_datasets(shards_dir or data_dir / "shards")
+    else:
+        train_dataset, val_dataset, test_dataset = make_folder_datasets(data_dir)
+
+    loader_kwargs = {"num_workers": num_workers}
+    if num_workers > 0:
+        loader_kwargs["persistent_workers"] = persistent_workers
+        loader_kwargs["prefetch_factor"] = prefetch_factor
+    train_loader = DataLoader(train_dataset, batch_size=batch_size, shuffle=True, **loader_kwargs)
+    val_loader = DataLoader(val_dataset, batch_size=batch_size, shuffle=False, **loader_kwargs)
+    test_loader = DataLoader(test_dataset, batch_size=batch_size, shuffle=False, **loader_kwargs)
     return train_loader, val_loader, test_loader
 
 
-def evaluate(model, loader, loss_fn, device):
+def evaluate(model, loader, loss_fn, device, channels_last: bool = False, bf16: bool = False):
     model.eval()
     running_loss = 0.0
-    labels: list[float] = []
-    probs: list[float] = []
+    predictions = PredictionBuffer(len(loader.dataset))
+    memory_format = torch.channels_last if channels_last else torch.contiguous_format
 
     with torch.no_grad():
         for images, targets in loader:
-            images = images.to(device)
+            images = images.to(device, memory_format=memory_format)
             targets = targets.to(device)
-            logits = model(images)
+            with autocast_context(device, bf16):
+                logits = model(images)
+            logits = logits.float()
             loss = loss_fn(logits, targets)
             probabilities = torch.sigmoid(logits)
 
             running_loss += loss.item() * images.shape[0]
-            labels.extend(targets.squeeze(1).cpu().numpy().tolist())
-            probs.extend(probabilities.squeeze(1).cpu().numpy().tolist())
+            predictions.add(targets.squeeze(1).cpu().numpy(), probabilities.squeeze(1).cpu().numpy())
 
     avg_loss = running_loss / max(1, len(loader.dataset))
-    return avg_loss, np.array(labels), np.array(probs)
-
-
-def best_threshold(labels: np.ndarray, probs: np.ndarray) -> tuple[float, float]:
-    best_t = 0.5
-    best_f1 = -1.0
-    for threshold in np.arange(0.30, 0.91, 0.01):
-        preds = (probs >= threshold).astype(int)
-        f1 = f1_score(labels, preds, zero_division=0)
-        if f1 > best_f1:
-            best_f1 = f1
-            best_t = float(threshold)
-    return best_t, best_f1
-
-
-def metrics_at_threshold(labels: np.ndarray, probs: np.ndarray, threshold: float) -> dict:
-    preds = (probs >= threshold).astype(int)
-    return {
-        "auc": float(roc_auc_score(labels, probs)) if len(np.unique(labels)) > 1 else 0.0,
-        "f1": float(f1_score(labels, preds, zero_division=0)),
-        "precision": float(precision_score(labels, preds, zero_division=0)),
-        "recall": float(recall_score(labels, preds, zero_division=0)),
-        "threshold": float(threshold),
-    }
+    return avg_loss, predictions.labels, predictions.probs
 
 
 def parse_args():
@@ -119,61 +203,166 @@ def parse_args():
     parser.add_argument("--epochs", type=int, default=8)
     parser.add_argument("--batch-size", type=int, default=64)
     parser.add_argument("--lr", type=float, default=1e-4)
-    return parser.parse_args()
+    parser.add_argument(
+        "--data-format",
+        choices=["folder", "shards"],
+        default="folder",
+        help="folder decodes image files every epoch; shards reads the output of pack_dataset.py.",
+    )
+    parser.add_argument(
+        "--shards-dir",
+        type=Path,
+        default=None,
+        help="Shard folder for --data-format shards. Defaults to <data-dir>/shards.",
+    )
+    parser.add_argument(
+        "--performance",
+        action="store_true",
+        help=(
+            "High-throughput CPU defaults: more persistent loader workers with deeper prefetch, "
+            "channels_last and bf16 autocast when the CPU supports it. Explicit flags below still win."
+        ),
+    )
+    parser.add_argument("--num-workers", type=int, default=None, help="DataLoader workers (default 2).")
+    parser.add_argument("--prefetch-factor", type=int, default=None, help="Batches prefetched per loader worker.")
+    parser.add_argument(
+        "--persistent-workers",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Keep loader workers alive between epochs.",
+    )
+    parser.add_argument(
+        "--channels-last",
+        action=argparse.BooleanOptionalAction,
+        default=None,
+        help="Use NHWC memory format for the model and inputs.",
+    )
+    parser.add_argument(
+        "--bf16",
+        choices=["auto", "on", "off"],
+        default=None,
+        help="bfloat16 autocast for forward passes. auto enables it when the CPU has native bf16.",
+    )
+    parser.add_argument("--compile", action="store_true", help="Wrap the model in torch.compile.")
+    parser.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 keeps the default).")
+    args = parser.parse_args()
+    apply_performance_defaults(args)
+    return args
+
+
+def apply_performance_defaults(args):
+    cpu_count = os.cpu_count() or 1
+    if args.num_workers is None:
+        # Leave most cores to the intra-op pool that runs the model itself.
+        args.num_workers = min(8, max(2, cpu_count // 4)) if args.performance else 2
+    if args.prefetch_factor is None and args.num_workers > 0:
+        args.prefetch_factor = 4 if args.performance else 2
+    if args.persistent_workers is None:
+        args.persistent_workers = args.performance
+    if args.channels_last is None:
+        args.channels_last = args.performance
+    if args.bf16 is None:
+        args.bf16 = "auto" if args.performance else "off"
 
 
 def main():
     args = parse_args()
     args.out_dir.mkdir(parents=True, exist_ok=True)
     device = get_device()
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+    use_bf16 = device.type == "cpu" and (
+        args.bf16 == "on" or (args.bf16 == "auto" and cpu_supports_bf16())
+    )
     print("=== Training Started ===")
     print(f"Using device: {device}")
     print(
         f"Config -> data_dir={args.data_dir}, out_dir={args.out_dir}, "
-        f"epochs={args.epochs}, batch_size={args.batch_size}, lr={args.lr}"
+        f"epochs={args.epochs}, batch_size={args.batch_size}, lr={args.lr}, data_format={args.data_format}"
+    )
+    print(
+        f"Performance -> num_workers={args.num_workers}, prefetch_factor={args.prefetch_factor}, "
+        f"persistent_workers={args.persistent_workers}, channels_last={args.channels_last}, "
+        f"bf16={use_bf16}, compile={args.compile}, threads={torch.get_num_threads()}"
     )
 
-    train_loader, val_loader, test_loader = make_loaders(args.data_dir, args.batch_size)
+    train_loader, val_loader, test_loader = make_loaders(
+        args.data_dir,
+        args.batch_size,
+        args.data_format,
+        args.shards_dir,
+        num_workers=args.num_workers,
+        prefetch_factor=args.prefetch_factor,
+        persistent_workers=args.persistent_workers,
+    )
     print(
         "Dataset sizes -> "
         f"train={len(train_loader.dataset)}, val={len(val_loader.dataset)}, test={len(test_loader.dataset)}"
     )
 
     model = timm.create_model("mobilenetv3_large_100", pretrained=True, num_classes=1).to(device)
+    memory_format = torch.channels_last if args.channels_last else torch.contiguous_format
+    model = model.to(memory_format=memory_format)
+    # Checkpoints are saved from `model`; torch.compile wraps it and prefixes state_dict keys.
+    forward_model = torch.compile(model) if args.compile else model
     loss_fn = nn.BCEWithLogitsLoss()
     optimizer = torch.optim.AdamW(model.parameters(), lr=args.lr, weight_decay=1e-4)
 
     best_val_auc = -1.0
     best_checkpoint = args.out_dir / "best.pt"
+    epoch_throughput: list[dict] = []
 
     for epoch in range(1, args.epochs + 1):
-        model.train()
+        forward_model.train()
         running_train_loss = 0.0
+        seen_images = 0
+        data_wait_seconds = 0.0
+        epoch_started = time.perf_counter()
+        batch_requested = epoch_started
         for images, targets in tqdm(train_loader, desc=f"Epoch {epoch}/{args.epochs}"):
-            images = images.to(device)
+            data_wait_seconds += time.perf_counter() - batch_requested
+            images = images.to(device, memory_format=memory_format)
             targets = targets.to(device)
 
             optimizer.zero_grad()
-            logits = model(images)
-            loss = loss_fn(logits, targets)
+            with autocast_context(device, use_bf16):
+                logits = forward_model(images)
+            loss = loss_fn(logits.float(), targets)
             loss.backward()
             optimizer.step()
 
             running_train_loss += loss.item() * images.shape[0]
+            seen_images += images.shape[0]
+            batch_requested = time.perf_counter()
+
+        epoch_seconds = time.perf_counter() - epoch_started
+        images_per_second = seen_images / epoch_seconds if epoch_seconds > 0 else 0.0
+        data_wait_share = data_wait_seconds / epoch_seconds if epoch_seconds > 0 else 0.0
+        epoch_throughput.append(
+            {
+                "epoch": epoch,
+                "seconds": round(epoch_seconds, 3),
+                "images_per_second": round(images_per_second, 2),
+                "data_wait_share": round(data_wait_share, 4),
+            }
+        )
 
         train_loss = running_train_loss / max(1, len(train_loader.dataset))
-        val_loss, val_labels, val_probs = evaluate(model, val_loader, loss_fn, device)
-        val_auc = float(roc_auc_score(val_labels, val_probs)) if len(np.unique(val_labels)) > 1 else 0.0
+        val_loss, val_labels, val_probs = evaluate(
+            forward_model, val_loader, loss_fn, device, args.channels_last, use_bf16
+        )
+        val_auc = roc_auc(val_labels, val_probs)
 
         print(
             f"epoch={epoch} train_loss={train_loss:.4f} "
-            f"val_loss={val_loss:.4f} val_auc={val_auc:.4f}"
+            f"val_loss={val_loss:.4f} val_auc={val_auc:.4f} "
+            f"images_per_sec={images_per_second:.1f} data_wait={data_wait_share:.0%}"
         )
 
         if val_auc > best_val_auc:
             best_val_auc = val_auc
             torch.save(
-                {"state_dict": model.state_dict(), "model_name": "mobilenetv3_large_100"},
+                {"state_dict": model.state_dict(), "model_name": "mobilenetv3_large_100", "input_size": 224},
                 best_checkpoint,
             )
             print(f"Saved best checkpoint: {best_checkpoint}")
@@ -182,10 +371,10 @@ def main():
     checkpoint = torch.load(best_checkpoint, map_location=device)
     model.load_state_dict(checkpoint["state_dict"])
 
-    _, val_labels, val_probs = evaluate(model, val_loader, loss_fn, device)
+    _, val_labels, val_probs = evaluate(forward_model, val_loader, loss_fn, device, args.channels_last, use_bf16)
     tuned_threshold, val_f1 = best_threshold(val_labels, val_probs)
 
-    _, test_labels, test_probs = evaluate(model, test_loader, loss_fn, device)
+    _, test_labels, test_probs = evaluate(forward_model, test_loader, loss_fn, device, args.channels_last, use_bf16)
     test_metrics = metrics_at_threshold(test_labels, test_probs, tuned_threshold)
 
     with open(args.out_dir / "thresholds.json", "w", encoding="utf-8") as file:
@@ -205,6 +394,10 @@ def main():
                 "best_val_auc": best_val_auc,
                 "best_val_f1_at_tuned_threshold": val_f1,
                 "test_metrics": test_metrics,
+                "val_pr_curve": pr_points(val_labels, val_probs),
+                "test_roc_curve": roc_points(test_labels, test_probs),
+                "test_calibration": calibration(test_labels, test_probs),
+                "train_throughput": epoch_throughput,
             },
             file,
             indent=2,
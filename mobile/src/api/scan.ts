@@ -1,6 +1,8 @@
 import { apiRequest } from "./client";
 import {
   CreatorListEntry,
+  ListBatchRequest,
+  ListChangesResponse,
   ScanRequest,
   ScanResponse,
   UpdateListRequest,
@@ -30,6 +32,25 @@ export function updateCreatorList(payload: UpdateListRequest) {
   });
 }
 
+export function batchUpdateCreatorList(payload: ListBatchRequest) {
+  return apiRequest<UpdateListResponse>("/api/list/batch", {
+    method: "POST",
+    body: JSON.stringify(payload),
+  });
+}
+
+export function fetchCreatorListChanges(
+  userFingerprint: string,
+  since = 0,
+  epoch: string | null = null
+) {
+  const params = new URLSearchParams({ userFingerprint, since: String(since) });
+  if (epoch) {
+    params.set("epoch", epoch);
+  }
+  return apiRequest<ListChangesResponse>(`/api/list/changes?${params.toString()}`);
+}
+
 export function fetchHistory(userFingerprint: string) {
   const query = encodeURIComponent(userFingerprint);
   return apiRequest<ScanResponse[]>(`/api/history?userFingerprint=${query}`);
@@ -50,9 +50,31 @@ export type UpdateListRequest = {
 
 export type UpdateListResponse = {
   ok: boolean;
+  version?: number | null;
 };
 
 export type CreatorListEntry = {
   creatorId: string;
   listType: "allow" | "block";
 };
+
+export type ListOperation =
+  | { op: "set"; creatorId: string; listType: "allow" | "block" }
+  | { op: "remove"; creatorId: string };
+
+export type ListBatchRequest = {
+  userFingerprint: string;
+  operations: ListOperation[];
+};
+
+export type ListChangeEntry = {
+  creatorId: string;
+  listType: "allow" | "block" | null;
+};
+
+export type ListChangesResponse = {
+  version: number;
+  epoch: string;
+  reset: boolean;
+  changes: ListChangeEntry[];
+};